@@ -1,6 +1,5 @@
-from app.app import create_app
-
-app = create_app()
+# La aplicación ya se crea al importar app.app: no se vuelve a inicializar
+from app.app import app
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -3,9 +3,21 @@ from functools import wraps
 import os
 
 from app.core.config.settings import Config
+from app.data.avatar_pipeline import init_avatar_pipeline
+from app.data.data_version import avanzar_version
 from app.data.database import db, init_db
-from app.data.models.db_models import Usuario
+from app.data.leaderboard import init_leaderboard
+from app.data.reward_catalog import init_reward_catalog
+from app.data.score_buffer import init_score_buffer
+from app.data.upload_manifest import init_upload_manifest
+from app.data.upload_store import init_upload_store
+from app.infrastructure.distributed_service import al_entregar_eventos, publicar_record
+from app.infrastructure.notification_hub import init_notification_hub
+from app.infrastructure.password_hashing import init_password_hasher
+from app.infrastructure.static_assets import init_static_assets
 from app.presentation.api.routes import api_bp
+from app.presentation.http_cache import init_http_cache
+from app.presentation.identity import usuario_sesion
 from app.presentation.routes import main_bp
 
 def create_app(config_class=Config):
@@ -16,7 +28,21 @@ def create_app(config_class=Config):
     app = Flask(__name__, template_folder=templates_dir, static_folder=static_dir)
     app.config.from_object(config_class)
     
+    # Primero: el pool de procesos (uno por proceso, lo reutilizan los create_app siguientes)
+    # se crea con fork antes de que arranquen los hilos de fondo
+    init_password_hasher(app)
     init_db(app)
+    init_leaderboard(app)
+    init_reward_catalog(app)
+    init_score_buffer(app, al_volcar=publicar_record)
+    # Las estadísticas globales cambian recién cuando el servicio aplica el evento
+    al_entregar_eventos(avanzar_version)
+    init_notification_hub(app)
+    init_http_cache(app)
+    init_upload_manifest(app)
+    init_avatar_pipeline(app)
+    init_upload_store(app)
+    init_static_assets(app)
     config_class.init_app(app)
     
     app.register_blueprint(main_bp)
@@ -24,11 +50,8 @@ def create_app(config_class=Config):
     
     @app.context_processor
     def inject_user():
-        from flask import session
-        if 'user_id' in session:
-            usuario = Usuario.query.get(session['user_id'])
-            return dict(usuario=usuario)
-        return dict(usuario=None)
+        # Proyección del usuario (una consulta por columnas por request) para la barra de navegación
+        return dict(usuario_sesion=usuario_sesion())
     
     return app
 
@@ -9,6 +9,36 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'presentation', 'web', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    # Hilos que generan las variantes reducidas de las fotos de perfil (requiere Pillow)
+    AVATAR_WORKERS = int(os.environ.get('AVATAR_WORKERS', '2'))
+    # Barrido de fotos por contenido sin referencias y antigüedad mínima para borrarlas. Desactivado
+    # (0) por defecto: corre en un solo proceso, `python -m app.data.upload_store barrer --intervalo`
+    UPLOAD_SWEEP_INTERVAL = float(os.environ.get('UPLOAD_SWEEP_INTERVAL', '0'))
+    UPLOAD_SWEEP_GRACE = float(os.environ.get('UPLOAD_SWEEP_GRACE', '3600'))
+    # Cada cuántos segundos se revisa la carpeta de fotos para el manifiesto de avatares (0 lo desactiva)
+    UPLOAD_MANIFEST_POLL = float(os.environ.get('UPLOAD_MANIFEST_POLL', '2'))
+    # Archivos estáticos con huella y precomprimidos servidos desde /assets (se compilan al iniciar)
+    STATIC_ASSETS_ENABLED = os.environ.get('STATIC_ASSETS_ENABLED', '1') == '1'
+    STATIC_ASSETS_BUILD = os.environ.get('STATIC_ASSETS_BUILD', '1') == '1'
+    STATIC_BUILD_FOLDER = os.path.join(BASE_DIR, 'presentation', 'web', 'static_build')
+
+    # Hash de contraseñas en un pool de procesos (0 procesos: en el hilo del request).
+    # Cambiar el método o el costo rehashea cada contraseña en el próximo login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '0'))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+
+    # Ingesta de puntajes con escritura diferida (write-behind), desactivada por defecto
+    SCORE_WRITE_BEHIND = os.environ.get('SCORE_WRITE_BEHIND', '0') == '1'
+    SCORE_FLUSH_INTERVAL_MS = int(os.environ.get('SCORE_FLUSH_INTERVAL_MS', '200'))
+    SCORE_FLUSH_MAX_ENTRIES = int(os.environ.get('SCORE_FLUSH_MAX_ENTRIES', '500'))
+
+    # Caché de respuestas de /ranking y /api/stats/global (ETag por versión de los puntajes)
+    HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', '1') == '1'
+    HTTP_CACHE_MAX_ENTRIES = int(os.environ.get('HTTP_CACHE_MAX_ENTRIES', '1024'))
+    HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+    HTTP_CACHE_TTL = float(os.environ.get('HTTP_CACHE_TTL', '60'))
     
     @staticmethod
     def init_app(app):
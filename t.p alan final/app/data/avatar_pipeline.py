@@ -0,0 +1,236 @@
+"""
+Variantes de Fotos de Perfil
+Cada foto subida se decodifica una sola vez y se guardan versiones cuadradas de
+48, 128 y 512 px en WebP y JPEG junto al original. El trabajo corre en un pool
+de hilos (Pillow suelta el GIL al decodificar, redimensionar y codificar) para
+no demorar el request; al terminar se registran los nombres en
+`Usuario.foto_variantes` y las plantillas eligen con `avatar_url()` la variante
+más chica que alcanza para el tamaño en pantalla. Si el archivo no está en el
+manifiesto de la carpeta (upload_manifest.py), se usa la imagen por defecto.
+
+Pillow es opcional: sin él no se generan variantes y se sirve el original.
+
+Para generar las variantes de las fotos ya subidas:
+    python -m app.data.avatar_pipeline
+"""
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, url_for
+from sqlalchemy import text
+
+from app.data.database import db
+from app.data.upload_manifest import get_upload_manifest
+from app.data.upload_store import es_inmutable
+from app.infrastructure.static_assets import static_url
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+TAMANOS = (48, 128, 512)
+FOTO_POR_DEFECTO = 'img/default.svg'
+# formato -> (extensión, opciones de Image.save)
+FORMATOS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Sólo se registran las variantes si la foto sigue siendo la misma que se procesó
+GUARDAR_VARIANTES = text("""
+    UPDATE usuarios SET foto_variantes = :variantes
+    WHERE id = :user_id AND foto_perfil = :foto
+""")
+
+
+def disponible() -> bool:
+    return Image is not None
+
+
+def nombre_variante(foto: str, tamano: int, formato: str) -> str:
+    base = os.path.splitext(foto)[0]
+    return f'{base}_{tamano}.{FORMATOS[formato][0]}'
+
+
+def generar_variantes(carpeta: str, foto: str) -> Dict[str, Dict[str, str]]:
+    """
+    Decodifica `foto` una vez y escribe en `carpeta` un recorte cuadrado por cada
+    tamaño y formato. Devuelve {tamaño: {formato: nombre}}. Si el original es más
+    chico que algún tamaño, el menor de esos se genera con el lado del original
+    (sin agrandar) y los mayores se omiten: así la variante más grande siempre es
+    la de más detalle disponible.
+    """
+    existentes = variantes_en_disco(carpeta, foto)
+    if existentes:
+        # Foto por contenido ya procesada para otro usuario: mismas variantes
+        return existentes
+    with Image.open(os.path.join(carpeta, foto)) as original:
+        # En JPEG, decodificar directamente a escala reducida cuando el original es muy grande
+        original.draft('RGB', (max(TAMANOS), max(TAMANOS)))
+        imagen = ImageOps.exif_transpose(original).convert('RGB')
+    ancho, alto = imagen.size
+    lado = min(ancho, alto)
+    izquierda, arriba = (ancho - lado) // 2, (alto - lado) // 2
+    recorte = imagen.crop((izquierda, arriba, izquierda + lado, arriba + lado))
+
+    cubre = min((t for t in TAMANOS if t >= lado), default=max(TAMANOS))
+    variantes = {}
+    for tamano in sorted(TAMANOS, reverse=True):
+        if tamano > cubre:
+            continue
+        # Cada tamaño se reduce desde el anterior: menos píxeles que recorrer
+        real = min(tamano, lado)
+        if recorte.size[0] != real:
+            recorte = recorte.resize((real, real), Image.LANCZOS)
+        nombres = {}
+        for formato, (_, opciones) in FORMATOS.items():
+            nombre = nombre_variante(foto, tamano, formato)
+            recorte.save(os.path.join(carpeta, nombre), **opciones)
+            nombres[formato] = nombre
+        variantes[str(tamano)] = nombres
+    return variantes
+
+
+def variantes_en_disco(carpeta: str, foto: str) -> Dict[str, Dict[str, str]]:
+    """Variantes de `foto` ya escritas (sólo fotos por contenido: el nombre identifica los bytes)"""
+    if not es_inmutable(foto):
+        return {}
+    variantes = {}
+    for tamano in TAMANOS:
+        nombres = {formato: nombre_variante(foto, tamano, formato) for formato in FORMATOS}
+        if all(os.path.exists(os.path.join(carpeta, n)) for n in nombres.values()):
+            variantes[str(tamano)] = nombres
+    return variantes if str(min(TAMANOS)) in variantes else {}
+
+
+def borrar_variantes(carpeta: str, variantes: Optional[Dict[str, Dict[str, str]]]) -> List[str]:
+    """Borra los archivos de las variantes y devuelve sus nombres"""
+    borrados = []
+    for nombres in (variantes or {}).values():
+        for nombre in nombres.values():
+            borrados.append(nombre)
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except OSError:
+                pass
+    return borrados
+
+
+def leer_variantes(valor: Any) -> Dict[str, Dict[str, str]]:
+    """Variantes a partir de la columna (JSON), de la proyección de la sesión (dict) o de nada"""
+    if not valor:
+        return {}
+    if isinstance(valor, dict):
+        return valor
+    try:
+        return json.loads(valor)
+    except ValueError:
+        return {}
+
+
+class AvatarPipeline:
+    """Pool de hilos que genera las variantes y las registra en la base"""
+
+    def __init__(self, app, carpeta: str, workers: int = 2):
+        self.app = app
+        self.carpeta = carpeta
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='avatar')
+
+    def encolar(self, user_id: int, foto: str) -> Future:
+        return self._pool.submit(self.procesar, user_id, foto)
+
+    def procesar(self, user_id: int, foto: str) -> Dict[str, Dict[str, str]]:
+        try:
+            variantes = generar_variantes(self.carpeta, foto)
+        except Exception as e:
+            # Archivo que no es una imagen válida: queda el original
+            self.app.logger.warning(f'No se pudieron generar variantes de {foto}: {e}')
+            return {}
+        manifiesto = self.app.extensions.get('upload_manifest')
+        if manifiesto is not None:
+            manifiesto.agregar(*(n for nombres in variantes.values() for n in nombres.values()))
+        with self.app.app_context():
+            resultado = db.session.execute(GUARDAR_VARIANTES, {
+                'variantes': json.dumps(variantes), 'user_id': user_id, 'foto': foto
+            })
+            db.session.commit()
+        if resultado.rowcount == 0:
+            # El usuario cambió la foto (o se eliminó) mientras tanto; las variantes de
+            # fotos por contenido pueden ser de otro usuario y las borra el barrido
+            if not es_inmutable(foto):
+                borrados = borrar_variantes(self.carpeta, variantes)
+                if manifiesto is not None:
+                    manifiesto.quitar(*borrados)
+            return {}
+        return variantes
+
+    def detener(self):
+        self._pool.shutdown(wait=True)
+
+
+def init_avatar_pipeline(app) -> Optional[AvatarPipeline]:
+    app.add_template_global(avatar_url)
+    if not disponible():
+        app.logger.info('Pillow no está instalado: las fotos de perfil se sirven sin variantes')
+        return None
+    pipeline = AvatarPipeline(app, app.config['UPLOAD_FOLDER'], app.config.get('AVATAR_WORKERS', 2))
+    app.extensions['avatar_pipeline'] = pipeline
+    return pipeline
+
+
+def get_avatar_pipeline() -> Optional[AvatarPipeline]:
+    return current_app.extensions.get('avatar_pipeline')
+
+
+def avatar_url(usuario: Any, tamano: int, formato: str = 'webp') -> str:
+    """
+    URL de la variante más chica de al menos `tamano` px (o la más grande si
+    ninguna alcanza); el original si la foto no tiene variantes y la imagen por
+    defecto si el archivo no existe. Acepta un `Usuario` o la proyección de la sesión.
+    """
+    manifiesto = get_upload_manifest()
+
+    def existe(nombre: str) -> bool:
+        return manifiesto is None or manifiesto.existe(nombre)
+
+    if isinstance(usuario, dict):
+        foto, variantes = usuario.get('foto_perfil'), usuario.get('foto_variantes')
+    else:
+        foto, variantes = usuario.foto_perfil, usuario.foto_variantes
+    if not foto or foto == 'default.svg':
+        return static_url(FOTO_POR_DEFECTO)
+    variantes = leer_variantes(variantes)
+    if variantes:
+        disponibles = sorted(int(t) for t in variantes)
+        elegido = next((t for t in disponibles if t >= tamano), disponibles[-1])
+        nombre = variantes[str(elegido)].get(formato)
+        if nombre and existe(nombre):
+            return url_for('main.foto_subida', nombre=nombre)
+    if existe(foto):
+        return url_for('main.foto_subida', nombre=foto)
+    return static_url(FOTO_POR_DEFECTO)
+
+
+def main():
+    """Genera (en este proceso, sin pool) las variantes que faltan de las fotos ya subidas"""
+    if not disponible():
+        raise SystemExit('Hace falta Pillow: pip install Pillow')
+    from app.app import app
+    from app.data.models.db_models import Usuario
+
+    pipeline = app.extensions['avatar_pipeline']
+    with app.app_context():
+        pendientes = db.session.query(Usuario.id, Usuario.foto_perfil).filter(
+            Usuario.foto_perfil != 'default.svg', Usuario.foto_variantes.is_(None)
+        ).all()
+    for user_id, foto in pendientes:
+        if os.path.exists(os.path.join(pipeline.carpeta, foto)):
+            pipeline.procesar(user_id, foto)
+    print(f'{len(pendientes)} fotos procesadas')
+
+
+if __name__ == '__main__':
+    main()
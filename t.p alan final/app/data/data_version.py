@@ -0,0 +1,25 @@
+"""
+Versión de los Datos de Puntajes
+Contador por proceso que avanza con cada escritura que cambia lo que muestran
+el ranking y las estadísticas globales (partidas, canjes, reinicios, altas,
+bajas y cambios de nombre). Las respuestas cacheadas lo usan como sello de sus
+ETags: mientras no avance, el contenido sigue siendo el mismo.
+"""
+import threading
+from uuid import uuid4
+
+# Identifica este arranque: tras reiniciar, un ETag viejo no coincide con la versión 0 nueva
+_ARRANQUE = uuid4().hex[:8]
+
+_lock = threading.Lock()
+_version = 0
+
+
+def version_datos() -> str:
+    return f'{_ARRANQUE}.{_version}'
+
+
+def avanzar_version():
+    global _version
+    with _lock:
+        _version += 1
@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 
+from app.data.migrations import migrar_engine
+
 db = SQLAlchemy()
 
 def init_db(app):
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        # Aplicar migraciones pendientes (índices, cambios de esquema) sobre bases existentes
+        migrar_engine(db.engine)
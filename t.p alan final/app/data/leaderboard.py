@@ -0,0 +1,223 @@
+"""
+Índice de Ranking en Memoria
+Mantiene a los usuarios no administradores ordenados por (puntaje_maximo desc, id asc)
+en una skip list indexable, para resolver el top-N y la posición de un usuario en O(log n)
+sin ordenar la tabla `usuarios` en cada request.
+"""
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from app.data.data_version import avanzar_version
+from app.data.database import db
+from app.data.models.db_models import Usuario
+
+
+class _Nodo:
+    """Nodo de la skip list: clave, enlaces por nivel y ancho (saltos en nivel 0) de cada enlace"""
+    __slots__ = ('clave', 'siguiente', 'ancho')
+
+    def __init__(self, clave, nivel: int):
+        self.clave = clave
+        self.siguiente = [None] * nivel
+        self.ancho = [1] * nivel
+
+
+class SkipListIndexada:
+    """
+    Skip list ordenada con anchos por enlace (estadístico de orden).
+    Permite insertar, eliminar y obtener la posición de una clave en O(log n) esperado.
+    """
+
+    MAX_NIVEL = 24
+
+    def __init__(self, claves_ordenadas: Iterable = ()):
+        self._construir(claves_ordenadas)
+
+    def __len__(self) -> int:
+        return self._tamanio
+
+    def _nivel_aleatorio(self) -> int:
+        # Cantidad de ceros finales de un entero aleatorio: nivel k con probabilidad 2^-k
+        bits = random.getrandbits(self.MAX_NIVEL - 1) | (1 << (self.MAX_NIVEL - 1))
+        return (bits & -bits).bit_length()
+
+    def _construir(self, claves_ordenadas: Iterable):
+        """Construye la lista en O(n) a partir de claves ya ordenadas"""
+        self._cabeza = _Nodo(None, self.MAX_NIVEL)
+        ultimo = [self._cabeza] * self.MAX_NIVEL
+        pos_ultimo = [0] * self.MAX_NIVEL
+        pos = 0
+        nivel_aleatorio = self._nivel_aleatorio
+        for pos, clave in enumerate(claves_ordenadas, 1):
+            nodo = _Nodo(clave, nivel_aleatorio())
+            for nivel in range(len(nodo.siguiente)):
+                anterior = ultimo[nivel]
+                anterior.siguiente[nivel] = nodo
+                anterior.ancho[nivel] = pos - pos_ultimo[nivel]
+                ultimo[nivel] = nodo
+                pos_ultimo[nivel] = pos
+        # Los enlaces finales apuntan a una posición virtual n + 1
+        for nivel in range(self.MAX_NIVEL):
+            ultimo[nivel].ancho[nivel] = pos + 1 - pos_ultimo[nivel]
+        self._tamanio = pos
+
+    def insertar(self, clave):
+        cadena = [None] * self.MAX_NIVEL
+        pasos_por_nivel = [0] * self.MAX_NIVEL
+        nodo = self._cabeza
+        for nivel in reversed(range(self.MAX_NIVEL)):
+            while nodo.siguiente[nivel] is not None and nodo.siguiente[nivel].clave <= clave:
+                pasos_por_nivel[nivel] += nodo.ancho[nivel]
+                nodo = nodo.siguiente[nivel]
+            cadena[nivel] = nodo
+
+        nuevo = _Nodo(clave, self._nivel_aleatorio())
+        pasos = 0
+        for nivel in range(len(nuevo.siguiente)):
+            anterior = cadena[nivel]
+            nuevo.siguiente[nivel] = anterior.siguiente[nivel]
+            anterior.siguiente[nivel] = nuevo
+            nuevo.ancho[nivel] = anterior.ancho[nivel] - pasos
+            anterior.ancho[nivel] = pasos + 1
+            pasos += pasos_por_nivel[nivel]
+        for nivel in range(len(nuevo.siguiente), self.MAX_NIVEL):
+            cadena[nivel].ancho[nivel] += 1
+        self._tamanio += 1
+
+    def eliminar(self, clave):
+        cadena = [None] * self.MAX_NIVEL
+        nodo = self._cabeza
+        for nivel in reversed(range(self.MAX_NIVEL)):
+            while nodo.siguiente[nivel] is not None and nodo.siguiente[nivel].clave < clave:
+                nodo = nodo.siguiente[nivel]
+            cadena[nivel] = nodo
+
+        objetivo = cadena[0].siguiente[0]
+        if objetivo is None or objetivo.clave != clave:
+            raise KeyError(clave)
+
+        for nivel in range(len(objetivo.siguiente)):
+            anterior = cadena[nivel]
+            anterior.ancho[nivel] += objetivo.ancho[nivel] - 1
+            anterior.siguiente[nivel] = objetivo.siguiente[nivel]
+        for nivel in range(len(objetivo.siguiente), self.MAX_NIVEL):
+            cadena[nivel].ancho[nivel] -= 1
+        self._tamanio -= 1
+
+    def indice(self, clave) -> Optional[int]:
+        """Devuelve la posición (base 0) de la clave, o None si no está"""
+        nodo = self._cabeza
+        pos = 0
+        for nivel in reversed(range(self.MAX_NIVEL)):
+            while nodo.siguiente[nivel] is not None and nodo.siguiente[nivel].clave < clave:
+                pos += nodo.ancho[nivel]
+                nodo = nodo.siguiente[nivel]
+        candidato = nodo.siguiente[0]
+        if candidato is None or candidato.clave != clave:
+            return None
+        return pos
+
+    def primeros(self, n: int) -> list:
+        """Devuelve las primeras n claves en orden"""
+        resultado = []
+        nodo = self._cabeza.siguiente[0]
+        while nodo is not None and len(resultado) < n:
+            resultado.append(nodo.clave)
+            nodo = nodo.siguiente[0]
+        return resultado
+
+
+class Leaderboard:
+    """Ranking de jugadores (excluye administradores) mantenido de forma incremental"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._claves: Dict[int, Tuple[int, int]] = {}
+        self._lista = SkipListIndexada()
+
+    @staticmethod
+    def _clave(user_id: int, puntaje: int) -> Tuple[int, int]:
+        # Orden ascendente de la clave = mayor puntaje primero, desempate por id
+        return (-(puntaje or 0), user_id)
+
+    def cargar(self, filas: Iterable[Tuple[int, int]]):
+        """Reemplaza el contenido con pares (user_id, puntaje_maximo)"""
+        claves = {user_id: self._clave(user_id, puntaje) for user_id, puntaje in filas}
+        lista = SkipListIndexada(sorted(claves.values()))
+        with self._lock:
+            self._claves = claves
+            self._lista = lista
+        avanzar_version()
+
+    def actualizar(self, user_id: int, puntaje: int):
+        """Inserta o reubica a un usuario con su nuevo puntaje"""
+        nueva = self._clave(user_id, puntaje)
+        with self._lock:
+            actual = self._claves.get(user_id)
+            if actual == nueva:
+                return
+            if actual is not None:
+                self._lista.eliminar(actual)
+            self._lista.insertar(nueva)
+            self._claves[user_id] = nueva
+        avanzar_version()
+
+    def eliminar(self, user_id: int):
+        with self._lock:
+            actual = self._claves.pop(user_id, None)
+            if actual is not None:
+                self._lista.eliminar(actual)
+        # También con administradores: cambian los totales de las estadísticas globales
+        avanzar_version()
+
+    def top(self, n: int = 10) -> List[Tuple[int, int]]:
+        """Devuelve los n mejores como (user_id, puntaje_maximo)"""
+        with self._lock:
+            claves = self._lista.primeros(n)
+        return [(user_id, -puntaje) for puntaje, user_id in claves]
+
+    def posicion(self, user_id: int) -> Optional[int]:
+        """Posición (base 1) del usuario en el ranking, o None si no participa"""
+        with self._lock:
+            clave = self._claves.get(user_id)
+            if clave is None:
+                return None
+            return self._lista.indice(clave) + 1
+
+    def __len__(self) -> int:
+        return len(self._lista)
+
+
+def init_leaderboard(app):
+    """Carga el ranking desde la base de datos al iniciar la aplicación"""
+    leaderboard = Leaderboard()
+    with app.app_context():
+        filas = db.session.query(Usuario.id, Usuario.puntaje_maximo).filter_by(es_admin=False).all()
+    leaderboard.cargar(filas)
+    app.extensions['leaderboard'] = leaderboard
+    return leaderboard
+
+
+def get_leaderboard() -> Leaderboard:
+    return current_app.extensions['leaderboard']
+
+
+def sincronizar_usuario(usuario: Usuario):
+    """Refleja en el ranking el estado actual de un usuario (tras commit)"""
+    leaderboard = get_leaderboard()
+    if usuario.es_admin:
+        leaderboard.eliminar(usuario.id)
+    else:
+        leaderboard.actualizar(usuario.id, usuario.puntaje_maximo)
+
+
+def obtener_top_usuarios(limite: int = 10) -> List[Usuario]:
+    """Devuelve los usuarios del top en orden, cargándolos por clave primaria"""
+    ids = [user_id for user_id, _ in get_leaderboard().top(limite)]
+    if not ids:
+        return []
+    usuarios = {u.id: u for u in Usuario.query.filter(Usuario.id.in_(ids)).all()}
+    return [usuarios[user_id] for user_id in ids if user_id in usuarios]
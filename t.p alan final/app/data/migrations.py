@@ -0,0 +1,253 @@
+"""
+Migraciones de Esquema Versionadas
+Reemplaza a los scripts sueltos de app/scripts que modificaban SQLite a mano:
+cada migración tiene un número de versión, se aplica una sola vez y queda
+registrada en la tabla `schema_version`.
+
+Uso por línea de comandos:
+    python -m app.data.migrations estado  [--db RUTA]
+    python -m app.data.migrations migrar  [--db RUTA] [--hasta VERSION]
+    python -m app.data.migrations revertir --hasta VERSION [--db RUTA]
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'instance', 'usuarios.db')
+
+TABLA_VERSION = 'schema_version'
+
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    aplicar: Callable[[sqlite3.Connection], None]
+    revertir: Optional[Callable[[sqlite3.Connection], None]]
+
+
+MIGRACIONES: List[Migracion] = []
+
+
+def migracion(version: int, descripcion: str, revertir: Optional[Callable] = None):
+    """Registra una función como migración con el número de versión indicado"""
+    def decorador(funcion):
+        if any(m.version == version for m in MIGRACIONES):
+            raise ValueError(f"Versión de migración duplicada: {version}")
+        MIGRACIONES.append(Migracion(version, descripcion, funcion, revertir))
+        MIGRACIONES.sort(key=lambda m: m.version)
+        return funcion
+    return decorador
+
+
+def _sql(*sentencias: str) -> Callable[[sqlite3.Connection], None]:
+    def ejecutar(conn: sqlite3.Connection):
+        for sentencia in sentencias:
+            conn.execute(sentencia)
+    return ejecutar
+
+
+def migracion_sql(version: int, descripcion: str, aplicar: str, revertir: Optional[str] = None):
+    """Registra una migración compuesta sólo por SQL"""
+    migracion(version, descripcion, revertir=_sql(revertir) if revertir else None)(_sql(aplicar))
+
+
+# --- Migraciones ---------------------------------------------------------------
+
+# Ranking: WHERE es_admin = 0 ORDER BY puntaje_maximo DESC LIMIT N
+migracion_sql(
+    1, 'Índice de ranking en usuarios(es_admin, puntaje_maximo DESC)',
+    "CREATE INDEX IF NOT EXISTS ix_usuarios_ranking ON usuarios (es_admin, puntaje_maximo DESC)",
+    "DROP INDEX IF EXISTS ix_usuarios_ranking",
+)
+
+# Logros: WHERE usuario_id = ? ORDER BY fecha DESC
+migracion_sql(
+    2, 'Índice de logros en canjes(usuario_id, fecha DESC)',
+    "CREATE INDEX IF NOT EXISTS ix_canjes_usuario_fecha ON canjes (usuario_id, fecha DESC)",
+    "DROP INDEX IF EXISTS ix_canjes_usuario_fecha",
+)
+
+# Búsquedas de canjes por recompensa (y la clave foránea)
+migracion_sql(
+    3, 'Índice en canjes(recompensa_id)',
+    "CREATE INDEX IF NOT EXISTS ix_canjes_recompensa ON canjes (recompensa_id)",
+    "DROP INDEX IF EXISTS ix_canjes_recompensa",
+)
+
+
+# Catálogo inicial de recompensas (antes se sembraba en el GET de /recompensas)
+RECOMPENSAS_INICIALES = [
+    ("10% OFF en tienda Samsung", "Cupón exclusivo para usar en la tienda online de Samsung.", 250, "default.png"),
+    ("Auriculares Galaxy Buds", "Descuento para adquirir Galaxy Buds originales.", 500, "default.png"),
+    ("Reloj Galaxy Watch", "Participá del sorteo mensual por un smartwatch Galaxy.", 650, "default.png"),
+    ("Entrenamiento personalizado", "Sesión virtual con entrenador partner.", 200, "default.png"),
+    ("Gift Card PedidosYa", "Tarjeta regalo digital para delivery.", 150, "default.png"),
+    ("Sticker y Merch Activate", "Merchandising oficial del programa Activate.", 50, "default.png"),
+]
+
+
+def _quitar_catalogo_inicial(conn: sqlite3.Connection):
+    # Sólo las recompensas iniciales que nadie canjeó
+    conn.executemany("""
+        DELETE FROM recompensas WHERE nombre = ? AND puntos = ?
+        AND id NOT IN (SELECT recompensa_id FROM canjes)
+    """, [(nombre, puntos) for nombre, _, puntos, _ in RECOMPENSAS_INICIALES])
+
+
+@migracion(4, 'Catálogo inicial de recompensas', revertir=_quitar_catalogo_inicial)
+def _sembrar_catalogo(conn: sqlite3.Connection):
+    if conn.execute("SELECT 1 FROM recompensas LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO recompensas (nombre, descripcion, puntos, imagen) VALUES (?, ?, ?, ?)",
+            RECOMPENSAS_INICIALES
+        )
+
+
+def _quitar_clave_idempotencia(conn: sqlite3.Connection):
+    conn.execute("DROP INDEX IF EXISTS ux_canjes_idempotencia")
+    conn.execute("ALTER TABLE canjes DROP COLUMN clave_idempotencia")
+
+
+# Canjes idempotentes: reintentar con la misma clave no vuelve a descontar puntos
+@migracion(5, 'Clave de idempotencia en canjes', revertir=_quitar_clave_idempotencia)
+def _agregar_clave_idempotencia(conn: sqlite3.Connection):
+    # Las bases creadas con el modelo actual ya traen la columna
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(canjes)")}
+    if 'clave_idempotencia' not in columnas:
+        conn.execute("ALTER TABLE canjes ADD COLUMN clave_idempotencia VARCHAR(64)")
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_canjes_idempotencia
+        ON canjes (usuario_id, clave_idempotencia)
+    """)
+
+
+# Nombres de las versiones reducidas de la foto de perfil (app/data/avatar_pipeline.py)
+@migracion(6, 'Variantes de foto de perfil en usuarios',
+           revertir=_sql("ALTER TABLE usuarios DROP COLUMN foto_variantes"))
+def _agregar_foto_variantes(conn: sqlite3.Connection):
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(usuarios)")}
+    if 'foto_variantes' not in columnas:
+        conn.execute("ALTER TABLE usuarios ADD COLUMN foto_variantes TEXT")
+
+# --- Motor ---------------------------------------------------------------------
+
+def _asegurar_tabla_version(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLA_VERSION} (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            aplicada TEXT NOT NULL
+        )
+    """)
+
+
+def version_actual(conn: sqlite3.Connection) -> int:
+    """Devuelve la última versión aplicada (0 si no hay ninguna)"""
+    _asegurar_tabla_version(conn)
+    row = conn.execute(f"SELECT MAX(version) FROM {TABLA_VERSION}").fetchone()
+    return row[0] or 0
+
+
+def _en_transaccion(conn: sqlite3.Connection, funcion: Callable[[], None]):
+    """Ejecuta `funcion` en una transacción explícita (incluye el DDL)"""
+    nivel_previo = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            funcion()
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.isolation_level = nivel_previo
+
+
+def aplicar_migraciones(conn: sqlite3.Connection, hasta: Optional[int] = None) -> List[Migracion]:
+    """Aplica en orden las migraciones pendientes; cada una en su propia transacción"""
+    actual = version_actual(conn)
+    aplicadas = []
+    for m in MIGRACIONES:
+        if m.version <= actual or (hasta is not None and m.version > hasta):
+            continue
+
+        def paso(m=m):
+            m.aplicar(conn)
+            conn.execute(
+                f"INSERT INTO {TABLA_VERSION} (version, descripcion, aplicada) VALUES (?, ?, ?)",
+                (m.version, m.descripcion, datetime.utcnow().isoformat())
+            )
+
+        _en_transaccion(conn, paso)
+        aplicadas.append(m)
+    return aplicadas
+
+
+def revertir_migraciones(conn: sqlite3.Connection, hasta: int) -> List[Migracion]:
+    """Revierte en orden inverso las migraciones con versión mayor a `hasta`"""
+    actual = version_actual(conn)
+    revertidas = []
+    for m in reversed(MIGRACIONES):
+        if m.version > actual or m.version <= hasta:
+            continue
+        if m.revertir is None:
+            raise ValueError(f"La migración {m.version} no se puede revertir")
+
+        def paso(m=m):
+            m.revertir(conn)
+            conn.execute(f"DELETE FROM {TABLA_VERSION} WHERE version = ?", (m.version,))
+
+        _en_transaccion(conn, paso)
+        revertidas.append(m)
+    return revertidas
+
+
+def migrar_engine(engine) -> List[Migracion]:
+    """Aplica las migraciones pendientes usando la conexión de un engine de SQLAlchemy"""
+    raw = engine.raw_connection()
+    try:
+        return aplicar_migraciones(raw.driver_connection)
+    finally:
+        raw.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Migraciones de esquema de Activate')
+    parser.add_argument('comando', choices=['estado', 'migrar', 'revertir'])
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Ruta a la base SQLite')
+    parser.add_argument('--hasta', type=int, default=None, help='Versión objetivo')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"No existe la base de datos: {args.db}")
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.comando == 'estado':
+            actual = version_actual(conn)
+            print(f"Base de datos: {os.path.abspath(args.db)}")
+            print(f"Versión actual: {actual}")
+            for m in MIGRACIONES:
+                marca = 'x' if m.version <= actual else ' '
+                print(f"  [{marca}] {m.version:04d} {m.descripcion}")
+        elif args.comando == 'migrar':
+            aplicadas = aplicar_migraciones(conn, args.hasta)
+            for m in aplicadas:
+                print(f"Aplicada {m.version:04d} {m.descripcion}")
+            print(f"Versión actual: {version_actual(conn)}")
+        else:
+            if args.hasta is None:
+                parser.error('revertir requiere --hasta')
+            for m in revertir_migraciones(conn, args.hasta):
+                print(f"Revertida {m.version:04d} {m.descripcion}")
+            print(f"Versión actual: {version_actual(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.data.database import db
+from app.infrastructure.password_hashing import generar_hash, verificar_hash
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -13,14 +13,22 @@ class Usuario(db.Model):
     puntaje_maximo = db.Column(db.Integer, default=0)
     fecha_ultimo_juego = db.Column(db.DateTime, nullable=True)
     foto_perfil = db.Column(db.String(200), default='default.svg')
+    # JSON {tamaño: {formato: archivo}} con las versiones reducidas de la foto (avatar_pipeline.py)
+    foto_variantes = db.Column(db.Text, nullable=True)
     biografia = db.Column(db.Text, default='')
     fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Índices mantenidos por app/data/migrations.py (se declaran acá para bases nuevas)
+    __table_args__ = (
+        db.Index('ix_usuarios_ranking', 'es_admin', db.desc('puntaje_maximo')),
+    )
+
+    # El hash se calcula en el pool de procesos (app/infrastructure/password_hashing.py)
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = generar_hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return verificar_hash(self.password, password)
 
     def __repr__(self):
         return f'<Usuario {self.email}>'
@@ -39,4 +47,12 @@ class CanjeRecompensa(db.Model):
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     recompensa_id = db.Column(db.Integer, db.ForeignKey('recompensas.id'), nullable=False)
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
-    recompensa = db.relationship('Recompensa', backref='canjes')
\ No newline at end of file
+    # Clave que manda el cliente para que reintentar un canje no lo duplique
+    clave_idempotencia = db.Column(db.String(64), nullable=True)
+    recompensa = db.relationship('Recompensa', backref='canjes')
+
+    __table_args__ = (
+        db.Index('ix_canjes_usuario_fecha', 'usuario_id', db.desc('fecha')),
+        db.Index('ix_canjes_recompensa', 'recompensa_id'),
+        db.Index('ux_canjes_idempotencia', 'usuario_id', 'clave_idempotencia', unique=True),
+    )
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Catálogo de Recompensas en Memoria
+El catálogo casi nunca cambia: se carga una vez por proceso con un sello de
+versión (hash del contenido, igual en todos los workers) y se recarga cuando
+una sesión confirma cambios en `Recompensa`. Los cambios hechos por fuera
+del ORM (otro proceso, SQL directo) se toman al vencer el TTL.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.data.database import db
+from app.data.models.db_models import CanjeRecompensa, Recompensa
+
+CATALOGO_TTL = float(os.environ.get('REWARD_CATALOG_TTL', '60'))
+
+
+class ItemCatalogo(NamedTuple):
+    id: int
+    nombre: str
+    descripcion: str
+    puntos: int
+    imagen: Optional[str]
+
+
+class Logro(NamedTuple):
+    recompensa: ItemCatalogo
+    fecha: object
+
+
+# Commits que tocaron recompensas en este proceso; el catálogo recarga si cambió
+_cambios = 0
+
+
+@event.listens_for(Recompensa, 'after_insert')
+@event.listens_for(Recompensa, 'after_update')
+@event.listens_for(Recompensa, 'after_delete')
+def _marcar_cambio(mapper, connection, target):
+    sesion = object_session(target)
+    if sesion is not None:
+        sesion.info['recompensas_modificadas'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _confirmar_cambio(session):
+    global _cambios
+    if session.info.pop('recompensas_modificadas', False):
+        _cambios += 1
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambio(session):
+    session.info.pop('recompensas_modificadas', None)
+
+
+class CatalogoRecompensas:
+    """Recompensas ordenadas por id, con índice por id y versión del contenido"""
+
+    def __init__(self, ttl: float = CATALOGO_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items: Tuple[ItemCatalogo, ...] = ()
+        self._por_id: Dict[int, ItemCatalogo] = {}
+        self._version = ''
+        self._cargado = None  # (instante monotónico, _cambios) de la última carga
+
+    def _vigente(self) -> bool:
+        if self._cargado is None:
+            return False
+        instante, cambios = self._cargado
+        return cambios == _cambios and time.monotonic() - instante < self.ttl
+
+    def _asegurar(self):
+        if self._vigente():
+            return
+        with self._lock:
+            if self._vigente():
+                return
+            cambios = _cambios
+            filas = db.session.query(
+                Recompensa.id, Recompensa.nombre, Recompensa.descripcion, Recompensa.puntos, Recompensa.imagen
+            ).order_by(Recompensa.id).all()
+            items = tuple(ItemCatalogo(*fila) for fila in filas)
+            contenido = json.dumps([item._asdict() for item in items], sort_keys=True, ensure_ascii=False)
+            self._items = items
+            self._por_id = {item.id: item for item in items}
+            self._version = hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:16]
+            self._cargado = (time.monotonic(), cambios)
+
+    def recompensas(self) -> Tuple[ItemCatalogo, ...]:
+        self._asegurar()
+        return self._items
+
+    def obtener(self, recompensa_id: int) -> Optional[ItemCatalogo]:
+        self._asegurar()
+        return self._por_id.get(recompensa_id)
+
+    @property
+    def version(self) -> str:
+        self._asegurar()
+        return self._version
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado = None
+
+
+def init_reward_catalog(app) -> CatalogoRecompensas:
+    catalogo = CatalogoRecompensas()
+    with app.app_context():
+        catalogo.recompensas()
+    app.extensions['reward_catalog'] = catalogo
+    return catalogo
+
+
+def get_reward_catalog() -> CatalogoRecompensas:
+    return current_app.extensions['reward_catalog']
+
+
+def logros_de_usuario(usuario_id: int) -> List[Logro]:
+    """Canjes del usuario (más recientes primero) resueltos contra el catálogo, sin cargar filas de Recompensa"""
+    catalogo = get_reward_catalog()
+    filas = db.session.query(CanjeRecompensa.recompensa_id, CanjeRecompensa.fecha).filter(
+        CanjeRecompensa.usuario_id == usuario_id
+    ).order_by(CanjeRecompensa.fecha.desc()).all()
+    logros = []
+    for recompensa_id, fecha in filas:
+        recompensa = catalogo.obtener(recompensa_id)
+        if recompensa is not None:
+            logros.append(Logro(recompensa, fecha))
+    return logros
@@ -0,0 +1,94 @@
+"""
+Canje Atómico de Recompensas
+Un canje es una transacción corta de dos sentencias: el INSERT del canje y un
+UPDATE condicional que descuenta los puntos sólo si alcanzan. La condición la
+evalúa SQLite dentro del mismo UPDATE, así que dos canjes simultáneos no pueden
+dejar el puntaje en negativo y el lock de escritura dura lo que tardan esas
+dos sentencias.
+
+El INSERT va primero para que la transacción arranque escribiendo (toma el
+lock de escritura de entrada, sin escalar desde una lectura) y para que el
+índice único (usuario_id, clave_idempotencia) detecte un reintento antes de
+descontar nada: el reintento devuelve el canje original.
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.data.database import db
+from app.data.models.db_models import CanjeRecompensa, Usuario
+
+CANJEADO = 'canjeado'
+REPETIDO = 'repetido'          # misma clave de idempotencia que un canje ya confirmado
+SIN_PUNTOS = 'sin_puntos'
+
+MAX_CLAVE = 64
+
+_canjes = CanjeRecompensa.__table__
+_usuarios = Usuario.__table__
+
+
+class ResultadoCanje(NamedTuple):
+    estado: str
+    canje_id: Optional[int] = None
+    puntaje: Optional[int] = None     # puntaje después del canje
+    anterior: Optional[int] = None    # puntaje antes del canje (sólo si se descontó ahora)
+
+    @property
+    def exitoso(self) -> bool:
+        return self.estado in (CANJEADO, REPETIDO)
+
+
+def normalizar_clave(clave: Optional[str]) -> Optional[str]:
+    """Clave de idempotencia recortada; None si viene vacía o es demasiado larga"""
+    clave = (clave or '').strip()
+    if not clave or len(clave) > MAX_CLAVE:
+        return None
+    return clave
+
+
+def _canje_repetido(usuario_id: int, clave: str) -> Optional[ResultadoCanje]:
+    fila = db.session.execute(
+        select(_canjes.c.id, _usuarios.c.puntaje_maximo)
+        .join(_usuarios, _usuarios.c.id == _canjes.c.usuario_id)
+        .where(_canjes.c.usuario_id == usuario_id, _canjes.c.clave_idempotencia == clave)
+    ).first()
+    if fila is None:
+        return None
+    return ResultadoCanje(REPETIDO, fila.id, fila.puntaje_maximo)
+
+
+def canjear(usuario_id: int, recompensa_id: int, puntos: int, clave: Optional[str] = None) -> ResultadoCanje:
+    """
+    Canjea la recompensa descontando `puntos` al usuario en una única transacción.
+    Con `clave`, repetir la llamada devuelve el canje original (estado REPETIDO)
+    en lugar de canjear de nuevo.
+    """
+    try:
+        canje_id = db.session.execute(
+            insert(_canjes).values(
+                usuario_id=usuario_id, recompensa_id=recompensa_id,
+                fecha=datetime.utcnow(), clave_idempotencia=clave,
+            )
+        ).inserted_primary_key[0]
+    except IntegrityError:
+        db.session.rollback()
+        repetido = _canje_repetido(usuario_id, clave) if clave else None
+        if repetido is None:
+            raise
+        return repetido
+
+    puntaje = db.session.execute(
+        update(_usuarios)
+        .where(_usuarios.c.id == usuario_id, _usuarios.c.puntaje_maximo >= puntos)
+        .values(puntaje_maximo=_usuarios.c.puntaje_maximo - puntos)
+        .returning(_usuarios.c.puntaje_maximo)
+    ).scalar()
+    if puntaje is None:
+        # No alcanzan los puntos (o el usuario ya no existe): se descarta también el INSERT
+        db.session.rollback()
+        return ResultadoCanje(SIN_PUNTOS)
+    db.session.commit()
+    return ResultadoCanje(CANJEADO, canje_id, puntaje, puntaje + puntos)
@@ -0,0 +1,218 @@
+"""
+Buffer de Ingesta de Puntajes (write-behind)
+Acumula en memoria sólo el máximo pendiente por usuario y lo escribe en la base
+por lotes, en una única transacción cada N ms o M entradas, en lugar de hacer
+un UPDATE + COMMIT por partida. Se activa con SCORE_WRITE_BEHIND.
+
+Los récords se informan (`al_volcar`) recién después del commit del lote: así
+el servicio distribuido no vuelve a leer de la base un puntaje que todavía no
+se escribió al invalidar las estadísticas del usuario.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.data.data_version import avanzar_version
+from app.data.database import db
+
+UPDATE_LOTE = text("""
+    UPDATE usuarios SET puntaje_maximo = :puntaje, fecha_ultimo_juego = :fecha
+    WHERE id = :user_id AND puntaje_maximo < :puntaje
+""")
+
+
+class ScoreBuffer:
+    """Buffer de puntajes con coalescencia por usuario y un hilo de volcado en segundo plano"""
+
+    def __init__(self, app, intervalo_ms: int = 200, max_entradas: int = 500,
+                 al_volcar: Optional[Callable[[int, int, int], Any]] = None):
+        self.app = app
+        self.al_volcar = al_volcar
+        self.intervalo = intervalo_ms / 1000.0
+        self.max_entradas = max_entradas
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        # Máximo conocido por usuario (confirmado o pendiente de escribir)
+        self._maximos: Dict[int, int] = {}
+        # Pendientes de escribir: user_id -> (puntaje, fecha, máximo antes del primer pendiente)
+        self._pendientes: Dict[int, Tuple[int, datetime, int]] = {}
+        self._running = False
+        self._hilo: Optional[threading.Thread] = None
+        self._stats = {
+            'recibidos': 0,
+            'coalescidos': 0,
+            'escritos': 0,
+            'volcados': 0,
+            'errores': 0,
+            'ultimo_lote': 0,
+            'lote_maximo': 0,
+            'ultima_latencia_ms': 0.0,
+            'latencia_maxima_ms': 0.0,
+            'latencia_total_ms': 0.0,
+            'high_water_mark': 0,
+        }
+
+    def iniciar(self):
+        self._running = True
+        self._hilo = threading.Thread(target=self._bucle, name='score-buffer', daemon=True)
+        self._hilo.start()
+        atexit.register(self.detener)
+
+    def detener(self):
+        """Detiene el hilo y vuelca lo pendiente"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+        self.volcar()
+
+    def registrar(self, user_id: int, puntaje: int, puntaje_db: int) -> Tuple[bool, int, int]:
+        """
+        Registra un puntaje y responde (nuevo_record, puntaje_maximo, maximo_anterior)
+        sin tocar la base. `puntaje_db` es el máximo leído de la base, por si otro
+        camino lo modificó.
+        """
+        puntaje_db = puntaje_db or 0
+        with self._cond:
+            self._stats['recibidos'] += 1
+            maximo = max(self._maximos.get(user_id, puntaje_db), puntaje_db)
+            if puntaje <= maximo:
+                self._maximos[user_id] = maximo
+                return False, maximo, maximo
+
+            previo = self._pendientes.get(user_id)
+            if previo is not None:
+                self._stats['coalescidos'] += 1
+            self._maximos[user_id] = puntaje
+            # Coalescido: el evento del lote va del máximo ya escrito al último récord
+            self._pendientes[user_id] = (puntaje, datetime.utcnow(), maximo if previo is None else previo[2])
+            pendientes = len(self._pendientes)
+            if pendientes > self._stats['high_water_mark']:
+                self._stats['high_water_mark'] = pendientes
+            if pendientes >= self.max_entradas:
+                self._cond.notify()
+            return True, puntaje, maximo
+
+    def sincronizar(self, user_id: int):
+        """
+        Vuelca lo pendiente y olvida el máximo cacheado del usuario.
+        Se usa antes de que otro camino modifique su puntaje (canje, reinicio, eliminación).
+        """
+        self.volcar()
+        with self._cond:
+            self._maximos.pop(user_id, None)
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._pendientes) < self.max_entradas:
+                    self._cond.wait(self.intervalo)
+                if not self._running:
+                    return
+            self.volcar()
+
+    def volcar(self) -> int:
+        """Escribe en una transacción todos los máximos pendientes; devuelve el tamaño del lote"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pendientes:
+                    return 0
+                lote, self._pendientes = self._pendientes, {}
+
+            inicio = time.perf_counter()
+            filas = [
+                {'user_id': user_id, 'puntaje': puntaje, 'fecha': fecha}
+                for user_id, (puntaje, fecha, _) in lote.items()
+            ]
+            try:
+                with self.app.app_context():
+                    db.session.execute(UPDATE_LOTE, filas)
+                    db.session.commit()
+            except Exception as e:
+                with self.app.app_context():
+                    db.session.rollback()
+                self.app.logger.error(f'Error volcando puntajes: {e}')
+                with self._cond:
+                    self._stats['errores'] += 1
+                    # Reincorporar el lote sin pisar puntajes más nuevos
+                    for user_id, pendiente in lote.items():
+                        actual = self._pendientes.get(user_id)
+                        if actual is None or actual[0] < pendiente[0]:
+                            self._pendientes[user_id] = pendiente
+                        else:
+                            # El récord más nuevo, pero contado desde el máximo previo al lote fallido
+                            self._pendientes[user_id] = actual[:2] + pendiente[2:]
+                return 0
+
+            # El ranking ya reflejaba estos récords, pero se arma con filas de la base
+            avanzar_version()
+            if self.al_volcar is not None:
+                for user_id, (puntaje, _, anterior) in lote.items():
+                    try:
+                        self.al_volcar(user_id, puntaje, anterior)
+                    except Exception as e:
+                        self.app.logger.warning(f'No se pudo informar el récord de {user_id}: {e}')
+            latencia = (time.perf_counter() - inicio) * 1000
+            with self._cond:
+                self._stats['volcados'] += 1
+                self._stats['escritos'] += len(filas)
+                self._stats['ultimo_lote'] = len(filas)
+                self._stats['lote_maximo'] = max(self._stats['lote_maximo'], len(filas))
+                self._stats['ultima_latencia_ms'] = round(latencia, 3)
+                self._stats['latencia_maxima_ms'] = round(max(self._stats['latencia_maxima_ms'], latencia), 3)
+                self._stats['latencia_total_ms'] += latencia
+            return len(filas)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pendientes'] = len(self._pendientes)
+            stats['usuarios_cacheados'] = len(self._maximos)
+        volcados = stats['volcados']
+        stats['latencia_promedio_ms'] = round(stats.pop('latencia_total_ms') / volcados, 3) if volcados else 0.0
+        stats['lote_promedio'] = round(stats['escritos'] / volcados, 2) if volcados else 0.0
+        stats['intervalo_ms'] = int(self.intervalo * 1000)
+        stats['max_entradas'] = self.max_entradas
+        return stats
+
+
+def init_score_buffer(app, al_volcar: Optional[Callable[[int, int, int], Any]] = None) -> Optional[ScoreBuffer]:
+    """
+    Crea e inicia el buffer si la ingesta diferida está habilitada en la configuración.
+    `al_volcar(user_id, puntaje, anterior)` se llama por cada récord ya escrito en la base.
+    """
+    if not app.config.get('SCORE_WRITE_BEHIND'):
+        return None
+    buffer = ScoreBuffer(
+        app,
+        intervalo_ms=app.config.get('SCORE_FLUSH_INTERVAL_MS', 200),
+        max_entradas=app.config.get('SCORE_FLUSH_MAX_ENTRIES', 500),
+        al_volcar=al_volcar,
+    )
+    buffer.iniciar()
+    app.extensions['score_buffer'] = buffer
+    return buffer
+
+
+def get_score_buffer() -> Optional[ScoreBuffer]:
+    return current_app.extensions.get('score_buffer')
+
+
+def sincronizar_puntaje(user_id: int) -> bool:
+    """
+    Asegura que la base tenga el puntaje real antes de modificarlo por otro camino.
+    Devuelve True si hubo que volcar (y las instancias cargadas deben refrescarse).
+    """
+    buffer = get_score_buffer()
+    if buffer is None:
+        return False
+    buffer.sincronizar(user_id)
+    return True
@@ -0,0 +1,102 @@
+"""
+Manifiesto de Fotos Subidas
+Conjunto en memoria de los archivos que hay en la carpeta de fotos, para que
+las plantillas decidan al renderizar si una foto existe (y si no, usen la
+imagen por defecto) sin que el navegador tenga que probar cada URL.
+
+Lo actualizan los caminos que suben o borran archivos (edición de perfil,
+variantes, barrido) y un hilo que cada pocos segundos compara la fecha de
+modificación de la carpeta y la vuelve a listar si cambió: así también se ven
+los cambios hechos por otros procesos o a mano.
+"""
+import logging
+import os
+import threading
+from typing import FrozenSet, Optional
+
+from flask import current_app
+
+
+class ManifiestoUploads:
+    """Nombres de los archivos de la carpeta de fotos, seguros entre hilos"""
+
+    def __init__(self, carpeta: str, intervalo: float = 2.0, logger: Optional[logging.Logger] = None):
+        self.carpeta = carpeta
+        self.intervalo = intervalo
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._nombres: FrozenSet[str] = frozenset()
+        self._firma: Optional[int] = None
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.recargas = 0
+
+    def _firma_carpeta(self) -> Optional[int]:
+        # Crear, borrar o renombrar un archivo cambia la fecha de modificación del directorio
+        try:
+            return os.stat(self.carpeta).st_mtime_ns
+        except OSError:
+            return None
+
+    def recargar(self):
+        firma = self._firma_carpeta()
+        try:
+            nombres = frozenset(
+                entrada.name for entrada in os.scandir(self.carpeta)
+                if not entrada.name.startswith('.') and entrada.is_file()
+            )
+        except OSError:
+            nombres = frozenset()
+        with self._lock:
+            self._nombres = nombres
+            self._firma = firma
+            self.recargas += 1
+
+    def revisar(self) -> bool:
+        """Vuelve a listar la carpeta si cambió desde la última vez; True si lo hizo"""
+        if self._firma_carpeta() == self._firma:
+            return False
+        self.recargar()
+        return True
+
+    def existe(self, nombre: str) -> bool:
+        return nombre in self._nombres
+
+    def agregar(self, *nombres: str):
+        with self._lock:
+            self._nombres = self._nombres.union(nombres)
+
+    def quitar(self, *nombres: str):
+        with self._lock:
+            self._nombres = self._nombres.difference(nombres)
+
+    def __len__(self) -> int:
+        return len(self._nombres)
+
+    def iniciar(self):
+        self.recargar()
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name='upload-manifest', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.revisar()
+            except Exception as e:
+                self.logger.error(f'Error revisando la carpeta de fotos: {e}')
+
+
+def init_upload_manifest(app) -> ManifiestoUploads:
+    manifiesto = ManifiestoUploads(app.config['UPLOAD_FOLDER'], app.config.get('UPLOAD_MANIFEST_POLL', 2.0),
+                                   app.logger)
+    manifiesto.iniciar()
+    app.extensions['upload_manifest'] = manifiesto
+    return manifiesto
+
+
+def get_upload_manifest() -> Optional[ManifiestoUploads]:
+    return current_app.extensions.get('upload_manifest')
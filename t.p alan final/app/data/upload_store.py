@@ -0,0 +1,243 @@
+"""
+Almacenamiento de Fotos por Contenido
+Cada foto subida se guarda con el hash de su contenido como nombre
+(`<sha256[:32]>.<ext>`), calculado mientras se copia el stream a disco: dos
+subidas idénticas terminan en un único archivo y, como el contenido de una URL
+no cambia nunca, se sirven con `Cache-Control: immutable` a un año.
+
+Las referencias son las filas de `usuarios` que apuntan al archivo (por
+`foto_perfil` o por sus variantes). Un barrido periódico borra los archivos
+direccionados por contenido sin referencias que no se tocaron durante el
+período de gracia; los nombres anteriores (`<id>_<uuid>.<ext>`) no se barren.
+
+El barrido corre en un solo proceso: el de la línea de comandos con
+`--intervalo`, o la aplicación que tenga `UPLOAD_SWEEP_INTERVAL` distinto de 0
+(desactivado por defecto, porque cada worker y cada script que importa la
+aplicación arrancaría su propio hilo).
+
+Uso por línea de comandos:
+    python -m app.data.upload_store barrer      # un barrido inmediato
+    python -m app.data.upload_store barrer --intervalo 3600  # barre cada hora hasta Ctrl+C
+    python -m app.data.upload_store consolidar  # pasa las fotos existentes a nombres por contenido
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from flask import current_app, send_from_directory
+from sqlalchemy import text
+
+from app.data.database import db
+from app.data.models.db_models import Usuario
+
+BLOQUE = 64 * 1024
+LARGO_HASH = 32
+# Archivos del almacén: hash del original, opcionalmente con el tamaño de la variante
+PATRON_CONTENIDO = re.compile(r'^[0-9a-f]{%d}(?:_\d+)?\.[a-z0-9]+$' % LARGO_HASH)
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+EXTENSIONES_EQUIVALENTES = {'jpeg': 'jpg'}
+
+
+def es_inmutable(nombre: str) -> bool:
+    return bool(PATRON_CONTENIDO.match(nombre))
+
+
+def guardar_subida(stream, carpeta: str, ext: str) -> str:
+    """
+    Copia `stream` a la carpeta calculando el hash en el mismo recorrido y devuelve
+    el nombre por contenido. Si el archivo ya existía se descarta la copia.
+    """
+    ext = EXTENSIONES_EQUIVALENTES.get(ext, ext)
+    os.makedirs(carpeta, exist_ok=True)
+    digest = hashlib.sha256()
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix='.subida_')
+    try:
+        with os.fdopen(descriptor, 'wb') as destino:
+            while True:
+                bloque = stream.read(BLOQUE)
+                if not bloque:
+                    break
+                digest.update(bloque)
+                destino.write(bloque)
+        nombre = f'{digest.hexdigest()[:LARGO_HASH]}.{ext}'
+        ruta = os.path.join(carpeta, nombre)
+        if os.path.exists(ruta):
+            # Ya guardado: renovar la fecha para que el barrido no lo tome como huérfano
+            os.utime(ruta)
+            os.remove(temporal)
+        else:
+            os.replace(temporal, ruta)
+        return nombre
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def variantes_existentes(foto: str, user_id: int) -> Optional[str]:
+    """Variantes (JSON) de otro usuario con la misma foto, para no volver a generarlas"""
+    return db.session.query(Usuario.foto_variantes).filter(
+        Usuario.foto_perfil == foto, Usuario.foto_variantes.isnot(None), Usuario.id != user_id
+    ).limit(1).scalar()
+
+
+def referencias() -> Set[str]:
+    """Archivos a los que apunta algún usuario (foto original o variante)"""
+    referenciados = {foto for foto, in db.session.query(Usuario.foto_perfil).distinct() if foto}
+    # Sólo se decodifican las variantes distintas; la mayoría de las filas no tiene
+    for variantes, in db.session.query(Usuario.foto_variantes).filter(
+        Usuario.foto_variantes.isnot(None)
+    ).distinct():
+        # Formato de avatar_pipeline: {tamaño: {formato: archivo}}
+        for nombres in json.loads(variantes).values():
+            referenciados.update(nombres.values())
+    return referenciados
+
+
+def barrer(carpeta: str, gracia: float) -> List[str]:
+    """Borra los archivos por contenido sin referencias y sin modificar en los últimos `gracia` segundos"""
+    if not os.path.isdir(carpeta):
+        return []
+    referenciados = referencias()
+    limite = time.time() - gracia
+    borrados = []
+    for entrada in os.scandir(carpeta):
+        nombre = entrada.name
+        if nombre.startswith('.subida_'):
+            # Subida interrumpida
+            huerfano = entrada.stat().st_mtime < limite
+        else:
+            huerfano = (es_inmutable(nombre) and nombre not in referenciados
+                        and entrada.stat().st_mtime < limite)
+        if huerfano:
+            try:
+                os.remove(entrada.path)
+                borrados.append(nombre)
+            except OSError:
+                pass
+    return borrados
+
+
+def consolidar(carpeta: str) -> Dict[str, str]:
+    """
+    Renombra por contenido las fotos con nombre anterior y actualiza a sus usuarios.
+    Sus variantes se borran: hay que regenerarlas con `python -m app.data.avatar_pipeline`.
+    """
+    renombradas = {}
+    anteriores = []
+    filas = db.session.query(Usuario.id, Usuario.foto_perfil, Usuario.foto_variantes).filter(
+        Usuario.foto_perfil != 'default.svg'
+    ).all()
+    for user_id, foto, variantes in filas:
+        ruta = os.path.join(carpeta, foto or '')
+        if not foto or es_inmutable(foto) or not os.path.isfile(ruta):
+            continue
+        if variantes:
+            anteriores.extend(n for nombres in json.loads(variantes).values() for n in nombres.values())
+        if foto not in renombradas:
+            with open(ruta, 'rb') as origen:
+                renombradas[foto] = guardar_subida(origen, carpeta, foto.rsplit('.', 1)[-1].lower())
+        db.session.execute(text("""
+            UPDATE usuarios SET foto_perfil = :nueva, foto_variantes = NULL WHERE id = :user_id
+        """), {'nueva': renombradas[foto], 'user_id': user_id})
+    db.session.commit()
+    for nombre in list(renombradas) + anteriores:
+        try:
+            os.remove(os.path.join(carpeta, nombre))
+        except OSError:
+            pass
+    return renombradas
+
+
+def enviar_upload(nombre: str):
+    """Sirve un archivo subido; los direccionados por contenido, como inmutables"""
+    carpeta = current_app.config['UPLOAD_FOLDER']
+    if not es_inmutable(nombre):
+        return send_from_directory(carpeta, nombre)
+    respuesta = send_from_directory(carpeta, nombre, max_age=31536000)
+    respuesta.headers['Cache-Control'] = CACHE_INMUTABLE
+    return respuesta
+
+
+class BarridoUploads:
+    """Hilo que barre periódicamente la carpeta de fotos"""
+
+    def __init__(self, app, intervalo: float, gracia: float):
+        self.app = app
+        self.intervalo = intervalo
+        self.gracia = gracia
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.borrados = 0
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.ejecutar, name='upload-sweep', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def barrer(self) -> List[str]:
+        with self.app.app_context():
+            borrados = barrer(self.app.config['UPLOAD_FOLDER'], self.gracia)
+        self.borrados += len(borrados)
+        manifiesto = self.app.extensions.get('upload_manifest')
+        if borrados and manifiesto is not None:
+            manifiesto.quitar(*borrados)
+        return borrados
+
+    def ejecutar(self):
+        """Barre cada `intervalo` segundos hasta `detener()` (en el hilo que la llama)"""
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.barrer()
+            except Exception as e:
+                self.app.logger.error(f'Error barriendo fotos sin referencias: {e}')
+
+
+def init_upload_store(app) -> Optional[BarridoUploads]:
+    intervalo = app.config.get('UPLOAD_SWEEP_INTERVAL', 0)
+    if not intervalo:
+        return None
+    barrido = BarridoUploads(app, intervalo, app.config.get('UPLOAD_SWEEP_GRACE', 3600))
+    barrido.iniciar()
+    app.extensions['upload_sweep'] = barrido
+    return barrido
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mantenimiento de las fotos subidas')
+    parser.add_argument('comando', choices=['barrer', 'consolidar'])
+    parser.add_argument('--gracia', type=float, default=3600, help='segundos sin modificar antes de borrar')
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help='con barrer: repetir cada tantos segundos hasta Ctrl+C')
+    args = parser.parse_args(argv)
+
+    from app.app import app
+    carpeta = app.config['UPLOAD_FOLDER']
+    if args.comando == 'barrer' and args.intervalo > 0:
+        barrido = BarridoUploads(app, args.intervalo, args.gracia)
+        print(f'{len(barrido.barrer())} archivos borrados; barriendo cada {args.intervalo:g} s')
+        try:
+            barrido.ejecutar()
+        except KeyboardInterrupt:
+            print(f'{barrido.borrados} archivos borrados en total')
+        return
+    with app.app_context():
+        if args.comando == 'barrer':
+            borrados = barrer(carpeta, args.gracia)
+            print(f'{len(borrados)} archivos borrados')
+        else:
+            renombradas = consolidar(carpeta)
+            print(f'{len(renombradas)} fotos renombradas por contenido '
+                  f'({len(set(renombradas.values()))} archivos distintos)')
+
+
+if __name__ == '__main__':
+    main()
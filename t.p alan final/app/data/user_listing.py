@@ -0,0 +1,44 @@
+"""
+Listado de Usuarios para Administración
+Paginación por cursor (keyset sobre `id`) con búsqueda por nombre o email y
+proyección de columnas livianas: cada página cuesta lo mismo sin importar
+cuán adentro de la tabla esté y no se leen hashes de contraseña ni biografías.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+
+from app.data.database import db
+from app.data.models.db_models import Usuario
+
+TAMANO_PAGINA = 50
+MAX_PAGINA = 200
+
+COLUMNAS = (Usuario.id, Usuario.nombre, Usuario.email, Usuario.es_admin, Usuario.puntaje_maximo)
+
+
+def _patron_like(texto: str) -> str:
+    escapado = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escapado}%'
+
+
+def pagina_usuarios(despues_de: int = 0, limite: int = TAMANO_PAGINA,
+                    busqueda: str = '') -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Usuarios con id mayor a `despues_de`, en orden de id, filtrados por `busqueda`
+    (contenida en el nombre o el email). Devuelve la página y el cursor de la
+    siguiente (None si es la última).
+    """
+    limite = max(1, min(limite, MAX_PAGINA))
+    consulta = db.session.query(*COLUMNAS).filter(Usuario.id > despues_de)
+    busqueda = busqueda.strip()
+    if busqueda:
+        patron = _patron_like(busqueda)
+        consulta = consulta.filter(or_(
+            Usuario.nombre.ilike(patron, escape='\\'),
+            Usuario.email.ilike(patron, escape='\\'),
+        ))
+    # Una fila de más para saber si hay otra página sin contar el total
+    filas = consulta.order_by(Usuario.id.asc()).limit(limite + 1).all()
+    siguiente = filas[limite - 1].id if len(filas) > limite else None
+    return [dict(fila._mapping) for fila in filas[:limite]], siguiente
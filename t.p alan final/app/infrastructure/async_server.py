@@ -0,0 +1,167 @@
+"""
+Motor de Servidor TCP basado en asyncio
+Alternativa al modelo de un hilo por conexión: un único event loop atiende
+todas las conexiones (v1 y v2) y el trabajo bloqueante (sqlite3) se ejecuta
+en un pool de hilos de tamaño fijo. Si el pool está saturado, se responde
+`busy` en lugar de encolar trabajo sin límite. Las acciones que sólo esperan
+(long-poll) se registran en `acciones_async` y corren en el event loop, sin
+ocupar el pool ni contar para ese límite.
+
+Lo usan tcp_server.start_server() y DistributedService.start_server() cuando
+el motor configurado es 'asyncio'.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.infrastructure.protocol import (
+    CABECERA, KEEPALIVE_TIMEOUT, MAGIC_V2, MAX_MENSAJE, ProtocolError,
+    codec_respuesta, codificar_trama, codificar_v1, decodificar_cuerpo
+)
+
+# Configuración de los motores de servidor
+SERVER_ENGINE = os.environ.get('TCP_SERVER_ENGINE', 'threads')  # 'threads' o 'asyncio'
+BACKLOG = int(os.environ.get('TCP_BACKLOG', '128'))
+DB_WORKERS = int(os.environ.get('TCP_DB_WORKERS', '8'))
+
+RESPUESTA_BUSY = {"success": False, "error": "busy"}
+
+
+class AsyncTCPServer:
+    """Servidor TCP asyncio con pool acotado para las acciones bloqueantes"""
+
+    def __init__(self, procesar: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 decodificar_v1: Callable[[bytes], Dict[str, Any]],
+                 error_formato: str = 'invalid_json', nombre: str = 'TCP',
+                 backlog: int = BACKLOG, workers: int = DB_WORKERS,
+                 max_pendientes: Optional[int] = None,
+                 acciones_async: Optional[Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]]] = None):
+        self.procesar = procesar
+        self.acciones_async = acciones_async or {}
+        self.decodificar_v1 = decodificar_v1
+        self.error_formato = error_formato
+        self.nombre = nombre
+        self.backlog = backlog
+        self.workers = workers
+        # Trabajos admitidos (en ejecución + en cola del pool) antes de responder `busy`
+        self.max_pendientes = max_pendientes or workers * 2
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._pendientes = 0
+        self.stats = {'conexiones': 0, 'peticiones': 0, 'rechazadas_busy': 0}
+
+    async def _ejecutar(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        accion = self.acciones_async.get(payload.get('action')) if isinstance(payload, dict) else None
+        if accion is not None:
+            self.stats['peticiones'] += 1
+            try:
+                return await accion(payload)
+            except Exception as e:
+                return {"success": False, "error": "server_error", "details": str(e)}
+        if self._pendientes >= self.max_pendientes:
+            self.stats['rechazadas_busy'] += 1
+            return RESPUESTA_BUSY
+        self._pendientes += 1
+        self.stats['peticiones'] += 1
+        try:
+            return await self._loop.run_in_executor(self._executor, self.procesar, payload)
+        except Exception as e:
+            return {"success": False, "error": "server_error", "details": str(e)}
+        finally:
+            self._pendientes -= 1
+
+    async def _responder_v2(self, writer: asyncio.StreamWriter, request_id: int, codec: int, cuerpo: bytes):
+        try:
+            payload = decodificar_cuerpo(codec, cuerpo)
+        except ProtocolError:
+            respuesta = {"success": False, "error": self.error_formato}
+        else:
+            respuesta = await self._ejecutar(payload)
+        if not writer.is_closing():
+            writer.write(codificar_trama(request_id, respuesta, codec_respuesta(codec)))
+            await writer.drain()
+
+    async def _atender_v2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, primero: bytes):
+        # Las peticiones de una misma conexión se procesan en paralelo; el id las correlaciona
+        tareas = set()
+        try:
+            while True:
+                if primero:
+                    cabecera = primero + await reader.readexactly(CABECERA.size - len(primero))
+                    primero = b''
+                else:
+                    cabecera = await asyncio.wait_for(reader.readexactly(CABECERA.size), KEEPALIVE_TIMEOUT)
+                magic, codec, request_id, longitud = CABECERA.unpack(cabecera)
+                if magic != MAGIC_V2 or longitud > MAX_MENSAJE:
+                    return
+                cuerpo = await reader.readexactly(longitud)
+                tarea = asyncio.ensure_future(self._responder_v2(writer, request_id, codec, cuerpo))
+                tareas.add(tarea)
+                tarea.add_done_callback(tareas.discard)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return
+        finally:
+            if tareas:
+                await asyncio.gather(*tareas, return_exceptions=True)
+
+    async def _atender_v1(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, primero: bytes):
+        try:
+            resto = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            resto = e.partial
+        except asyncio.LimitOverrunError:
+            return
+        try:
+            payload = self.decodificar_v1(primero + resto)
+        except Exception:
+            respuesta = {"success": False, "error": self.error_formato}
+        else:
+            respuesta = await self._ejecutar(payload)
+        writer.write(codificar_v1(respuesta))
+        await writer.drain()
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats['conexiones'] += 1
+        try:
+            primero = await reader.read(1)
+            if not primero:
+                return
+            if primero[0] == MAGIC_V2:
+                await self._atender_v2(reader, writer, primero)
+            else:
+                await self._atender_v1(reader, writer, primero)
+        except (ConnectionError, asyncio.CancelledError):
+            # Cliente desconectado o servidor deteniéndose
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _servir(self, host: str, port: int):
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'{self.nombre.lower()}-db')
+        self._server = await asyncio.start_server(
+            self._atender, host, port, backlog=self.backlog, limit=MAX_MENSAJE, reuse_address=True
+        )
+        print(f"[{self.nombre}] Servidor asyncio escuchando en {host}:{port} "
+              f"(backlog={self.backlog}, workers={self.workers})")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def serve_forever(self, host: str, port: int):
+        """Bloquea el hilo actual atendiendo conexiones hasta que se llame a detener()"""
+        asyncio.run(self._servir(host, port))
+
+    def detener(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
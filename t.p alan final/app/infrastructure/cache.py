@@ -0,0 +1,94 @@
+"""
+Caché LRU con Expiración
+Caché en memoria acotada por cantidad de entradas y por bytes aproximados,
+con tiempo de vida por entrada. Segura entre hilos.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def tamano_aproximado(valor: Any) -> int:
+    """Bytes que ocuparía el valor serializado; referencia estable para el tope de memoria"""
+    try:
+        return len(json.dumps(valor, default=str, separators=(',', ':')))
+    except (TypeError, ValueError):
+        return len(repr(valor))
+
+
+class LRUCache:
+    """Caché LRU+TTL con contadores de aciertos, fallos y desalojos"""
+
+    def __init__(self, max_entradas: int = 10000, max_bytes: int = 4 * 1024 * 1024, ttl: float = 30.0):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # clave -> (valor, vence, tamaño); el final del OrderedDict es lo más reciente
+        self._datos: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, clave: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._stats['misses'] += 1
+                return None
+            valor, vence, _ = entrada
+            if vence <= time.monotonic():
+                self._quitar(clave)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._datos.move_to_end(clave)
+            self._stats['hits'] += 1
+            return valor
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None, tamano: Optional[int] = None):
+        """Guarda el valor; `tamano` evita estimarlo cuando quien llama ya lo conoce (p. ej. bytes)"""
+        if tamano is None:
+            tamano = tamano_aproximado(valor)
+        if tamano > self.max_bytes:
+            return
+        vence = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (valor, vence, tamano)
+            self._bytes += tamano
+            while self._datos and (len(self._datos) > self.max_entradas or self._bytes > self.max_bytes):
+                antigua, _ = next(iter(self._datos.items()))
+                self._quitar(antigua)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, clave: Hashable) -> bool:
+        with self._lock:
+            if clave not in self._datos:
+                return False
+            self._quitar(clave)
+            self._stats['invalidations'] += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def _quitar(self, clave: Hashable):
+        _, _, tamano = self._datos.pop(clave)
+        self._bytes -= tamano
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entradas'] = len(self._datos)
+            stats['bytes'] = self._bytes
+        consultas = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / consultas, 4) if consultas else 0.0
+        stats['max_entradas'] = self.max_entradas
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl'] = self.ttl
+        return stats
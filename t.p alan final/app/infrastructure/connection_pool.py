@@ -0,0 +1,199 @@
+"""
+Pool de Conexiones Persistentes (protocolo v2)
+Reutiliza sockets hacia los servicios TCP en lugar de abrir una conexión por
+petición. Es seguro entre hilos: cada conexión la usa un solo hilo a la vez.
+"""
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.infrastructure.protocol import (
+    CODEC_JSON, CODECS, KEEPALIVE_TIMEOUT, ProtocolError, codificar_trama, decodificar_cuerpo
+)
+from app.infrastructure.stream_reader import FramedReader
+
+# Codec preferido para las tramas v2 ('json' o 'binary'); se negocia por conexión
+CODEC_PREFERIDO = CODECS.get(os.environ.get('TCP_CODEC', 'json'), CODEC_JSON)
+
+# Acciones que se pueden repetir sin efecto extra (lecturas, o escrituras que sólo guardan
+# el máximo): son las únicas que se reenvían si falla una conexión reutilizada
+ACCIONES_IDEMPOTENTES = frozenset({
+    'ping', 'get_user_stats', 'get_user_stats_many', 'get_global_stats', 'get_notifications',
+    'wait_notifications', 'invalidate', 'cache_stats', 'save_score', 'save_scores',
+})
+
+
+class ConexionPersistente:
+    """Conexión v2 a un servicio; admite varias peticiones en vuelo (pipelining)"""
+
+    def __init__(self, host: str, port: int, timeout: float, codec: int = CODEC_JSON):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.lector = FramedReader(self.sock)
+        self._siguiente_id = 0
+        self.codec = CODEC_JSON
+        if codec != CODEC_JSON:
+            try:
+                self.codec = self._negociar(codec)
+            except Exception:
+                self.cerrar()
+                raise
+        self.ultimo_uso = time.monotonic()
+
+    def _negociar(self, codec: int) -> int:
+        """
+        Envía un ping con el codec pedido: si el servidor contesta en ese codec, lo
+        usa la conexión; un servidor que no lo conoce responde en JSON.
+        """
+        self.sock.sendall(codificar_trama(self._nuevo_id(), {'action': 'ping'}, codec))
+        trama = self.lector.leer_trama()
+        if trama is None:
+            raise ConnectionResetError("El servidor cerró la conexión")
+        codec_respuesta, _, cuerpo = trama
+        try:
+            ok = decodificar_cuerpo(codec_respuesta, cuerpo).get('success')
+        except ProtocolError:
+            ok = False
+        return codec if ok and codec_respuesta == codec else CODEC_JSON
+
+    def viva(self) -> bool:
+        """False si el servidor ya cerró el socket (EOF o error pendiente) antes de enviarle nada"""
+        timeout = self.sock.gettimeout()
+        try:
+            self.sock.settimeout(0)
+            self.sock.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return True  # nada para leer: sigue abierta
+        except OSError:
+            return False
+        finally:
+            self.sock.settimeout(timeout)
+        # EOF (b'') o bytes que nadie pidió: no se puede reutilizar
+        return False
+
+    def _nuevo_id(self) -> int:
+        self._siguiente_id = (self._siguiente_id + 1) & 0xFFFFFFFF
+        return self._siguiente_id
+
+    def enviar_varias(self, payloads: List[Dict[str, Any]], timeout: float) -> List[Dict[str, Any]]:
+        """Envía todas las peticiones de una vez y espera sus respuestas, en cualquier orden"""
+        ids = [self._nuevo_id() for _ in payloads]
+        self.sock.settimeout(timeout)
+        self.sock.sendall(b''.join(codificar_trama(rid, p, self.codec) for rid, p in zip(ids, payloads)))
+
+        respuestas: Dict[int, Dict[str, Any]] = {}
+        pendientes = set(ids)
+        while pendientes:
+            trama = self.lector.leer_trama()
+            if trama is None:
+                raise ConnectionResetError("El servidor cerró la conexión")
+            codec, request_id, cuerpo = trama
+            if request_id in pendientes:
+                pendientes.discard(request_id)
+                respuestas[request_id] = decodificar_cuerpo(codec, cuerpo)
+        self.ultimo_uso = time.monotonic()
+        return [respuestas[rid] for rid in ids]
+
+    def cerrar(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones persistentes hacia un host:puerto"""
+
+    def __init__(self, host: str, port: int, max_conexiones: int = 8, timeout: float = 3.0,
+                 max_inactividad: float = KEEPALIVE_TIMEOUT / 2, codec: int = CODEC_PREFERIDO):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.codec = codec
+        self.max_inactividad = max_inactividad
+        self._libres: deque = deque()
+        self._lock = threading.Lock()
+        self._cupos = threading.BoundedSemaphore(max_conexiones)
+        self._stats = {'creadas': 0, 'reutilizadas': 0, 'descartadas': 0}
+
+    def _obtener(self) -> Tuple[ConexionPersistente, bool]:
+        ahora = time.monotonic()
+        with self._lock:
+            while self._libres:
+                conexion = self._libres.pop()
+                # Descartar las que el servidor probablemente (o seguro) ya cerró por inactividad
+                if ahora - conexion.ultimo_uso < self.max_inactividad and conexion.viva():
+                    self._stats['reutilizadas'] += 1
+                    return conexion, True
+                self._stats['descartadas'] += 1
+                conexion.cerrar()
+            self._stats['creadas'] += 1
+        return ConexionPersistente(self.host, self.port, self.timeout, self.codec), False
+
+    def _devolver(self, conexion: ConexionPersistente):
+        with self._lock:
+            self._libres.append(conexion)
+
+    def enviar_varias(self, payloads: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        timeout = self.timeout if timeout is None else timeout
+        if not self._cupos.acquire(timeout=timeout):
+            raise TimeoutError("No hay conexiones libres en el pool")
+        try:
+            conexion, reutilizada = self._obtener()
+            try:
+                respuestas = conexion.enviar_varias(payloads, timeout)
+            except ConnectionError:
+                conexion.cerrar()
+                if not reutilizada or not all(p.get('action') in ACCIONES_IDEMPOTENTES for p in payloads):
+                    # El servidor pudo haber ejecutado parte del lote: reenviarlo duplicaría eventos
+                    raise
+                # El servidor cerró una conexión ociosa: reintentar una vez con una nueva
+                conexion, _ = self._obtener_nueva()
+                try:
+                    respuestas = conexion.enviar_varias(payloads, timeout)
+                except Exception:
+                    conexion.cerrar()
+                    raise
+            except Exception:
+                conexion.cerrar()
+                raise
+            self._devolver(conexion)
+            return respuestas
+        finally:
+            self._cupos.release()
+
+    def _obtener_nueva(self) -> Tuple[ConexionPersistente, bool]:
+        with self._lock:
+            self._stats['creadas'] += 1
+        return ConexionPersistente(self.host, self.port, self.timeout, self.codec), False
+
+    def enviar(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self.enviar_varias([payload], timeout)[0]
+
+    def cerrar(self):
+        with self._lock:
+            while self._libres:
+                self._libres.pop().cerrar()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['libres'] = len(self._libres)
+        return stats
+
+
+_pools: Dict[Tuple[str, int], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(host: str, port: int) -> ConnectionPool:
+    """Devuelve el pool compartido del proceso para host:puerto"""
+    clave = (host, port)
+    with _pools_lock:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = _pools[clave] = ConnectionPool(host, port)
+        return pool
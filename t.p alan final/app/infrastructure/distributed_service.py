@@ -2,14 +2,28 @@
 Servicio Distribuido de Notificaciones y Estadísticas
 Este servicio se comunica con el servidor principal usando sockets y serialización
 """
+import asyncio
 import socket
 import threading
 import json
+import codecs
 import pickle
+import queue
 import sqlite3
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.infrastructure.async_server import BACKLOG, SERVER_ENGINE, AsyncTCPServer
+from app.infrastructure.cache import LRUCache
+from app.infrastructure.connection_pool import obtener_pool
+from app.infrastructure.global_stats import AgregadosGlobales
+from app.infrastructure.notification_store import NotificationStore
+from app.infrastructure.protocol import (
+    KEEPALIVE_TIMEOUT, MAGIC_V2, ProtocolError, codec_respuesta, codificar_trama, codificar_v1,
+    decodificar_cuerpo
+)
+from app.infrastructure.stream_reader import FramedReader
 
 # Configuración del servicio distribuido
 DISTRIBUTED_HOST = os.environ.get('DISTRIBUTED_HOST', '127.0.0.1')
@@ -17,6 +31,23 @@ DISTRIBUTED_PORT = int(os.environ.get('DISTRIBUTED_PORT', '7000'))
 MAIN_SERVER_HOST = os.environ.get('MAIN_SERVER_HOST', '127.0.0.1')
 MAIN_SERVER_PORT = int(os.environ.get('MAIN_SERVER_PORT', '5000'))
 
+# Espera máxima de una petición wait_notifications (long-poll)
+NOTIFICATIONS_WAIT_MAX = 30.0
+
+# Caché de estadísticas por usuario
+STATS_CACHE_MAX_ENTRIES = int(os.environ.get('STATS_CACHE_MAX_ENTRIES', '10000'))
+STATS_CACHE_MAX_BYTES = int(os.environ.get('STATS_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', '30'))
+
+# Columnas de get_user_stats y tope de ids por get_user_stats_many
+# (por debajo del límite de 999 parámetros de SQLite antiguos)
+COLUMNAS_STATS = "id, nombre, email, puntaje_maximo, fecha_ultimo_juego, fecha_registro"
+MAX_LOTE_STATS = 500
+
+# Eventos de usuario en espera de envío y cuántos se mandan juntos por conexión
+USER_EVENTS_MAX_PENDING = int(os.environ.get('USER_EVENTS_MAX_PENDING', '1000'))
+USER_EVENTS_LOTE = 64
+
 # Ruta a la base de datos - usar la misma lógica que tcp_server.py
 # Intentar múltiples ubicaciones para compatibilidad
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -42,157 +73,272 @@ if DB_PATH is None:
 class DistributedService:
     """Servicio distribuido que maneja notificaciones y estadísticas"""
     
-    def __init__(self):
-        self.stats_cache = {}
-        self.notifications_queue = []
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or DB_PATH
+        self.stats_cache = LRUCache(STATS_CACHE_MAX_ENTRIES, STATS_CACHE_MAX_BYTES, STATS_CACHE_TTL)
+        self.notifications = NotificationStore()
         self.running = False
+        self._async_server: Optional[AsyncTCPServer] = None
+        # Agregados de get_global_stats, mantenidos por eventos en vez de recalculados
+        self.estadisticas = AgregadosGlobales(self.db_path)
         
+    @staticmethod
+    def _stats_de_fila(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'user_id': row['id'],
+            'nombre': row['nombre'],
+            'email': row['email'],
+            'puntaje_maximo': row['puntaje_maximo'],
+            'fecha_ultimo_juego': row['fecha_ultimo_juego'],
+            'fecha_registro': row['fecha_registro']
+        }
+
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
-        """Obtiene estadísticas de un usuario desde la base de datos"""
+        """Obtiene estadísticas de un usuario, desde la caché o la base de datos"""
+        stats = self.stats_cache.get(user_id)
+        if stats is not None:
+            return stats
         try:
-            with sqlite3.connect(DB_PATH) as conn:
+            with sqlite3.connect(self.db_path) as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, nombre, email, puntaje_maximo, 
-                           fecha_ultimo_juego, fecha_registro
-                    FROM usuarios WHERE id = ?
-                """, (user_id,))
+                cursor.execute(f"SELECT {COLUMNAS_STATS} FROM usuarios WHERE id = ?", (user_id,))
                 row = cursor.fetchone()
                 if row:
-                    return {
-                        'user_id': row['id'],
-                        'nombre': row['nombre'],
-                        'email': row['email'],
-                        'puntaje_maximo': row['puntaje_maximo'],
-                        'fecha_ultimo_juego': row['fecha_ultimo_juego'],
-                        'fecha_registro': row['fecha_registro']
-                    }
+                    stats = self._stats_de_fila(row)
+                    self.stats_cache.set(user_id, stats)
+                    return stats
         except Exception as e:
             print(f"Error obteniendo estadísticas: {e}")
         return {}
+
+    def get_user_stats_many(self, user_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Estadísticas de varios usuarios, en el orden pedido ({} si no existe).
+        Los que no están en caché se leen con una sola consulta `WHERE id IN (...)`.
+        """
+        encontrados: Dict[int, Dict[str, Any]] = {}
+        faltantes = []
+        for user_id in dict.fromkeys(user_ids):
+            stats = self.stats_cache.get(user_id)
+            if stats is not None:
+                encontrados[user_id] = stats
+            else:
+                faltantes.append(user_id)
+        if faltantes:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.row_factory = sqlite3.Row
+                    marcadores = ','.join('?' * len(faltantes))
+                    for row in conn.execute(
+                            f"SELECT {COLUMNAS_STATS} FROM usuarios WHERE id IN ({marcadores})", faltantes):
+                        stats = self._stats_de_fila(row)
+                        self.stats_cache.set(row['id'], stats)
+                        encontrados[row['id']] = stats
+            except Exception as e:
+                print(f"Error obteniendo estadísticas: {e}")
+        return [encontrados.get(user_id, {}) for user_id in user_ids]
     
     def get_global_stats(self) -> Dict[str, Any]:
-        """Obtiene estadísticas globales del sistema"""
+        """Obtiene estadísticas globales del sistema desde los agregados en memoria"""
         try:
-            with sqlite3.connect(DB_PATH) as conn:
-                cursor = conn.cursor()
-                
-                # Total de usuarios
-                cursor.execute("SELECT COUNT(*) FROM usuarios")
-                total_usuarios = cursor.fetchone()[0]
-                
-                # Usuarios activos (con puntaje > 0)
-                cursor.execute("SELECT COUNT(*) FROM usuarios WHERE puntaje_maximo > 0")
-                usuarios_activos = cursor.fetchone()[0]
-                
-                # Puntaje promedio
-                cursor.execute("SELECT AVG(puntaje_maximo) FROM usuarios WHERE es_admin = 0")
-                promedio = cursor.fetchone()[0] or 0
-                
-                # Puntaje máximo global
-                cursor.execute("SELECT MAX(puntaje_maximo) FROM usuarios WHERE es_admin = 0")
-                max_puntaje = cursor.fetchone()[0] or 0
-                
-                return {
-                    'total_usuarios': total_usuarios,
-                    'usuarios_activos': usuarios_activos,
-                    'puntaje_promedio': round(promedio, 2),
-                    'puntaje_maximo_global': max_puntaje,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
+            return self.estadisticas.snapshot()
         except Exception as e:
             print(f"Error obteniendo estadísticas globales: {e}")
         return {}
     
     def add_notification(self, user_id: int, message: str, notification_type: str = 'info'):
-        """Agrega una notificación a la cola"""
-        notification = {
-            'user_id': user_id,
-            'message': message,
-            'type': notification_type,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        self.notifications_queue.append(notification)
-        # Mantener solo las últimas 100 notificaciones
-        if len(self.notifications_queue) > 100:
-            self.notifications_queue.pop(0)
+        """Agrega una notificación al buffer del usuario"""
+        return self.notifications.agregar(user_id, message, notification_type)
     
     def get_notifications(self, user_id: Optional[int] = None) -> list:
         """Obtiene notificaciones, opcionalmente filtradas por usuario"""
         if user_id:
-            return [n for n in self.notifications_queue if n['user_id'] == user_id]
-        return self.notifications_queue[-10:]  # Últimas 10 notificaciones
+            return self.notifications.de_usuario(user_id)
+        return self.notifications.recientes(10)  # Últimas 10 notificaciones
     
-    def handle_client_request(self, conn: socket.socket, addr: tuple):
-        """Maneja las peticiones de clientes al servicio distribuido"""
+    def procesar_peticion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecuta una acción del servicio y devuelve la respuesta (independiente del transporte)"""
+        if not isinstance(request, dict):
+            # JSON (o Pickle) válido pero no un objeto (p. ej. `[1]`)
+            return {"success": False, "error": "invalid_request_format"}
+        action = request.get('action')
+        response = {"success": False, "error": "unknown_action"}
+        
+        if action == 'get_user_stats':
+            user_id = request.get('user_id')
+            if user_id:
+                stats = self.get_user_stats(user_id)
+                response = {"success": True, "stats": stats}
+        
+        elif action == 'get_user_stats_many':
+            user_ids = request.get('user_ids')
+            if (isinstance(user_ids, list) and len(user_ids) <= MAX_LOTE_STATS
+                    and all(type(u) is int for u in user_ids)):
+                response = {"success": True, "stats": self.get_user_stats_many(user_ids)}
+            else:
+                response = {"success": False, "error": "invalid_params", "max": MAX_LOTE_STATS}
+        
+        elif action == 'get_global_stats':
+            stats = self.get_global_stats()
+            response = {"success": True, "stats": stats}
+        
+        elif action == 'add_notification':
+            user_id = request.get('user_id')
+            message = request.get('message')
+            notif_type = request.get('type', 'info')
+            if user_id and message:
+                self.add_notification(user_id, message, notif_type)
+                response = {"success": True, "message": "Notification added"}
+        
+        elif action == 'get_notifications':
+            user_id = request.get('user_id')
+            notifications = self.get_notifications(user_id)
+            response = {"success": True, "notifications": notifications}
+        
+        elif action == 'user_event':
+            # Alta, baja o cambio de puntaje de un usuario: actualiza los agregados globales
+            if self.estadisticas.aplicar_evento(request):
+                if request.get('user_id'):
+                    self.stats_cache.invalidate(request['user_id'])
+                response = {"success": True}
+            else:
+                response = {"success": False, "error": "invalid_event"}
+        
+        elif action == 'wait_notifications':
+            since, timeout = self._parametros_espera(request)
+            if since is None:
+                response = self._respuesta_espera([], self.notifications.ultimo_id)
+            else:
+                response = self._respuesta_espera(self.notifications.esperar(since, timeout), since)
+        
+        elif action == 'invalidate':
+            user_id = request.get('user_id')
+            if user_id:
+                response = {"success": True, "invalidated": self.stats_cache.invalidate(user_id)}
+        
+        elif action == 'cache_stats':
+            response = {"success": True, "cache": self.stats_cache.stats()}
+        
+        elif action == 'ping':
+            response = {"success": True, "pong": True, "service": "distributed",
+                        "cache": self.stats_cache.stats()}
+        
+        return response
+    
+    def _parametros_espera(self, request: Dict[str, Any]) -> tuple:
+        """(since, timeout) de un wait_notifications; sin `since` sólo se informa el cursor actual"""
+        since = request.get('since')
+        if since is None:
+            return None, 0.0
+        since = int(since)
+        if since > self.notifications.ultimo_id:
+            # Cursor de antes de un reinicio del servicio: empezar por las recientes
+            since = 0
+        return since, min(float(request.get('timeout', 20)), NOTIFICATIONS_WAIT_MAX)
+    
+    @staticmethod
+    def _respuesta_espera(notifications: List[Dict[str, Any]], since: int) -> Dict[str, Any]:
+        last_id = notifications[-1]['id'] if notifications else since
+        return {"success": True, "notifications": notifications, "last_id": last_id}
+    
+    async def _esperar_notificaciones(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """wait_notifications en el event loop (motor asyncio): la espera no ocupa un hilo del pool"""
+        since, timeout = self._parametros_espera(request)
+        if since is None:
+            return self._respuesta_espera([], self.notifications.ultimo_id)
+        loop = asyncio.get_running_loop()
+        llego = asyncio.Event()
+        
+        def avisar():
+            loop.call_soon_threadsafe(llego.set)
+        
+        self.notifications.suscribir(avisar)
         try:
-            # Leer datos del cliente
-            data = b''
-            while True:
-                chunk = conn.recv(4096)
-                if not chunk:
-                    break
-                data += chunk
-                if b'\n' in chunk:
-                    break
-            
-            if not data:
-                return
-            
-            # Deserializar usando JSON
+            # Se revisa después de suscribirse: una notificación anterior ya no avisaría
+            if self.notifications.ultimo_id <= since:
+                await asyncio.wait_for(llego.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.notifications.desuscribir(avisar)
+        return self._respuesta_espera(self.notifications.nuevas(since), since)
+    
+    @staticmethod
+    def _decodificar_v1(data) -> Dict[str, Any]:
+        """Deserializa una petición v1: JSON, o Pickle si JSON falla"""
+        try:
+            return json.loads(codecs.utf_8_decode(data)[0].strip())
+        except (UnicodeDecodeError, json.JSONDecodeError, RecursionError):
             try:
-                request = json.loads(data.decode('utf-8').strip())
-            except json.JSONDecodeError:
-                # Intentar con pickle si JSON falla
+                return pickle.loads(data)
+            except Exception as e:
+                raise ValueError(f"Formato de petición inválido: {e}")
+    
+    def _atender_v1(self, conn: socket.socket, lector: FramedReader):
+        """Protocolo v1: una línea (JSON o Pickle) por conexión"""
+        linea = lector.leer_linea()
+        if linea is None:
+            return
+        
+        try:
+            request = json.loads(codecs.utf_8_decode(linea)[0].strip())
+        except (UnicodeDecodeError, json.JSONDecodeError, RecursionError):
+            # Pickle binario puede contener '\n': decodificar todo lo recibido
+            try:
+                request = self._decodificar_v1(bytes(linea) + b'\n' + bytes(lector.resto_en_buffer()))
+            except ValueError:
+                conn.sendall(codificar_v1({
+                    "success": False, 
+                    "error": "invalid_request_format"
+                }))
+                return
+        
+        # Enviar respuesta serializada en JSON
+        conn.sendall(codificar_v1(self.procesar_peticion(request)))
+    
+    def _atender_v2(self, conn: socket.socket, lector: FramedReader):
+        """Protocolo v2: tramas con id sobre una conexión persistente"""
+        try:
+            for codec, request_id, cuerpo in lector.tramas():
                 try:
-                    request = pickle.loads(data)
-                except Exception:
-                    conn.sendall((json.dumps({
-                        "success": False, 
-                        "error": "invalid_request_format"
-                    }) + "\n").encode('utf-8'))
+                    request = decodificar_cuerpo(codec, cuerpo)
+                except ProtocolError:
+                    response = {"success": False, "error": "invalid_request_format"}
+                else:
+                    response = self.procesar_peticion(request)
+                conn.sendall(codificar_trama(request_id, response, codec_respuesta(codec)))
+                if not self.running:
                     return
-            
-            action = request.get('action')
-            response = {"success": False, "error": "unknown_action"}
-            
-            if action == 'get_user_stats':
-                user_id = request.get('user_id')
-                if user_id:
-                    stats = self.get_user_stats(user_id)
-                    response = {"success": True, "stats": stats}
-            
-            elif action == 'get_global_stats':
-                stats = self.get_global_stats()
-                response = {"success": True, "stats": stats}
-            
-            elif action == 'add_notification':
-                user_id = request.get('user_id')
-                message = request.get('message')
-                notif_type = request.get('type', 'info')
-                if user_id and message:
-                    self.add_notification(user_id, message, notif_type)
-                    response = {"success": True, "message": "Notification added"}
-            
-            elif action == 'get_notifications':
-                user_id = request.get('user_id')
-                notifications = self.get_notifications(user_id)
-                response = {"success": True, "notifications": notifications}
-            
-            elif action == 'ping':
-                response = {"success": True, "pong": True, "service": "distributed"}
-            
-            # Enviar respuesta serializada en JSON
-            conn.sendall((json.dumps(response) + "\n").encode('utf-8'))
-            
+        except socket.timeout:
+            return
+    
+    def handle_client_request(self, conn: socket.socket, addr: tuple):
+        """Maneja las peticiones de clientes al servicio distribuido"""
+        try:
+            # Sin timeout, un cliente que conecta y no envía nada ocupa el hilo para siempre
+            lector = FramedReader(conn, timeout=KEEPALIVE_TIMEOUT)
+            primero = lector.primer_byte()
+            if primero is None:
+                return
+            if primero == MAGIC_V2:
+                self._atender_v2(conn, lector)
+            else:
+                self._atender_v1(conn, lector)
+        except socket.timeout:
+            pass  # no llegó el primer mensaje (o la línea v1 completa) a tiempo
+        except (OSError, ProtocolError):
+            pass
         except Exception as e:
-            error_response = json.dumps({
+            error_response = {
                 "success": False,
                 "error": "server_error",
                 "details": str(e)
-            })
-            conn.sendall((error_response + "\n").encode('utf-8'))
+            }
+            try:
+                conn.sendall(codificar_v1(error_response))
+            except OSError:
+                pass
         finally:
             try:
                 conn.shutdown(socket.SHUT_RDWR)
@@ -200,13 +346,24 @@ class DistributedService:
                 pass
             conn.close()
     
-    def start_server(self, host: str = DISTRIBUTED_HOST, port: int = DISTRIBUTED_PORT):
+    def start_server(self, host: str = DISTRIBUTED_HOST, port: int = DISTRIBUTED_PORT,
+                     engine: str = SERVER_ENGINE):
         """Inicia el servidor del servicio distribuido"""
         self.running = True
+        self.estadisticas.iniciar()
+        if engine == 'asyncio':
+            self._async_server = AsyncTCPServer(
+                self.procesar_peticion, self._decodificar_v1,
+                error_formato='invalid_request_format', nombre='DISTRIBUTED',
+                acciones_async={'wait_notifications': self._esperar_notificaciones}
+            )
+            self._async_server.serve_forever(host, port)
+            return
+        
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.bind((host, port))
-            s.listen(5)
+            s.listen(BACKLOG)
             print(f"[DISTRIBUTED] Servicio distribuido iniciado en {host}:{port}")
             print(f"[DISTRIBUTED] Listo para recibir conexiones...")
             
@@ -227,6 +384,10 @@ class DistributedService:
     def stop_server(self):
         """Detiene el servidor"""
         self.running = False
+        self.estadisticas.detener()
+        self.notifications.cerrar()
+        if self._async_server is not None:
+            self._async_server.detener()
 
 
 # Cliente para comunicarse con el servicio distribuido
@@ -238,26 +399,13 @@ class DistributedServiceClient:
         self.port = port
     
     def _send_request(self, payload: Dict[str, Any], timeout: float = 3.0) -> tuple:
-        """Envía una petición al servicio distribuido"""
+        """Envía una petición al servicio distribuido por una conexión persistente (v2)"""
         try:
-            data = (json.dumps(payload) + "\n").encode('utf-8')
-            with socket.create_connection((self.host, self.port), timeout=timeout) as s:
-                s.sendall(data)
-                # Leer respuesta
-                buf = b''
-                while True:
-                    chunk = s.recv(4096)
-                    if not chunk:
-                        break
-                    buf += chunk
-                    if b"\n" in chunk:
-                        break
-                try:
-                    resp = json.loads(buf.decode('utf-8').strip())
-                    ok = bool(resp.get('success'))
-                    return ok, resp
-                except json.JSONDecodeError:
-                    return False, {"error": "invalid_response"}
+            resp = obtener_pool(self.host, self.port).enviar(payload, timeout)
+            ok = bool(resp.get('success'))
+            return ok, resp
+        except ProtocolError:
+            return False, {"error": "invalid_response"}
         except Exception as e:
             return False, {"error": str(e)}
     
@@ -268,6 +416,13 @@ class DistributedServiceClient:
             'user_id': user_id
         })
     
+    def get_user_stats_many(self, user_ids: List[int]) -> tuple:
+        """Obtiene estadísticas de varios usuarios en una sola petición"""
+        return self._send_request({
+            'action': 'get_user_stats_many',
+            'user_ids': list(user_ids)
+        })
+    
     def get_global_stats(self) -> tuple:
         """Obtiene estadísticas globales"""
         return self._send_request({
@@ -289,6 +444,139 @@ class DistributedServiceClient:
         if user_id:
             payload['user_id'] = user_id
         return self._send_request(payload)
+    
+    def invalidate_user_stats(self, user_id: int) -> tuple:
+        """Descarta las estadísticas cacheadas de un usuario"""
+        return self._send_request({
+            'action': 'invalidate',
+            'user_id': user_id
+        }, timeout=0.5)
+    
+    def cache_stats(self) -> tuple:
+        """Contadores de la caché de estadísticas por usuario"""
+        return self._send_request({'action': 'cache_stats'})
+    
+    @staticmethod
+    def evento_usuario(evento: str, user_id: int, es_admin: bool = False,
+                       puntaje: int = 0, anterior: Optional[int] = None) -> Dict[str, Any]:
+        """Petición user_event; `ts` marca el evento como posterior al commit que lo originó"""
+        payload = {
+            'action': 'user_event',
+            'event': evento,
+            'user_id': user_id,
+            'es_admin': bool(es_admin),
+            'puntaje': puntaje or 0
+        }
+        if anterior is not None:
+            payload['anterior'] = anterior
+        payload['ts'] = time.time()
+        return payload
+    
+    def publicar_evento_usuario(self, evento: str, user_id: int, es_admin: bool = False,
+                                puntaje: int = 0, anterior: Optional[int] = None) -> tuple:
+        """Informa un alta ('registered'), baja ('deleted') o cambio de puntaje ('score')"""
+        return self._send_request(self.evento_usuario(evento, user_id, es_admin, puntaje, anterior), timeout=0.5)
+    
+    def publicar_eventos(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Envía varios user_event juntos por una misma conexión"""
+        return obtener_pool(self.host, self.port).enviar_varias(payloads, timeout=3.0)
+
+
+class PublicadorEventos:
+    """
+    Envía los eventos de usuario desde un hilo propio: el request sólo los encola.
+    Si la cola está llena o el servicio no responde, el evento se pierde y la
+    reconciliación periódica del servicio corrige los agregados.
+    """
+    
+    def __init__(self, max_pendientes: int = USER_EVENTS_MAX_PENDING):
+        self._cola: queue.Queue = queue.Queue(max_pendientes)
+        # Se llama tras cada lote aplicado por el servicio (p. ej. para invalidar cachés locales)
+        self.al_entregar: Optional[Callable[[], Any]] = None
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self.enviados = 0
+        self.fallidos = 0
+        self.descartados = 0
+    
+    def publicar(self, payload: Dict[str, Any]) -> bool:
+        """Encola el evento sin bloquear; False si se descartó por cola llena"""
+        self._arrancar()
+        try:
+            self._cola.put_nowait(payload)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            return False
+        return True
+    
+    def _arrancar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            # is_alive() también cubre un proceso hijo creado con fork, que no hereda el hilo
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name='user-events', daemon=True)
+                self._hilo.start()
+    
+    def _bucle(self):
+        cliente = DistributedServiceClient()
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < USER_EVENTS_LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                respuestas = cliente.publicar_eventos(lote)
+                ok = sum(1 for r in respuestas if r.get('success'))
+            except Exception:
+                ok = 0
+            with self._lock:
+                self.enviados += ok
+                self.fallidos += len(lote) - ok
+            if ok and self.al_entregar is not None:
+                try:
+                    self.al_entregar()
+                except Exception as e:
+                    print(f"[DISTRIBUTED] Error tras entregar eventos: {e}")
+    
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'pendientes': self._cola.qsize(), 'enviados': self.enviados,
+                    'fallidos': self.fallidos, 'descartados': self.descartados}
+
+
+_publicador = PublicadorEventos()
+
+
+def al_entregar_eventos(funcion: Callable[[], Any]):
+    """Registra qué hacer cuando el servicio ya aplicó eventos encolados (agregados actualizados)"""
+    _publicador.al_entregar = funcion
+
+
+def publicar_evento_usuario(evento: str, user_id: int, es_admin: bool = False,
+                            puntaje: int = 0, anterior: Optional[int] = None) -> bool:
+    """
+    Encola un evento de usuario para el servicio distribuido y vuelve enseguida.
+    Llamar después del commit: el `ts` del evento debe ser posterior al cambio en la base.
+    """
+    return _publicador.publicar(DistributedServiceClient.evento_usuario(evento, user_id, es_admin, puntaje, anterior))
+
+
+def publicar_record(user_id: int, puntaje: int, anterior: int) -> bool:
+    """Evento 'score' de un jugador cuyo récord ya está escrito en la base (ingesta diferida)"""
+    return publicar_evento_usuario('score', user_id, False, puntaje, anterior)
+
+
+def invalidar_stats_usuario(user_id: int) -> bool:
+    """Invalida la caché de estadísticas de un usuario sin propagar errores"""
+    ok, _ = DistributedServiceClient().invalidate_user_stats(user_id)
+    return ok
 
 
 if __name__ == '__main__':
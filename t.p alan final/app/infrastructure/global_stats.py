@@ -0,0 +1,205 @@
+"""
+Agregados Globales Incrementales
+Mantiene en memoria los agregados de /api/stats/global (total de usuarios,
+activos, suma y cantidad para el promedio y máximo) para que una consulta
+cueste una lectura de diccionario en vez de cuatro recorridos de la tabla.
+
+Se siembran una vez desde la base, se actualizan con eventos de puntaje,
+registro y eliminación, y se reconcilian periódicamente contra la base para
+corregir eventos perdidos.
+
+Los eventos traen `ts`, el instante (time.time()) posterior al commit que los
+originó: si es anterior al inicio de la última lectura de la base, el cambio ya
+está contado en ella y el evento se descarta. Los que llegan mientras se lee la
+base se vuelven a aplicar sobre el resultado.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+RECONCILE_INTERVAL = float(os.environ.get('STATS_RECONCILE_INTERVAL', '300'))
+
+EVENTOS = ('registered', 'deleted', 'score')
+
+
+class AgregadosGlobales:
+    """Agregados de usuarios y puntajes, seguros entre hilos"""
+
+    def __init__(self, db_path: str, intervalo_reconciliacion: float = RECONCILE_INTERVAL):
+        self.db_path = db_path
+        self.intervalo_reconciliacion = intervalo_reconciliacion
+        self._lock = threading.Lock()
+        self._sembrado = False
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.total_usuarios = 0
+        self.usuarios_activos = 0
+        self.suma_puntajes = 0       # sólo jugadores (no administradores)
+        self.cantidad_jugadores = 0
+        # Cantidad de jugadores por puntaje, para mantener el máximo ante bajas y descuentos
+        self._puntajes: Counter = Counter()
+        self._maximo = 0
+        self.reconciliaciones = 0
+        self.ultima_reconciliacion: Optional[str] = None
+        # Inicio de la lectura del estado actual y eventos que llegan durante una lectura en curso
+        self._inicio_lectura = 0.0
+        self._eventos_durante_lectura: Optional[List[Dict[str, Any]]] = None
+        self.eventos_omitidos = 0
+
+    def iniciar(self):
+        """Siembra desde la base y arranca la reconciliación periódica"""
+        self.reconciliar()
+        if self.intervalo_reconciliacion > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name='stats-reconcile', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo_reconciliacion):
+            try:
+                self.reconciliar()
+            except Exception as e:
+                print(f"[DISTRIBUTED] Error reconciliando estadísticas: {e}")
+
+    def reconciliar(self):
+        """Recalcula todos los agregados desde la base y reemplaza el estado en memoria"""
+        with self._lock:
+            inicio = time.time()
+            self._eventos_durante_lectura = []
+        try:
+            total, activos, puntajes = self._leer_base()
+        except Exception:
+            with self._lock:
+                self._eventos_durante_lectura = None
+            raise
+        with self._lock:
+            self.total_usuarios = total
+            self.usuarios_activos = activos
+            self._puntajes = +puntajes
+            self.cantidad_jugadores = sum(self._puntajes.values())
+            self.suma_puntajes = sum(p * c for p, c in self._puntajes.items())
+            self._maximo = max(self._puntajes) if self._puntajes else 0
+            self._inicio_lectura = inicio
+            # Lo aplicado durante la lectura se acaba de pisar: se vuelve a aplicar
+            recientes, self._eventos_durante_lectura = self._eventos_durante_lectura, None
+            for evento in recientes:
+                self._aplicar(evento)
+            self._sembrado = True
+            self.reconciliaciones += 1
+            self.ultima_reconciliacion = datetime.utcnow().isoformat()
+
+    def _leer_base(self):
+        with sqlite3.connect(self.db_path) as conn:
+            total, activos = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(puntaje_maximo > 0), 0) FROM usuarios
+            """).fetchone()
+            puntajes = Counter({
+                puntaje or 0: cantidad for puntaje, cantidad in conn.execute("""
+                    SELECT puntaje_maximo, COUNT(*) FROM usuarios
+                    WHERE es_admin = 0 GROUP BY puntaje_maximo
+                """)
+            })
+        return total, activos, puntajes
+
+    # --- Eventos (los métodos con _ se llaman con el lock tomado) ------------------
+
+    def _agregar_jugador(self, puntaje: int):
+        self._puntajes[puntaje] += 1
+        self.suma_puntajes += puntaje
+        self.cantidad_jugadores += 1
+        if puntaje > self._maximo:
+            self._maximo = puntaje
+
+    def _quitar_jugador(self, puntaje: int):
+        if self._puntajes[puntaje] <= 0:
+            # Evento inconsistente con el estado; la próxima reconciliación lo corrige
+            del self._puntajes[puntaje]
+            return
+        self._puntajes[puntaje] -= 1
+        self.suma_puntajes -= puntaje
+        self.cantidad_jugadores -= 1
+        if self._puntajes[puntaje] == 0:
+            del self._puntajes[puntaje]
+            if puntaje == self._maximo:
+                self._maximo = max(self._puntajes) if self._puntajes else 0
+
+    def _registrado(self, es_admin: bool, puntaje: int):
+        self.total_usuarios += 1
+        if puntaje > 0:
+            self.usuarios_activos += 1
+        if not es_admin:
+            self._agregar_jugador(puntaje)
+
+    def _eliminado(self, es_admin: bool, puntaje: int):
+        self.total_usuarios = max(self.total_usuarios - 1, 0)
+        if puntaje > 0:
+            self.usuarios_activos = max(self.usuarios_activos - 1, 0)
+        if not es_admin:
+            self._quitar_jugador(puntaje)
+
+    def _cambiado(self, es_admin: bool, anterior: int, nuevo: int):
+        if anterior == nuevo:
+            return
+        self.usuarios_activos += (nuevo > 0) - (anterior > 0)
+        if not es_admin:
+            self._quitar_jugador(anterior)
+            self._agregar_jugador(nuevo)
+
+    def _aplicar(self, evento: Dict[str, Any]):
+        tipo = evento.get('event')
+        es_admin = bool(evento.get('es_admin', False))
+        if tipo == 'registered':
+            self._registrado(es_admin, evento.get('puntaje') or 0)
+        elif tipo == 'deleted':
+            self._eliminado(es_admin, evento.get('puntaje') or 0)
+        else:
+            self._cambiado(es_admin, evento.get('anterior') or 0, evento.get('puntaje') or 0)
+
+    def usuario_registrado(self, es_admin: bool = False, puntaje: int = 0):
+        with self._lock:
+            self._registrado(es_admin, puntaje or 0)
+
+    def usuario_eliminado(self, es_admin: bool, puntaje: int):
+        with self._lock:
+            self._eliminado(es_admin, puntaje or 0)
+
+    def puntaje_cambiado(self, es_admin: bool, anterior: int, nuevo: int):
+        with self._lock:
+            self._cambiado(es_admin, anterior or 0, nuevo or 0)
+
+    def aplicar_evento(self, evento: Dict[str, Any]) -> bool:
+        """Aplica un evento `user_event` recibido por el servicio; False si no es válido"""
+        if evento.get('event') not in EVENTOS:
+            return False
+        ts = evento.get('ts')
+        with self._lock:
+            if type(ts) in (int, float):
+                if ts < self._inicio_lectura:
+                    # Confirmado en la base antes de la última lectura: ya está contado
+                    self.eventos_omitidos += 1
+                    return True
+                if self._eventos_durante_lectura is not None:
+                    self._eventos_durante_lectura.append(evento)
+            self._aplicar(evento)
+        return True
+
+    # --- Lectura -------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not self._sembrado:
+            self.reconciliar()
+        with self._lock:
+            promedio = self.suma_puntajes / self.cantidad_jugadores if self.cantidad_jugadores else 0
+            return {
+                'total_usuarios': self.total_usuarios,
+                'usuarios_activos': self.usuarios_activos,
+                'puntaje_promedio': round(promedio, 2),
+                'puntaje_maximo_global': self._maximo,
+                'timestamp': datetime.utcnow().isoformat()
+            }
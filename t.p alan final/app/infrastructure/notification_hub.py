@@ -0,0 +1,127 @@
+"""
+Hub de Notificaciones por Proceso
+Cada worker de Flask mantiene una única suscripción (long-poll
+`wait_notifications` sobre una conexión persistente) al servicio distribuido
+y reparte las notificaciones nuevas entre todos los clientes que esperan en
+ese worker. Los clientes conectados sin novedades no generan peticiones al
+servicio; la suscripción sólo corre mientras haya alguien esperando.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from app.infrastructure.connection_pool import CODEC_PREFERIDO, ConexionPersistente
+from app.infrastructure.distributed_service import DISTRIBUTED_HOST, DISTRIBUTED_PORT
+from app.infrastructure.protocol import ProtocolError
+
+ESPERA_SERVICIO = 20.0   # segundos de cada long-poll contra el servicio
+REINTENTO_MAXIMO = 30.0  # espera máxima entre reconexiones si el servicio no responde
+
+
+class NotificationHub:
+    """Suscripción compartida al servicio y fan-out a los clientes del worker"""
+
+    def __init__(self, host: str = DISTRIBUTED_HOST, port: int = DISTRIBUTED_PORT,
+                 espera: float = ESPERA_SERVICIO, capacidad: int = 1000):
+        self.host = host
+        self.port = port
+        self.espera = espera
+        self._cond = threading.Condition()
+        self._buffer: deque = deque(maxlen=capacidad)
+        # Último id recibido del servicio; 0 hace que la primera espera traiga las recientes
+        self._cursor = 0
+        self._suscriptores = 0
+        self._hilo: Optional[threading.Thread] = None
+        self._stats = {'peticiones_servicio': 0, 'recibidas': 0, 'reconexiones': 0}
+
+    def _asegurar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle, name='notification-hub', daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        conexion: Optional[ConexionPersistente] = None
+        reintento = 1.0
+        while True:
+            with self._cond:
+                if self._suscriptores == 0:
+                    # Sin clientes esperando: cortar la suscripción hasta el próximo
+                    self._hilo = None
+                    break
+                cursor = self._cursor
+            peticion = {'action': 'wait_notifications', 'since': cursor, 'timeout': self.espera}
+            try:
+                if conexion is None:
+                    conexion = ConexionPersistente(self.host, self.port, self.espera + 5, CODEC_PREFERIDO)
+                respuesta = conexion.enviar_varias([peticion], self.espera + 5)[0]
+            except (OSError, ProtocolError):
+                if conexion is not None:
+                    conexion.cerrar()
+                    conexion = None
+                self._stats['reconexiones'] += 1
+                time.sleep(reintento)
+                reintento = min(reintento * 2, REINTENTO_MAXIMO)
+                continue
+            reintento = 1.0
+            self._stats['peticiones_servicio'] += 1
+            if not respuesta.get('success'):
+                time.sleep(reintento)
+                continue
+            with self._cond:
+                nuevas = respuesta.get('notifications') or []
+                self._buffer.extend(nuevas)
+                self._stats['recibidas'] += len(nuevas)
+                self._cursor = respuesta.get('last_id', cursor)
+                if nuevas:
+                    self._cond.notify_all()
+        if conexion is not None:
+            conexion.cerrar()
+
+    def _pendientes(self, user_id: int, desde: int) -> List[Dict[str, Any]]:
+        nuevas = []
+        for n in reversed(self._buffer):
+            if n['id'] <= desde:
+                break
+            if n['user_id'] == user_id:
+                nuevas.append(n)
+        nuevas.reverse()
+        return nuevas
+
+    def esperar(self, user_id: int, desde: int, timeout: float) -> List[Dict[str, Any]]:
+        """Notificaciones del usuario con id mayor a `desde`; lista vacía si vence el timeout"""
+        with self._cond:
+            self._suscriptores += 1
+            self._asegurar_hilo()
+            try:
+                nuevas = self._pendientes(user_id, desde)
+                limite = time.monotonic() + timeout
+                while not nuevas:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                    nuevas = self._pendientes(user_id, desde)
+                return nuevas
+            finally:
+                self._suscriptores -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['suscriptores'] = self._suscriptores
+            stats['cursor'] = self._cursor
+            stats['activa'] = self._hilo is not None
+        return stats
+
+
+def init_notification_hub(app) -> NotificationHub:
+    hub = NotificationHub()
+    app.extensions['notification_hub'] = hub
+    return hub
+
+
+def get_notification_hub() -> NotificationHub:
+    return current_app.extensions['notification_hub']
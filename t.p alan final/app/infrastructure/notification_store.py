@@ -0,0 +1,189 @@
+"""
+Almacén de Notificaciones
+Un buffer circular (deque acotada) por usuario más un índice global de las
+notificaciones recientes: agregar y leer son O(1) por notificación y el
+tráfico de un usuario no desaloja las notificaciones de otro.
+
+Opcionalmente persiste en un segmento de sólo-agregado (una línea JSON por
+notificación). Al iniciar se reproduce el segmento y, cuando crece demasiado,
+se compacta reescribiéndolo sólo con lo que sigue retenido en memoria.
+"""
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+NOTIFICATIONS_PER_USER = int(os.environ.get('NOTIFICATIONS_PER_USER', '50'))
+NOTIFICATIONS_RECENT = int(os.environ.get('NOTIFICATIONS_RECENT', '100'))
+NOTIFICATIONS_SEGMENT = os.environ.get('NOTIFICATIONS_SEGMENT') or None
+
+
+class NotificationStore:
+    """Notificaciones por usuario con ids de secuencia crecientes"""
+
+    def __init__(self, por_usuario: int = NOTIFICATIONS_PER_USER, recientes: int = NOTIFICATIONS_RECENT,
+                 ruta_segmento: Optional[str] = NOTIFICATIONS_SEGMENT, factor_compactacion: int = 4):
+        self.por_usuario = por_usuario
+        # Condition: los suscriptores esperan en ella nuevas notificaciones
+        self._lock = threading.Condition()
+        self._usuarios: Dict[int, deque] = {}
+        self._recientes: deque = deque(maxlen=recientes)
+        self._seq = 0
+        self._retenidas_por_usuario = 0
+        # Avisos sin bloquear un hilo (p. ej. el event loop del servidor asyncio)
+        self._suscriptores: List[Callable[[], Any]] = []
+        self.ruta_segmento = ruta_segmento
+        self.factor_compactacion = factor_compactacion
+        self._segmento = None
+        self._lineas_segmento = 0
+        if ruta_segmento:
+            self._reproducir()
+            self._segmento = open(ruta_segmento, 'a', encoding='utf-8')
+
+    def _indexar(self, notificacion: Dict[str, Any]):
+        buffer = self._usuarios.get(notificacion['user_id'])
+        if buffer is None:
+            buffer = self._usuarios[notificacion['user_id']] = deque(maxlen=self.por_usuario)
+        if len(buffer) < self.por_usuario:
+            self._retenidas_por_usuario += 1
+        buffer.append(notificacion)
+        self._recientes.append(notificacion)
+        self._seq = max(self._seq, notificacion['id'])
+
+    def agregar(self, user_id: int, message: str, notification_type: str = 'info') -> Dict[str, Any]:
+        with self._lock:
+            self._seq += 1
+            notificacion = {
+                'id': self._seq,
+                'user_id': user_id,
+                'message': message,
+                'type': notification_type,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            self._indexar(notificacion)
+            if self._segmento is not None:
+                self._persistir(notificacion)
+            self._lock.notify_all()
+            for avisar in self._suscriptores:
+                avisar()
+        return notificacion
+
+    def de_usuario(self, user_id: int) -> List[Dict[str, Any]]:
+        """Notificaciones retenidas del usuario, de la más antigua a la más nueva"""
+        with self._lock:
+            return list(self._usuarios.get(user_id, ()))
+
+    def recientes(self, cantidad: int = 10) -> List[Dict[str, Any]]:
+        """Últimas notificaciones de todos los usuarios"""
+        with self._lock:
+            n = min(cantidad, len(self._recientes))
+            return [self._recientes[i] for i in range(len(self._recientes) - n, len(self._recientes))]
+
+    def esperar(self, desde: int, timeout: float) -> List[Dict[str, Any]]:
+        """
+        Bloquea hasta que haya notificaciones con id mayor a `desde` (o vence el timeout)
+        y las devuelve en orden. Sólo cubre el índice de recientes: un suscriptor más
+        atrasado que eso pierde las intermedias.
+        """
+        with self._lock:
+            self._lock.wait_for(lambda: self._seq > desde, timeout)
+            return self._nuevas(desde)
+
+    def nuevas(self, desde: int) -> List[Dict[str, Any]]:
+        """Como esperar() pero sin bloquear: lo que ya hay con id mayor a `desde`"""
+        with self._lock:
+            return self._nuevas(desde)
+
+    def _nuevas(self, desde: int) -> List[Dict[str, Any]]:
+        nuevas = []
+        for n in reversed(self._recientes):
+            if n['id'] <= desde:
+                break
+            nuevas.append(n)
+        nuevas.reverse()
+        return nuevas
+
+    def suscribir(self, avisar: Callable[[], Any]):
+        """`avisar()` se llama (con el lock tomado: debe ser inmediato) con cada notificación nueva"""
+        with self._lock:
+            self._suscriptores.append(avisar)
+
+    def desuscribir(self, avisar: Callable[[], Any]):
+        with self._lock:
+            self._suscriptores.remove(avisar)
+
+    @property
+    def ultimo_id(self) -> int:
+        return self._seq
+
+    # --- Persistencia ---------------------------------------------------------------
+
+    def _reproducir(self):
+        if not os.path.exists(self.ruta_segmento):
+            return
+        incompleta = b''
+        with open(self.ruta_segmento, 'rb') as f:
+            for linea in f:
+                if not linea.endswith(b'\n'):
+                    # Escritura interrumpida por una caída: se descarta al final
+                    incompleta = linea
+                    break
+                try:
+                    self._indexar(json.loads(linea))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self._lineas_segmento += 1
+        if incompleta:
+            with open(self.ruta_segmento, 'r+b') as f:
+                f.truncate(os.path.getsize(self.ruta_segmento) - len(incompleta))
+        self._compactar_si_corresponde()
+
+    def _persistir(self, notificacion: Dict[str, Any]):
+        self._segmento.write(json.dumps(notificacion, separators=(',', ':')) + '\n')
+        self._segmento.flush()
+        self._lineas_segmento += 1
+        self._compactar_si_corresponde()
+
+    def _retenidas(self) -> List[Dict[str, Any]]:
+        vistas = {}
+        for buffer in self._usuarios.values():
+            for n in buffer:
+                vistas[n['id']] = n
+        for n in self._recientes:
+            vistas[n['id']] = n
+        return [vistas[i] for i in sorted(vistas)]
+
+    def _compactar_si_corresponde(self):
+        # El segmento se reescribe cuando supera varias veces lo que sigue retenido
+        limite = self.factor_compactacion * max(self._retenidas_por_usuario, self._recientes.maxlen or 0)
+        if self._lineas_segmento <= limite:
+            return
+        retenidas = self._retenidas()
+        temporal = self.ruta_segmento + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            for n in retenidas:
+                f.write(json.dumps(n, separators=(',', ':')) + '\n')
+        if self._segmento is not None:
+            self._segmento.close()
+        os.replace(temporal, self.ruta_segmento)
+        self._lineas_segmento = len(retenidas)
+        if self._segmento is not None:
+            self._segmento = open(self.ruta_segmento, 'a', encoding='utf-8')
+
+    def cerrar(self):
+        with self._lock:
+            if self._segmento is not None:
+                self._segmento.close()
+                self._segmento = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'usuarios': len(self._usuarios),
+                'recientes': len(self._recientes),
+                'ultimo_id': self._seq,
+                'lineas_segmento': self._lineas_segmento,
+                'persistente': self.ruta_segmento is not None
+            }
@@ -0,0 +1,256 @@
+"""
+Hash de Contraseñas en un Pool de Procesos
+Generar o verificar un hash PBKDF2 cuesta cientos de milisegundos de CPU; hecho
+en el hilo del request, una ráfaga de inicios de sesión frena a todos los demás
+requests del worker. Este servicio manda ese trabajo a un `ProcessPoolExecutor`
+y el hilo del request sólo espera el resultado.
+
+La concurrencia está acotada por un semáforo (`PASSWORD_HASH_MAX_PENDING`
+trabajos en el pool); el resto espera su turno hasta `PASSWORD_HASH_TIMEOUT`
+segundos y luego se rechaza con `ServicioSaturado`. `stats()` informa cuántos
+esperan, cuántos están en curso y los máximos observados.
+
+Los hashes guardan su método (`pbkdf2:sha256:600000$sal$hash`): si cambia
+`PASSWORD_HASH_METHOD`, `necesita_rehash()` lo detecta y el login vuelve a
+hashear la contraseña con el costo nuevo.
+
+Hay un solo servicio por proceso (y configuración). Lo crea el primer
+`create_app`, que lo inicia antes que las extensiones con hilos de fondo: en
+Linux los procesos se crean con fork mientras todavía no hay otros hilos. Los
+`create_app` siguientes del mismo proceso (`python -m app` importa `app.app`,
+los scripts de mantenimiento) reutilizan ese pool en lugar de crear otro desde
+un proceso que ya tiene hilos. En Windows (spawn) cada proceso importa la
+aplicación al arrancar.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+METODO_POR_DEFECTO = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+
+
+class ServicioSaturado(RuntimeError):
+    """No se liberó un lugar en el pool dentro del tiempo de espera"""
+
+
+def normalizar_metodo(metodo: str) -> str:
+    """Método completo tal como queda en el hash (`pbkdf2` -> `pbkdf2:sha256:600000`)"""
+    nombre, *argumentos = metodo.split(':')
+    if nombre == 'pbkdf2':
+        algoritmo = argumentos[0] if argumentos else 'sha256'
+        iteraciones = argumentos[1] if len(argumentos) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{algoritmo}:{iteraciones}'
+    if nombre == 'scrypt' and not argumentos:
+        return 'scrypt:32768:8:1'
+    return metodo
+
+
+def metodo_de(password_hash: str) -> str:
+    return password_hash.split('$', 1)[0]
+
+
+# Se ejecutan en los procesos del pool: funciones de módulo para poder serializarlas
+def _generar(password: str, metodo: str) -> str:
+    return generate_password_hash(password, method=metodo)
+
+
+def _verificar(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+def _calentar() -> int:
+    return os.getpid()
+
+
+def _contexto():
+    # fork es el único que no vuelve a importar la aplicación en cada proceso
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class ServicioHash:
+    """Pool de procesos para hashear contraseñas, con concurrencia acotada y métricas"""
+
+    def __init__(self, metodo: str = METODO_POR_DEFECTO, procesos: int = 2,
+                 max_pendientes: Optional[int] = None, espera_maxima: float = 10.0):
+        self.metodo = normalizar_metodo(metodo)
+        self.procesos = procesos
+        self.max_pendientes = max_pendientes or procesos * 2
+        self.espera_maxima = espera_maxima
+        self._cupos = threading.BoundedSemaphore(self.max_pendientes)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.esperando = 0
+        self.en_curso = 0
+        self.max_esperando = 0
+        self.max_en_curso = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.reinicios = 0
+        self._espera_total = 0.0
+        self._hash_total = 0.0
+
+    def iniciar(self):
+        """Crea los procesos ya, mientras la aplicación todavía no tiene hilos de fondo"""
+        self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto())
+        for futuro in [self._pool.submit(_calentar) for _ in range(self.procesos)]:
+            futuro.result()
+
+    def detener(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _pool_activo(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Detenido por otra aplicación que comparte el servicio: se vuelve a crear
+                self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto())
+            return self._pool
+
+    def _ejecutar(self, funcion, *argumentos) -> Any:
+        with self._lock:
+            self.esperando += 1
+            self.max_esperando = max(self.max_esperando, self.esperando)
+        inicio = time.perf_counter()
+        obtenido = self._cupos.acquire(timeout=self.espera_maxima)
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self.esperando -= 1
+            self._espera_total += espera
+            if not obtenido:
+                self.rechazados += 1
+            else:
+                self.en_curso += 1
+                self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        if not obtenido:
+            raise ServicioSaturado(f'{self.max_pendientes} hashes en curso y ninguno terminó en {self.espera_maxima}s')
+        try:
+            inicio = time.perf_counter()
+            pool = self._pool_activo()
+            try:
+                resultado = pool.submit(funcion, *argumentos).result()
+            except BrokenProcessPool:
+                # Un proceso murió (p. ej. por memoria): se recrea el pool y esta vez se calcula acá
+                self._reiniciar_pool(pool)
+                resultado = funcion(*argumentos)
+            with self._lock:
+                self.completados += 1
+                self._hash_total += time.perf_counter() - inicio
+            return resultado
+        finally:
+            with self._lock:
+                self.en_curso -= 1
+            self._cupos.release()
+
+    def _reiniciar_pool(self, roto: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is not roto:
+                return  # otro hilo ya lo recreó
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto())
+            self.reinicios += 1
+        roto.shutdown(wait=False)
+
+    def generar(self, password: str) -> str:
+        return self._ejecutar(_generar, password, self.metodo)
+
+    def verificar(self, password_hash: str, password: str) -> bool:
+        return self._ejecutar(_verificar, password_hash, password)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'metodo': self.metodo,
+                'procesos': self.procesos,
+                'max_pendientes': self.max_pendientes,
+                'esperando': self.esperando,
+                'en_curso': self.en_curso,
+                'max_esperando': self.max_esperando,
+                'max_en_curso': self.max_en_curso,
+                'completados': self.completados,
+                'rechazados': self.rechazados,
+                'reinicios': self.reinicios,
+                'espera_promedio_ms': round(self._espera_total * 1000 / max(1, self.completados + self.rechazados), 3),
+                'hash_promedio_ms': round(self._hash_total * 1000 / max(1, self.completados), 3),
+            }
+
+
+# Servicios ya iniciados en este proceso, por (pid, configuración)
+_servicios: Dict[tuple, ServicioHash] = {}
+_servicios_lock = threading.Lock()
+
+
+def servicio_del_proceso(metodo: str, procesos: int, max_pendientes: Optional[int],
+                         espera_maxima: float) -> ServicioHash:
+    """El servicio de este proceso para esa configuración; lo crea e inicia la primera vez"""
+    # El pid entra en la clave: un proceso hijo creado con fork no usa el pool del padre
+    clave = (os.getpid(), normalizar_metodo(metodo), procesos, max_pendientes, espera_maxima)
+    with _servicios_lock:
+        servicio = _servicios.get(clave)
+        if servicio is None:
+            servicio = ServicioHash(metodo, procesos, max_pendientes, espera_maxima)
+            servicio.iniciar()
+            _servicios[clave] = servicio
+    return servicio
+
+
+def init_password_hasher(app) -> Optional[ServicioHash]:
+    procesos = app.config.get('PASSWORD_HASH_WORKERS', 2)
+    # Dentro de un proceso del pool (spawn importa la aplicación) no se crea otro pool
+    if not procesos or multiprocessing.parent_process() is not None:
+        return None
+    servicio = servicio_del_proceso(
+        app.config.get('PASSWORD_HASH_METHOD', METODO_POR_DEFECTO),
+        procesos,
+        app.config.get('PASSWORD_HASH_MAX_PENDING') or None,
+        app.config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+    )
+    app.extensions['password_hasher'] = servicio
+
+    @app.errorhandler(ServicioSaturado)
+    def servicio_saturado(e):
+        app.logger.warning(f'Hash de contraseñas saturado: {e}')
+        return 'Hay demasiados inicios de sesión en curso, probá de nuevo en unos segundos.', 503, {'Retry-After': '2'}
+
+    return servicio
+
+
+def get_password_hasher() -> Optional[ServicioHash]:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('password_hasher')
+
+
+def _metodo_configurado() -> str:
+    if has_app_context():
+        return normalizar_metodo(current_app.config.get('PASSWORD_HASH_METHOD', METODO_POR_DEFECTO))
+    return METODO_POR_DEFECTO
+
+
+def generar_hash(password: str) -> str:
+    """Hash de `password` con el método configurado (en el pool si está activo)"""
+    servicio = get_password_hasher()
+    if servicio is None:
+        return _generar(password, _metodo_configurado())
+    return servicio.generar(password)
+
+
+def verificar_hash(password_hash: str, password: str) -> bool:
+    servicio = get_password_hasher()
+    if servicio is None:
+        return _verificar(password_hash, password)
+    return servicio.verificar(password_hash, password)
+
+
+def necesita_rehash(password_hash: str) -> bool:
+    """True si el hash se generó con un método o costo distinto del configurado"""
+    return metodo_de(password_hash) != _metodo_configurado()
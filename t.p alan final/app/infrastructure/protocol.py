@@ -0,0 +1,72 @@
+"""
+Protocolo de Mensajes TCP
+Define el formato de las tramas que intercambian los servicios por socket.
+
+v1 (compatibilidad): un JSON terminado en '\\n' por conexión; el servidor
+    responde una línea y cierra.
+v2: tramas con prefijo de longitud y id de petición sobre una conexión
+    persistente (keep-alive). Varias peticiones pueden estar en vuelo a la
+    vez; cada respuesta lleva el id de la petición que contesta.
+
+Cabecera v2 (10 bytes, big endian):
+    magic (1 byte) | codec (1 byte) | request_id (uint32) | longitud (uint32)
+
+El codec de cada trama es JSON (0) o el codec binario de serialization.py (1);
+los servidores responden con el mismo codec de la petición. La lectura de
+mensajes desde el socket está en stream_reader.py.
+"""
+import codecs
+import json
+import struct
+from typing import Any, Dict
+
+from app.infrastructure.serialization import codificar_binario, decodificar_binario
+
+MAGIC_V2 = 0xA7
+CODEC_JSON = 0
+CODEC_BINARIO = 1
+CODECS = {'json': CODEC_JSON, 'binary': CODEC_BINARIO}
+
+CABECERA = struct.Struct('!BBII')
+MAX_MENSAJE = 1024 * 1024  # 1 MiB por mensaje
+
+# Tiempo que el servidor mantiene abierta una conexión v2 sin actividad
+KEEPALIVE_TIMEOUT = 60.0
+
+
+class ProtocolError(Exception):
+    """Trama inválida o conexión cerrada a mitad de un mensaje"""
+
+
+def codificar_v1(payload: Dict[str, Any]) -> bytes:
+    return (json.dumps(payload) + "\n").encode('utf-8')
+
+
+def codec_respuesta(codec: int) -> int:
+    """Codec con el que se contesta una petición: el mismo, si se conoce"""
+    return codec if codec in (CODEC_JSON, CODEC_BINARIO) else CODEC_JSON
+
+
+def codificar_trama(request_id: int, payload: Dict[str, Any], codec: int = CODEC_JSON) -> bytes:
+    if codec == CODEC_BINARIO:
+        cuerpo = codificar_binario(payload)
+    else:
+        cuerpo = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    if len(cuerpo) > MAX_MENSAJE:
+        raise ProtocolError(f"Mensaje demasiado grande: {len(cuerpo)} bytes")
+    return CABECERA.pack(MAGIC_V2, codec, request_id, len(cuerpo)) + cuerpo
+
+
+def decodificar_cuerpo(codec: int, cuerpo) -> Dict[str, Any]:
+    if codec == CODEC_BINARIO:
+        try:
+            return decodificar_binario(memoryview(cuerpo))
+        except (IndexError, TypeError, ValueError, UnicodeDecodeError, struct.error) as e:
+            raise ProtocolError(f"Cuerpo binario inválido: {e}")
+    if codec != CODEC_JSON:
+        raise ProtocolError(f"Codec desconocido: {codec}")
+    try:
+        return json.loads(codecs.utf_8_decode(cuerpo)[0])
+    except (UnicodeDecodeError, json.JSONDecodeError, RecursionError) as e:
+        # RecursionError: JSON anidado a miles de niveles (p. ej. '[[[[...')
+        raise ProtocolError(f"Cuerpo inválido: {e}")
@@ -1,11 +1,14 @@
 """
 Módulo de Serialización Mejorado
-Proporciona funciones para serializar/deserializar datos usando JSON y Pickle
+Proporciona funciones para serializar/deserializar datos usando JSON, Pickle
+y un codec binario compacto para los mensajes de los servicios TCP
 """
 import json
 import pickle
 import base64
-from typing import Any, Dict, Optional
+import codecs
+import struct
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class Serializer:
@@ -102,6 +105,380 @@ class Serializer:
             raise ValueError(f"Formato de serialización desconocido: {format_type}")
 
 
+    @staticmethod
+    def serialize_binary(data: Any) -> bytes:
+        """Serializa datos con el codec binario (esquema fijo si el mensaje coincide)"""
+        try:
+            return codificar_binario(data)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise ValueError(f"Error serializando en binario: {e}")
+    
+    @staticmethod
+    def deserialize_binary(data) -> Any:
+        """Deserializa datos desde bytes, bytearray o memoryview sin copiarlos"""
+        try:
+            return decodificar_binario(data)
+        except (IndexError, TypeError, ValueError, UnicodeDecodeError, struct.error) as e:
+            raise ValueError(f"Error deserializando binario: {e}")
+
+
+# --- Codec binario ----------------------------------------------------------------
+#
+# Un mensaje es un varint con el id de esquema seguido del cuerpo. Los esquemas
+# describen las formas fijas de los mensajes (save_score, estadísticas,
+# notificaciones): las claves y los valores constantes no viajan, sólo los
+# campos en orden. Cualquier otro mensaje usa el esquema genérico (0), un
+# formato autodescriptivo con etiquetas de tipo. Los enteros son varints
+# (zigzag si tienen signo) y los textos, longitud + UTF-8.
+#
+# Los ids de esquema son parte del formato en el cable: no reutilizar ni renumerar.
+
+ESQUEMA_GENERICO = 0
+
+# Tipos de campo
+T_INT, T_BOOL, T_STR, T_OPT_INT, T_OPT_STR, T_ANY, T_STRUCT, T_LIST = range(8)
+
+# Etiquetas del formato genérico
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _DICT = range(8)
+
+# Listas y diccionarios anidados admitidos en el formato genérico: un mensaje
+# hostil de pocos KB con miles de niveles agotaría la pila de recursión
+MAX_PROFUNDIDAD = 32
+
+_DOUBLE = struct.Struct('!d')
+_utf8 = codecs.utf_8_decode
+
+
+class _SinEsquema(Exception):
+    """El mensaje no respeta el esquema; se codifica con el genérico"""
+
+
+def _escribir_uvarint(buf: bytearray, n: int):
+    if n < 0:
+        raise ValueError("uvarint negativo")
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _escribir_varint(buf: bytearray, n: int):
+    _escribir_uvarint(buf, n << 1 if n >= 0 else ((-n) << 1) - 1)
+
+
+def _escribir_str(buf: bytearray, texto: str):
+    datos = texto.encode('utf-8')
+    _escribir_uvarint(buf, len(datos))
+    buf += datos
+
+
+def _leer_uvarint(mv: memoryview, pos: int) -> Tuple[int, int]:
+    b = mv[pos]
+    if b < 0x80:
+        return b, pos + 1
+    n, desplazamiento = b & 0x7F, 7
+    while True:
+        pos += 1
+        b = mv[pos]
+        n |= (b & 0x7F) << desplazamiento
+        if b < 0x80:
+            return n, pos + 1
+        desplazamiento += 7
+
+
+def _leer_varint(mv: memoryview, pos: int) -> Tuple[int, int]:
+    n, pos = _leer_uvarint(mv, pos)
+    return (n >> 1) if not n & 1 else -(n >> 1) - 1, pos
+
+
+def _leer_str(mv: memoryview, pos: int, sub=None) -> Tuple[str, int]:
+    n = mv[pos]
+    if n < 0x80:
+        pos += 1
+    else:
+        n, pos = _leer_uvarint(mv, pos)
+    fin = pos + n
+    if fin > len(mv):
+        raise ValueError("Texto truncado")
+    # Decodifica directamente desde el buffer, sin copia intermedia a bytes
+    return _utf8(mv[pos:fin])[0], fin
+
+
+# Codificadores y decodificadores por tipo de campo: (buf, valor, sub) y (mv, pos, sub).
+# Se resuelven una vez al crear el esquema para no despachar por tipo en cada campo.
+
+def _w_int(buf, valor, sub):
+    if type(valor) is not int:
+        raise _SinEsquema
+    _escribir_varint(buf, valor)
+
+
+def _w_str(buf, valor, sub):
+    if type(valor) is not str:
+        raise _SinEsquema
+    _escribir_str(buf, valor)
+
+
+def _w_bool(buf, valor, sub):
+    if type(valor) is not bool:
+        raise _SinEsquema
+    buf.append(valor)
+
+
+def _w_opt_int(buf, valor, sub):
+    if valor is None:
+        buf.append(0)
+    else:
+        buf.append(1)
+        _w_int(buf, valor, sub)
+
+
+def _w_opt_str(buf, valor, sub):
+    if valor is None:
+        buf.append(0)
+    else:
+        buf.append(1)
+        _w_str(buf, valor, sub)
+
+
+def _w_any(buf, valor, sub):
+    _escribir_valor(buf, valor)
+
+
+def _w_struct(buf, valor, sub):
+    if type(valor) is not dict or len(valor) != len(sub.claves):
+        raise _SinEsquema
+    try:
+        sub.escribir(buf, valor)
+    except KeyError:
+        raise _SinEsquema
+
+
+def _w_list(buf, valor, sub):
+    if type(valor) is not list:
+        raise _SinEsquema
+    _escribir_uvarint(buf, len(valor))
+    for item in valor:
+        _w_struct(buf, item, sub)
+
+
+def _r_int(mv, pos, sub):
+    n = mv[pos]
+    if n >= 0x80:
+        n, pos = _leer_uvarint(mv, pos)
+    else:
+        pos += 1
+    return (n >> 1) if not n & 1 else -(n >> 1) - 1, pos
+
+
+def _r_bool(mv, pos, sub):
+    return mv[pos] != 0, pos + 1
+
+
+def _r_opt_int(mv, pos, sub):
+    if mv[pos] == 0:
+        return None, pos + 1
+    return _r_int(mv, pos + 1, sub)
+
+
+def _r_opt_str(mv, pos, sub):
+    if mv[pos] == 0:
+        return None, pos + 1
+    return _leer_str(mv, pos + 1)
+
+
+def _r_any(mv, pos, sub):
+    return _leer_valor(mv, pos)
+
+
+def _r_struct(mv, pos, sub):
+    return sub.leer(mv, pos)
+
+
+def _r_list(mv, pos, sub):
+    n, pos = _leer_uvarint(mv, pos)
+    leer = sub.leer
+    items = []
+    for _ in range(n):
+        item, pos = leer(mv, pos)
+        items.append(item)
+    return items, pos
+
+
+_CODIFICADORES = {T_INT: _w_int, T_BOOL: _w_bool, T_STR: _w_str, T_OPT_INT: _w_opt_int,
+                  T_OPT_STR: _w_opt_str, T_ANY: _w_any, T_STRUCT: _w_struct, T_LIST: _w_list}
+_DECODIFICADORES = {T_INT: _r_int, T_BOOL: _r_bool, T_STR: _leer_str, T_OPT_INT: _r_opt_int,
+                    T_OPT_STR: _r_opt_str, T_ANY: _r_any, T_STRUCT: _r_struct, T_LIST: _r_list}
+
+
+class EsquemaBinario:
+    """Forma fija de un mensaje: constantes implícitas y campos tipados en orden"""
+
+    def __init__(self, id: Optional[int], campos: List[Tuple], constantes: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.constantes = constantes or {}
+        # Cada campo: (nombre, tipo) o (nombre, T_STRUCT/T_LIST, subesquema)
+        campos = [c if len(c) == 3 else (c[0], c[1], None) for c in campos]
+        self.claves = frozenset(self.constantes) | {c[0] for c in campos}
+        self._codificadores = [(nombre, _CODIFICADORES[tipo], sub) for nombre, tipo, sub in campos]
+        self._decodificadores = [(nombre, _DECODIFICADORES[tipo], sub) for nombre, tipo, sub in campos]
+
+    def coincide(self, data: Dict[str, Any]) -> bool:
+        for clave, valor in self.constantes.items():
+            actual = data.get(clave)
+            if type(actual) is not type(valor) or actual != valor:
+                return False
+        return True
+
+    def escribir(self, buf: bytearray, data: Dict[str, Any]):
+        for nombre, codificar, sub in self._codificadores:
+            codificar(buf, data[nombre], sub)
+
+    def leer(self, mv: memoryview, pos: int) -> Tuple[Dict[str, Any], int]:
+        data = self.constantes.copy()
+        for nombre, decodificar, sub in self._decodificadores:
+            data[nombre], pos = decodificar(mv, pos, sub)
+        return data, pos
+
+
+def _escribir_valor(buf: bytearray, valor: Any, profundidad: int = 0):
+    """Formato genérico: etiqueta de tipo + valor"""
+    if valor is None:
+        buf.append(_NONE)
+    elif valor is True:
+        buf.append(_TRUE)
+    elif valor is False:
+        buf.append(_FALSE)
+    elif type(valor) is int:
+        buf.append(_INT)
+        _escribir_varint(buf, valor)
+    elif type(valor) is float:
+        buf.append(_FLOAT)
+        buf += _DOUBLE.pack(valor)
+    elif type(valor) is str:
+        buf.append(_STR)
+        _escribir_str(buf, valor)
+    elif profundidad >= MAX_PROFUNDIDAD and isinstance(valor, (list, tuple, dict)):
+        raise ValueError(f"Anidamiento de más de {MAX_PROFUNDIDAD} niveles")
+    elif isinstance(valor, (list, tuple)):
+        buf.append(_LIST)
+        _escribir_uvarint(buf, len(valor))
+        for item in valor:
+            _escribir_valor(buf, item, profundidad + 1)
+    elif isinstance(valor, dict):
+        buf.append(_DICT)
+        _escribir_uvarint(buf, len(valor))
+        for clave, item in valor.items():
+            if type(clave) is not str:
+                raise TypeError(f"Clave no soportada: {clave!r}")
+            _escribir_str(buf, clave)
+            _escribir_valor(buf, item, profundidad + 1)
+    else:
+        raise TypeError(f"Tipo no soportado por el codec binario: {type(valor).__name__}")
+
+
+def _leer_valor(mv: memoryview, pos: int, profundidad: int = 0) -> Tuple[Any, int]:
+    etiqueta = mv[pos]
+    pos += 1
+    if etiqueta == _NONE:
+        return None, pos
+    if etiqueta == _TRUE:
+        return True, pos
+    if etiqueta == _FALSE:
+        return False, pos
+    if etiqueta == _INT:
+        return _leer_varint(mv, pos)
+    if etiqueta == _FLOAT:
+        return _DOUBLE.unpack_from(mv, pos)[0], pos + _DOUBLE.size
+    if etiqueta == _STR:
+        return _leer_str(mv, pos)
+    if etiqueta in (_LIST, _DICT) and profundidad >= MAX_PROFUNDIDAD:
+        raise ValueError(f"Anidamiento de más de {MAX_PROFUNDIDAD} niveles")
+    if etiqueta == _LIST:
+        n, pos = _leer_uvarint(mv, pos)
+        items = []
+        for _ in range(n):
+            item, pos = _leer_valor(mv, pos, profundidad + 1)
+            items.append(item)
+        return items, pos
+    if etiqueta == _DICT:
+        n, pos = _leer_uvarint(mv, pos)
+        data = {}
+        for _ in range(n):
+            clave, pos = _leer_str(mv, pos)
+            data[clave], pos = _leer_valor(mv, pos, profundidad + 1)
+        return data, pos
+    raise ValueError(f"Etiqueta desconocida: {etiqueta}")
+
+
+STATS_USUARIO = EsquemaBinario(None, [
+    ('user_id', T_INT), ('nombre', T_STR), ('email', T_STR), ('puntaje_maximo', T_OPT_INT),
+    ('fecha_ultimo_juego', T_OPT_STR), ('fecha_registro', T_OPT_STR),
+])
+STATS_GLOBALES = EsquemaBinario(None, [
+    ('total_usuarios', T_INT), ('usuarios_activos', T_INT), ('puntaje_promedio', T_ANY),
+    ('puntaje_maximo_global', T_INT), ('timestamp', T_STR),
+])
+NOTIFICACION = EsquemaBinario(7, [
+    ('id', T_INT), ('user_id', T_INT), ('message', T_STR), ('type', T_STR), ('timestamp', T_STR),
+])
+
+ESQUEMAS = [
+    EsquemaBinario(1, [('user_id', T_INT), ('puntaje', T_INT)], {'action': 'save_score'}),
+    EsquemaBinario(2, [('nuevo_record', T_BOOL), ('puntaje_maximo', T_INT)], {'success': True}),
+    EsquemaBinario(3, [('user_id', T_INT)], {'action': 'get_user_stats'}),
+    EsquemaBinario(4, [('stats', T_STRUCT, STATS_USUARIO)], {'success': True}),
+    EsquemaBinario(5, [('user_id', T_INT), ('message', T_STR), ('type', T_STR)], {'action': 'add_notification'}),
+    EsquemaBinario(6, [('notifications', T_LIST, NOTIFICACION)], {'success': True}),
+    NOTIFICACION,
+    EsquemaBinario(8, [('stats', T_STRUCT, STATS_GLOBALES)], {'success': True}),
+    EsquemaBinario(9, [('notifications', T_LIST, NOTIFICACION), ('last_id', T_INT)], {'success': True}),
+    EsquemaBinario(10, [('event', T_STR), ('user_id', T_INT), ('es_admin', T_BOOL), ('puntaje', T_INT),
+                        ('anterior', T_INT)], {'action': 'user_event'}),
+    EsquemaBinario(11, [('event', T_STR), ('user_id', T_INT), ('es_admin', T_BOOL), ('puntaje', T_INT),
+                        ('anterior', T_INT), ('ts', T_ANY)], {'action': 'user_event'}),
+    EsquemaBinario(12, [('event', T_STR), ('user_id', T_INT), ('es_admin', T_BOOL), ('puntaje', T_INT),
+                        ('ts', T_ANY)], {'action': 'user_event'}),
+]
+
+_ESQUEMAS_POR_ID = {e.id: e for e in ESQUEMAS}
+_ESQUEMAS_POR_CLAVES: Dict[frozenset, List[EsquemaBinario]] = {}
+for _esquema in ESQUEMAS:
+    _ESQUEMAS_POR_CLAVES.setdefault(_esquema.claves, []).append(_esquema)
+
+
+def codificar_binario(data: Any) -> bytes:
+    if type(data) is dict:
+        for esquema in _ESQUEMAS_POR_CLAVES.get(frozenset(data), ()):
+            if not esquema.coincide(data):
+                continue
+            buf = bytearray()
+            _escribir_uvarint(buf, esquema.id)
+            try:
+                esquema.escribir(buf, data)
+            except _SinEsquema:
+                continue
+            return bytes(buf)
+    buf = bytearray((ESQUEMA_GENERICO,))
+    _escribir_valor(buf, data)
+    return bytes(buf)
+
+
+def decodificar_binario(data) -> Any:
+    mv = data if isinstance(data, memoryview) else memoryview(data)
+    id_esquema, pos = _leer_uvarint(mv, 0)
+    if id_esquema == ESQUEMA_GENERICO:
+        valor, pos = _leer_valor(mv, pos)
+    else:
+        esquema = _ESQUEMAS_POR_ID.get(id_esquema)
+        if esquema is None:
+            raise ValueError(f"Esquema desconocido: {id_esquema}")
+        valor, pos = esquema.leer(mv, pos)
+    if pos != len(mv):
+        raise ValueError("Bytes sobrantes al final del mensaje")
+    return valor
+
+
 # Funciones de utilidad para uso directo
 def serialize(data: Any, method: str = 'json') -> Any:
     """
@@ -109,7 +486,7 @@ def serialize(data: Any, method: str = 'json') -> Any:
     
     Args:
         data: Datos a serializar
-        method: 'json', 'pickle', 'pickle_base64', o 'hybrid'
+        method: 'json', 'pickle', 'pickle_base64', 'hybrid' o 'binary'
     
     Returns:
         Datos serializados según el método
@@ -122,6 +499,8 @@ def serialize(data: Any, method: str = 'json') -> Any:
         return Serializer.serialize_pickle_base64(data)
     elif method == 'hybrid':
         return Serializer.serialize_hybrid(data)
+    elif method == 'binary':
+        return Serializer.serialize_binary(data)
     else:
         raise ValueError(f"Método de serialización desconocido: {method}")
 
@@ -132,7 +511,7 @@ def deserialize(data: Any, method: str = 'json') -> Any:
     
     Args:
         data: Datos a deserializar
-        method: 'json', 'pickle', 'pickle_base64', o 'hybrid'
+        method: 'json', 'pickle', 'pickle_base64', 'hybrid' o 'binary'
     
     Returns:
         Datos deserializados
@@ -145,6 +524,8 @@ def deserialize(data: Any, method: str = 'json') -> Any:
         return Serializer.deserialize_pickle_base64(data)
     elif method == 'hybrid':
         return Serializer.deserialize_hybrid(data)
+    elif method == 'binary':
+        return Serializer.deserialize_binary(data)
     else:
         raise ValueError(f"Método de deserialización desconocido: {method}")
 
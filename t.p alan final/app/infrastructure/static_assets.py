@@ -0,0 +1,301 @@
+"""
+Archivos Estáticos con Huella y Precomprimidos
+Copia cada archivo de `static/` (salvo las fotos subidas) a una carpeta de
+compilación con el hash de su contenido en el nombre (`css/styles.<hash>.css`)
+y, para los formatos de texto, sus versiones gzip y brotli ya comprimidas. El
+manifiesto resultante (`manifest.json`) es el registro que usa `static_url()`
+en las plantillas, y `/assets/<nombre>` sirve la mejor variante que acepta el
+navegador con `send_file` (el servidor WSGI puede usar sendfile; con
+`USE_X_SENDFILE` lo hace el proxy) y caché inmutable a un año.
+
+brotli es opcional: sin él sólo se generan las versiones gzip.
+
+La compilación es idempotente y corre al iniciar la aplicación; también puede
+hacerse antes de desplegar:
+    python -m app.infrastructure.static_assets [--limpiar]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from flask import abort, current_app, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+LARGO_HASH = 12
+MANIFIESTO = 'manifest.json'
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+# Carpetas de static/ que no son assets del sitio
+EXCLUIDOS = {'uploads'}
+# Por debajo de esto la cabecera Content-Encoding cuesta más de lo que se ahorra
+MIN_COMPRIMIR = 256
+TIPOS_COMPRIMIBLES = {
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+    'image/x-icon', 'image/vnd.microsoft.icon', 'text/javascript',
+}
+
+
+def _comprimir_gzip(datos: bytes) -> bytes:
+    # mtime fijo: misma entrada, mismos bytes (y el mismo ETag en todos los workers)
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+def _compresores() -> Dict[str, Tuple[str, Callable[[bytes], bytes]]]:
+    """codificación -> (sufijo, función), en orden de preferencia"""
+    compresores = {}
+    if brotli is not None:
+        compresores['br'] = ('.br', lambda datos: brotli.compress(datos, quality=11))
+    compresores['gzip'] = ('.gz', _comprimir_gzip)
+    return compresores
+
+
+class Asset(NamedTuple):
+    original: str
+    archivo: str
+    mimetype: str
+    codificaciones: Tuple[str, ...]
+    mtime: float
+
+
+def _tipo(nombre: str) -> str:
+    return mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+
+
+def _comprimible(mimetype: str) -> bool:
+    return mimetype.startswith('text/') or mimetype in TIPOS_COMPRIMIBLES
+
+
+def _escribir(ruta: str, datos: bytes):
+    """Escritura atómica; si el archivo ya existe no se toca (el nombre identifica el contenido)"""
+    if os.path.exists(ruta):
+        return
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.asset_')
+    try:
+        with os.fdopen(descriptor, 'wb') as destino:
+            destino.write(datos)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def compilar_archivo(origen: str, destino: str, relativo: str) -> Asset:
+    """Copia `relativo` con su huella y escribe las variantes comprimidas que convengan"""
+    ruta = os.path.join(origen, relativo)
+    mtime = os.stat(ruta).st_mtime
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read()
+    huella = hashlib.sha256(datos).hexdigest()[:LARGO_HASH]
+    base, ext = os.path.splitext(relativo)
+    nombre = f'{base}.{huella}{ext}'
+    _escribir(os.path.join(destino, nombre), datos)
+
+    mimetype = _tipo(relativo)
+    codificaciones = []
+    if _comprimible(mimetype) and len(datos) >= MIN_COMPRIMIR:
+        for codificacion, (sufijo, comprimir) in _compresores().items():
+            ruta_variante = os.path.join(destino, nombre + sufijo)
+            if not os.path.exists(ruta_variante):
+                comprimido = comprimir(datos)
+                if len(comprimido) >= len(datos):
+                    continue
+                _escribir(ruta_variante, comprimido)
+            codificaciones.append(codificacion)
+    return Asset(relativo, nombre, mimetype, tuple(codificaciones), mtime)
+
+
+def listar_origen(origen: str) -> List[str]:
+    """Rutas relativas (con '/') de los archivos de `origen` que se compilan"""
+    relativos = []
+    for carpeta, subcarpetas, archivos in os.walk(origen):
+        if carpeta == origen:
+            subcarpetas[:] = [s for s in subcarpetas if s not in EXCLUIDOS]
+        subcarpetas[:] = [s for s in subcarpetas if not s.startswith('.')]
+        for archivo in archivos:
+            if not archivo.startswith('.'):
+                relativo = os.path.relpath(os.path.join(carpeta, archivo), origen)
+                relativos.append(relativo.replace(os.sep, '/'))
+    return sorted(relativos)
+
+
+class RegistroAssets:
+    """Nombres con huella de los archivos estáticos, seguros entre hilos"""
+
+    def __init__(self, origen: str, destino: str, revisar_cambios: bool = False):
+        self.origen = origen
+        self.destino = destino
+        # En desarrollo se recompila un archivo cuando cambia su fecha de modificación
+        self.revisar_cambios = revisar_cambios
+        self._lock = threading.Lock()
+        self._por_original: Dict[str, Asset] = {}
+        self._por_archivo: Dict[str, Asset] = {}
+
+    def _registrar(self, asset: Asset):
+        with self._lock:
+            anterior = self._por_original.get(asset.original)
+            self._por_original[asset.original] = asset
+            self._por_archivo[asset.archivo] = asset
+            if anterior is not None and anterior.archivo != asset.archivo and self.revisar_cambios:
+                # Sólo en desarrollo: en producción un HTML en caché puede pedir el nombre anterior
+                self._por_archivo.pop(anterior.archivo, None)
+
+    def compilar(self, limpiar: bool = False) -> List[Asset]:
+        assets = [compilar_archivo(self.origen, self.destino, r) for r in listar_origen(self.origen)]
+        for asset in assets:
+            self._registrar(asset)
+        manifiesto = {a.original: {'archivo': a.archivo, 'codificaciones': list(a.codificaciones),
+                                   'mtime': a.mtime} for a in assets}
+        _escribir_manifiesto(os.path.join(self.destino, MANIFIESTO), manifiesto)
+        if limpiar:
+            self._limpiar(assets)
+        return assets
+
+    def _limpiar(self, assets: List[Asset]):
+        """Borra las compilaciones anteriores que ya no están en el manifiesto"""
+        vigentes = {MANIFIESTO, '.gitignore'}
+        for asset in assets:
+            vigentes.add(asset.archivo)
+            vigentes.update(asset.archivo + sufijo for sufijo, _ in _compresores().values())
+        for relativo in listar_origen(self.destino):
+            if relativo not in vigentes:
+                os.remove(os.path.join(self.destino, relativo))
+                self._por_archivo.pop(relativo, None)
+
+    def cargar(self) -> bool:
+        """Lee el manifiesto de una compilación previa; False si no hay"""
+        try:
+            with open(os.path.join(self.destino, MANIFIESTO), encoding='utf-8') as archivo:
+                manifiesto = json.load(archivo)
+        except (OSError, ValueError):
+            return False
+        for original, datos in manifiesto.items():
+            self._registrar(Asset(original, datos['archivo'], _tipo(original),
+                                  tuple(datos['codificaciones']), datos['mtime']))
+        return True
+
+    def archivo(self, original: str) -> Optional[str]:
+        """Nombre con huella de `original`, o None si no es un asset compilado"""
+        asset = self._por_original.get(original)
+        if self.revisar_cambios:
+            ruta = os.path.join(self.origen, original)
+            try:
+                mtime = os.stat(ruta).st_mtime
+            except OSError:
+                return None
+            if asset is None or asset.mtime != mtime:
+                asset = compilar_archivo(self.origen, self.destino, original)
+                self._registrar(asset)
+        return asset.archivo if asset else None
+
+    def buscar(self, archivo: str) -> Optional[Asset]:
+        return self._por_archivo.get(archivo)
+
+    def ruta(self, asset: Asset, codificacion: Optional[str] = None) -> str:
+        sufijo = _compresores()[codificacion][0] if codificacion else ''
+        return os.path.join(self.destino, asset.archivo + sufijo)
+
+
+def _escribir_manifiesto(ruta: str, manifiesto: Dict):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    ignorar = os.path.join(os.path.dirname(ruta), '.gitignore')
+    if not os.path.exists(ignorar):
+        # Carpeta generada: no se versiona
+        with open(ignorar, 'w', encoding='utf-8') as archivo:
+            archivo.write('*\n')
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.asset_')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
+    os.replace(temporal, ruta)
+
+
+def elegir_codificacion(disponibles: Tuple[str, ...]) -> Optional[str]:
+    """La codificación disponible con mayor calidad en Accept-Encoding (desempata el orden de preferencia)"""
+    mejor, mejor_calidad = None, 0
+    for codificacion in disponibles:
+        calidad = request.accept_encodings[codificacion]
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = codificacion, calidad
+    return mejor
+
+
+def enviar_asset(nombre: str):
+    """Sirve un asset con huella en la mejor variante precomprimida que acepte el cliente"""
+    registro = get_static_assets()
+    asset = registro.buscar(nombre) if registro is not None else None
+    if asset is None:
+        abort(404)
+    codificacion = elegir_codificacion(asset.codificaciones)
+    respuesta = send_file(
+        registro.ruta(asset, codificacion), mimetype=asset.mimetype, max_age=31536000,
+        etag=f'{asset.archivo}-{codificacion or "identity"}', conditional=True,
+    )
+    if codificacion:
+        respuesta.headers['Content-Encoding'] = codificacion
+    respuesta.headers['Cache-Control'] = CACHE_INMUTABLE
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+
+def static_url(filename: str) -> str:
+    """URL con huella de un archivo de static/; la URL común si no está compilado"""
+    registro = get_static_assets()
+    archivo = registro.archivo(filename) if registro is not None else None
+    if archivo is None:
+        return url_for('static', filename=filename)
+    return url_for('main.asset', nombre=archivo)
+
+
+def carpeta_compilacion(app) -> str:
+    return app.config.get('STATIC_BUILD_FOLDER') or os.path.join(os.path.dirname(app.static_folder), 'static_build')
+
+
+def init_static_assets(app) -> Optional[RegistroAssets]:
+    app.add_template_global(static_url)
+    if not app.config.get('STATIC_ASSETS_ENABLED', True):
+        return None
+    registro = RegistroAssets(app.static_folder, carpeta_compilacion(app), revisar_cambios=app.debug)
+    try:
+        if app.config.get('STATIC_ASSETS_BUILD', True):
+            registro.compilar()
+        elif not registro.cargar():
+            app.logger.info('No hay compilación de archivos estáticos: se sirven sin huella')
+            return None
+    except OSError as e:
+        app.logger.warning(f'No se pudieron compilar los archivos estáticos: {e}')
+        return None
+    app.extensions['static_assets'] = registro
+    return registro
+
+
+def get_static_assets() -> Optional[RegistroAssets]:
+    return current_app.extensions.get('static_assets')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compila los archivos estáticos con huella y precomprimidos')
+    parser.add_argument('--limpiar', action='store_true', help='borra las compilaciones anteriores')
+    args = parser.parse_args(argv)
+
+    from app.app import app
+    registro = RegistroAssets(app.static_folder, carpeta_compilacion(app))
+    assets = registro.compilar(limpiar=args.limpiar)
+    for asset in assets:
+        codificaciones = ', '.join(asset.codificaciones) or '-'
+        print(f'{asset.original} -> {asset.archivo} [{codificaciones}]')
+    if brotli is None:
+        print('brotli no está instalado: sólo se generaron versiones gzip')
+
+
+if __name__ == '__main__':
+    main()
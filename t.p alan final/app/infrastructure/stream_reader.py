@@ -0,0 +1,141 @@
+"""
+Lector de Mensajes sobre Sockets
+Lector con buffer compartido por todos los endpoints TCP: recibe con
+`recv_into` sobre un `bytearray` (sin concatenar `bytes`), separa mensajes
+por salto de línea (v1) o por prefijo de longitud (tramas v2), aplica un
+tamaño máximo por mensaje y entrega todos los mensajes que llegaron en una
+misma lectura.
+
+Los mensajes se devuelven como `memoryview` sobre el buffer interno: son
+válidos hasta la siguiente lectura, así que hay que decodificarlos antes.
+"""
+import socket
+from typing import Iterator, Optional, Tuple
+
+from app.infrastructure.protocol import CABECERA, MAGIC_V2, MAX_MENSAJE, ProtocolError
+
+
+class FramedReader:
+    """Lector bufferizado de mensajes por línea o por longitud sobre un socket"""
+
+    def __init__(self, sock: socket.socket, max_mensaje: int = MAX_MENSAJE,
+                 tamano_inicial: int = 16 * 1024, timeout: Optional[float] = None):
+        self.sock = sock
+        self.max_mensaje = max_mensaje
+        if timeout is not None:
+            sock.settimeout(timeout)
+        self._buf = bytearray(tamano_inicial)
+        self._vista = memoryview(self._buf)
+        self._inicio = 0  # primer byte sin consumir
+        self._fin = 0     # fin de los datos recibidos
+
+    @property
+    def pendientes(self) -> int:
+        """Bytes recibidos y todavía no consumidos"""
+        return self._fin - self._inicio
+
+    def _llenar(self) -> int:
+        """Recibe más datos al final del buffer; 0 si el par cerró la conexión"""
+        if self._fin == len(self._buf):
+            pendientes = self.pendientes
+            if self._inicio > 0:
+                # Compactar: mover lo pendiente (un mensaje parcial) al principio del buffer
+                self._buf[:pendientes] = self._buf[self._inicio:self._fin]
+            else:
+                # Sólo hay un mensaje sin terminar: crecer en un buffer nuevo, hasta el límite
+                limite = self.max_mensaje + CABECERA.size + 1
+                if len(self._buf) >= limite:
+                    raise ProtocolError(f"Mensaje demasiado grande (más de {self.max_mensaje} bytes)")
+                nuevo = bytearray(min(len(self._buf) * 2, limite))
+                nuevo[:pendientes] = self._vista[self._inicio:self._fin]
+                self._buf = nuevo
+                self._vista = memoryview(nuevo)
+            self._inicio, self._fin = 0, pendientes
+        recibidos = self.sock.recv_into(self._vista[self._fin:])
+        self._fin += recibidos
+        return recibidos
+
+    def _asegurar(self, n: int) -> bool:
+        """Espera a tener n bytes pendientes; False si la conexión se cerró limpiamente antes"""
+        while self.pendientes < n:
+            if self._llenar() == 0:
+                if self.pendientes == 0:
+                    return False
+                raise ProtocolError("Conexión cerrada a mitad de un mensaje")
+        return True
+
+    def primer_byte(self) -> Optional[int]:
+        """Primer byte pendiente sin consumirlo (para distinguir v1 de v2); None si cerró"""
+        if not self._asegurar(1):
+            return None
+        return self._buf[self._inicio]
+
+    # --- Mensajes por línea (v1) ------------------------------------------------------
+
+    def _linea_en_buffer(self) -> Optional[memoryview]:
+        idx = self._buf.find(b'\n', self._inicio, self._fin)
+        if idx < 0:
+            return None
+        if idx - self._inicio > self.max_mensaje:
+            raise ProtocolError(f"Mensaje demasiado grande (más de {self.max_mensaje} bytes)")
+        linea = self._vista[self._inicio:idx]
+        self._inicio = idx + 1
+        return linea
+
+    def leer_linea(self) -> Optional[memoryview]:
+        """
+        Siguiente mensaje terminado en '\\n' (sin el separador). Si el par cierra con
+        datos sin separador, los devuelve como último mensaje; None si no queda nada.
+        """
+        while True:
+            linea = self._linea_en_buffer()
+            if linea is not None:
+                return linea
+            if self.pendientes > self.max_mensaje:
+                raise ProtocolError(f"Mensaje demasiado grande (más de {self.max_mensaje} bytes)")
+            if self._llenar() == 0:
+                if self.pendientes == 0:
+                    return None
+                resto = self._vista[self._inicio:self._fin]
+                self._inicio = self._fin
+                return resto
+
+    def lineas_en_buffer(self) -> Iterator[memoryview]:
+        """Mensajes completos que ya llegaron, sin volver a leer del socket"""
+        while True:
+            linea = self._linea_en_buffer()
+            if linea is None:
+                return
+            yield linea
+
+    def resto_en_buffer(self) -> memoryview:
+        """Consume y devuelve todo lo recibido que sigue pendiente, sin separar mensajes"""
+        resto = self._vista[self._inicio:self._fin]
+        self._inicio = self._fin
+        return resto
+
+    # --- Tramas v2 (prefijo de longitud) ----------------------------------------------
+
+    def leer_trama(self) -> Optional[Tuple[int, int, memoryview]]:
+        """Siguiente trama v2 como (codec, request_id, cuerpo); None si el par cerró"""
+        if not self._asegurar(CABECERA.size):
+            return None
+        magic, codec, request_id, longitud = CABECERA.unpack_from(self._buf, self._inicio)
+        if magic != MAGIC_V2:
+            raise ProtocolError(f"Magic inválido: {magic:#x}")
+        if longitud > self.max_mensaje:
+            raise ProtocolError(f"Mensaje demasiado grande: {longitud} bytes")
+        total = CABECERA.size + longitud
+        if not self._asegurar(total):
+            raise ProtocolError("Conexión cerrada a mitad de una trama")
+        inicio = self._inicio + CABECERA.size
+        self._inicio += total
+        return codec, request_id, self._vista[inicio:self._inicio]
+
+    def tramas(self) -> Iterator[Tuple[int, int, memoryview]]:
+        """Itera las tramas hasta que el par cierre la conexión"""
+        while True:
+            trama = self.leer_trama()
+            if trama is None:
+                return
+            yield trama
@@ -1,28 +1,19 @@
-import socket
-import json
 import os
-from typing import Tuple, Dict, Any
+from typing import Iterable, Tuple, Dict, Any
+
+from app.infrastructure.connection_pool import obtener_pool
+from app.infrastructure.protocol import ProtocolError
 
 HOST = os.environ.get('TCP_PERSIST_HOST', '127.0.0.1')
 PORT = int(os.environ.get('TCP_PERSIST_PORT', '6000'))
 
 def _send_request(payload: Dict[str, Any], timeout: float = 3.0) -> Tuple[bool, Dict[str, Any]]:
-    data = (json.dumps(payload) + "\n").encode('utf-8')
-    with socket.create_connection((HOST, PORT), timeout=timeout) as s:
-        s.sendall(data)
-        buf = b''
-        while True:
-            chunk = s.recv(4096)
-            if not chunk:
-                break
-            buf += chunk
-            if b"\n" in chunk:
-                break
-        try:
-            resp = json.loads(buf.decode('utf-8').strip())
-        except json.JSONDecodeError:
-            return False, {"error": "invalid_response"}
-        return bool(resp.get('success')), resp
+    # Protocolo v2 sobre una conexión reutilizada del pool del proceso
+    try:
+        resp = obtener_pool(HOST, PORT).enviar(payload, timeout)
+    except ProtocolError:
+        return False, {"error": "invalid_response"}
+    return bool(resp.get('success')), resp
 
 def save_score_via_tcp(user_id: int, puntaje: int) -> Tuple[bool, Dict[str, Any]]:
     return _send_request({
@@ -30,3 +21,10 @@ def save_score_via_tcp(user_id: int, puntaje: int) -> Tuple[bool, Dict[str, Any]
         'user_id': user_id,
         'puntaje': puntaje,
     })
+
+def save_scores_via_tcp(scores: Iterable[Tuple[int, int]], timeout: float = 10.0) -> Tuple[bool, Dict[str, Any]]:
+    # Lote de (user_id, puntaje) en una transacción; `results` trae un resultado por elemento
+    return _send_request({
+        'action': 'save_scores',
+        'scores': [[user_id, puntaje] for user_id, puntaje in scores],
+    }, timeout)
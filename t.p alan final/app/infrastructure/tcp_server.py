@@ -1,9 +1,19 @@
 import socket
 import threading
 import json
+import codecs
 import sqlite3
 import os
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Any, Dict
+
+from app.infrastructure.async_server import BACKLOG, SERVER_ENGINE, AsyncTCPServer
+from app.infrastructure.protocol import (
+    KEEPALIVE_TIMEOUT, MAGIC_V2, ProtocolError, codec_respuesta, codificar_trama, codificar_v1,
+    decodificar_cuerpo
+)
+from app.infrastructure.stream_reader import FramedReader
 
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'usuarios.db')
@@ -25,63 +35,216 @@ CREATE TABLE IF NOT EXISTS usuarios (
 );
 """
 
-def handle_client(conn, addr):
-    try:
-        data = b''
-        while True:
-            chunk = conn.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-            if b"\n" in chunk:
-                break
-        if not data:
-            return
-        
+class _ConexionesDB:
+    """
+    Conexiones SQLite de larga vida compartidas por los workers del servidor.
+    Cada conexión se abre una sola vez (WAL, busy_timeout) y la usa un hilo a la vez;
+    sqlite3 cachea las sentencias preparadas por conexión, así que se reutilizan.
+    """
+
+    def __init__(self, max_libres: int = 16):
+        self.db_path = None
+        self.max_libres = max_libres
+        self._libres = []
+        self._lock = threading.Lock()
+        # Serializa la preparación: dos hilos con el pool frío no la hacen a la vez
+        self._preparacion = threading.Lock()
+
+    def preparar(self, db_path: str):
+        """Verifica el esquema una única vez al iniciar y activa WAL"""
+        with self._preparacion:
+            self._preparar(db_path)
+
+    def _preparar(self, db_path: str):
+        with self._lock:
+            for con in self._libres:
+                con.close()
+            self._libres = []
+        con = self._abrir(db_path)
         try:
-            payload = json.loads(data.decode('utf-8').strip())
-        except json.JSONDecodeError:
-            conn.sendall((json.dumps({"success": False, "error": "invalid_json"}) + "\n").encode('utf-8'))
-            return
+            con.executescript(SCHEMA_CHECK)
+            con.execute("PRAGMA journal_mode=WAL")
+        except Exception:
+            con.close()
+            raise
+        # Recién ahora la ven los demás hilos: el esquema ya está verificado
+        self.db_path = db_path
+        self._devolver(con)
 
-        action = payload.get('action')
-        if action == 'save_score':
-            user_id = payload.get('user_id')
-            puntaje = payload.get('puntaje')
-            if not isinstance(user_id, int) or not isinstance(puntaje, int):
-                conn.sendall((json.dumps({"success": False, "error": "invalid_params"}) + "\n").encode('utf-8'))
+    def _abrir(self, db_path: str = None) -> sqlite3.Connection:
+        # isolation_level=None: cada sentencia es atómica por sí misma (autocommit)
+        con = sqlite3.connect(db_path or self.db_path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def _devolver(self, con: sqlite3.Connection):
+        with self._lock:
+            if len(self._libres) < self.max_libres:
+                self._libres.append(con)
                 return
-            
+        con.close()
+
+    @contextmanager
+    def conexion(self):
+        if self.db_path != DB_PATH:
+            # start_server() ya la preparó; esto cubre un DB_PATH cambiado después (benchmarks)
+            with self._preparacion:
+                if self.db_path != DB_PATH:
+                    self._preparar(DB_PATH)
+        with self._lock:
+            con = self._libres.pop() if self._libres else None
+        if con is None:
+            con = self._abrir()
+        try:
+            yield con
+        except Exception:
+            con.close()
+            raise
+        self._devolver(con)
+
+
+_db = _ConexionesDB()
+
+# Escritura condicional en una sola sentencia: sólo actualiza si supera el máximo actual,
+# sin lectura previa ni carrera entre dos guardados concurrentes del mismo usuario
+UPDATE_SI_RECORD = """
+    UPDATE usuarios SET puntaje_maximo = ?, fecha_ultimo_juego = ?
+    WHERE id = ? AND COALESCE(puntaje_maximo, 0) < ?
+"""
+SELECT_MAXIMO = "SELECT puntaje_maximo FROM usuarios WHERE id = ?"
+
+
+MAX_LOTE = 1000  # elementos por petición save_scores
+
+
+def _guardar(con: sqlite3.Connection, user_id: int, puntaje: int, fecha: str) -> Dict[str, Any]:
+    cur = con.execute(UPDATE_SI_RECORD, (puntaje, fecha, user_id, puntaje))
+    if cur.rowcount == 1:
+        return {"success": True, "nuevo_record": True, "puntaje_maximo": puntaje}
+
+    # No hubo récord: distinguir usuario inexistente de puntaje menor
+    row = con.execute(SELECT_MAXIMO, (user_id,)).fetchone()
+    if not row:
+        return {"success": False, "error": "user_not_found"}
+    return {"success": True, "nuevo_record": False, "puntaje_maximo": row[0] or 0}
+
+
+def _save_score(payload: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = payload.get('user_id')
+    puntaje = payload.get('puntaje')
+    if type(user_id) is not int or type(puntaje) is not int:
+        return {"success": False, "error": "invalid_params"}
+
+    try:
+        with _db.conexion() as con:
+            return _guardar(con, user_id, puntaje, datetime.utcnow().isoformat())
+    except Exception as e:
+        return {"success": False, "error": "db_error", "details": str(e)}
+
+
+def _save_scores(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Guarda una lista de [user_id, puntaje] en una sola transacción.
+    Devuelve un resultado por elemento, en el mismo orden que la petición.
+    """
+    scores = payload.get('scores')
+    if not isinstance(scores, list):
+        return {"success": False, "error": "invalid_params"}
+    if len(scores) > MAX_LOTE:
+        return {"success": False, "error": "batch_too_large", "max": MAX_LOTE}
+
+    fecha = datetime.utcnow().isoformat()
+    results = []
+    try:
+        with _db.conexion() as con:
+            con.execute("BEGIN IMMEDIATE")
             try:
-                with sqlite3.connect(DB_PATH) as con:
-                    cur = con.cursor()
-                    cur.executescript(SCHEMA_CHECK)
-                    cur.execute("SELECT puntaje_maximo FROM usuarios WHERE id=?", (user_id,))
-                    row = cur.fetchone()
-                    if not row:
-                        conn.sendall((json.dumps({"success": False, "error": "user_not_found"}) + "\n").encode('utf-8'))
-                        return
-                    
-                    current_max = row[0] or 0
-                    nuevo_record = puntaje > current_max
-                    if nuevo_record:
-                        cur.execute(
-                            "UPDATE usuarios SET puntaje_maximo=?, fecha_ultimo_juego=? WHERE id=?",
-                            (puntaje, datetime.utcnow().isoformat(), user_id)
-                        )
-                        con.commit()
-                    
-                    conn.sendall((json.dumps({
-                        "success": True,
-                        "nuevo_record": nuevo_record,
-                        "puntaje_maximo": max(puntaje, current_max)
-                    }) + "\n").encode('utf-8'))
-            except Exception as e:
-                conn.sendall((json.dumps({"success": False, "error": "db_error", "details": str(e)}) + "\n").encode('utf-8'))
-        elif action == 'ping':
-            conn.sendall((json.dumps({"success": True, "pong": True}) + "\n").encode('utf-8'))
+                for item in scores:
+                    if (not isinstance(item, (list, tuple)) or len(item) != 2
+                            or type(item[0]) is not int or type(item[1]) is not int):
+                        results.append({"success": False, "error": "invalid_params"})
+                        continue
+                    results.append(_guardar(con, item[0], item[1], fecha))
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+    except Exception as e:
+        return {"success": False, "error": "db_error", "details": str(e)}
+    return {"success": True, "results": results}
+
+
+def procesar_peticion(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta una acción del protocolo y devuelve la respuesta (independiente del transporte)"""
+    if not isinstance(payload, dict):
+        # JSON válido pero no un objeto (p. ej. `[1]`)
+        return {"success": False, "error": "invalid_json"}
+    action = payload.get('action')
+    if action == 'save_score':
+        return _save_score(payload)
+    elif action == 'save_scores':
+        return _save_scores(payload)
+    elif action == 'ping':
+        return {"success": True, "pong": True}
+    return {"success": False, "error": "unknown_action"}
+
+
+def decodificar_v1(data) -> Dict[str, Any]:
+    return json.loads(codecs.utf_8_decode(data)[0].strip())
+
+
+def _responder_v1(conn, linea):
+    try:
+        payload = decodificar_v1(linea)
+    except (UnicodeDecodeError, json.JSONDecodeError, RecursionError):
+        conn.sendall(codificar_v1({"success": False, "error": "invalid_json"}))
+        return
+    conn.sendall(codificar_v1(procesar_peticion(payload)))
+
+
+def _atender_v1(conn, lector: FramedReader):
+    """
+    Protocolo v1: una línea JSON por conexión. Si el cliente envió varias líneas
+    juntas, se contestan todas las que ya llegaron antes de cerrar.
+    """
+    linea = lector.leer_linea()
+    if linea is None:
+        return
+    _responder_v1(conn, linea)
+    for linea in lector.lineas_en_buffer():
+        _responder_v1(conn, linea)
+
+
+def _atender_v2(conn, lector: FramedReader):
+    """Protocolo v2: tramas con id sobre una conexión persistente hasta que el cliente cierre"""
+    try:
+        for codec, request_id, cuerpo in lector.tramas():
+            try:
+                payload = decodificar_cuerpo(codec, cuerpo)
+            except ProtocolError:
+                respuesta = {"success": False, "error": "invalid_json"}
+            else:
+                respuesta = procesar_peticion(payload)
+            conn.sendall(codificar_trama(request_id, respuesta, codec_respuesta(codec)))
+    except socket.timeout:
+        return
+
+
+def handle_client(conn, addr):
+    try:
+        # Sin timeout, un cliente que conecta y no envía nada ocupa el hilo para siempre
+        lector = FramedReader(conn, timeout=KEEPALIVE_TIMEOUT)
+        primero = lector.primer_byte()
+        if primero is None:
+            return
+        if primero == MAGIC_V2:
+            _atender_v2(conn, lector)
         else:
-            conn.sendall((json.dumps({"success": False, "error": "unknown_action"}) + "\n").encode('utf-8'))
+            _atender_v1(conn, lector)
+    except socket.timeout:
+        pass  # no llegó el primer mensaje (o la línea v1 completa) a tiempo
+    except (OSError, ProtocolError):
+        pass
     finally:
         try:
             conn.shutdown(socket.SHUT_RDWR)
@@ -90,11 +253,17 @@ def handle_client(conn, addr):
         conn.close()
 
 
-def start_server(host: str = HOST, port: int = PORT):
+def start_server(host: str = HOST, port: int = PORT, engine: str = SERVER_ENGINE):
+    _db.preparar(DB_PATH)
+    if engine == 'asyncio':
+        servidor = AsyncTCPServer(procesar_peticion, decodificar_v1, error_formato='invalid_json', nombre='TCP')
+        servidor.serve_forever(host, port)
+        return
+
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind((host, port))
-        s.listen(5)
+        s.listen(BACKLOG)
         print(f"[TCP] Persistence server listening on {host}:{port}")
         while True:
             conn, addr = s.accept()
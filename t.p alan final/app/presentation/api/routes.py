@@ -1,18 +1,31 @@
-from flask import Blueprint, request, jsonify, session, redirect, url_for, flash
+from flask import Blueprint, request, jsonify, redirect, url_for, flash, Response
 from flask import current_app as app
 from app.data.models.db_models import Usuario
 from app.data.database import db
+from app.data.leaderboard import get_leaderboard, sincronizar_usuario
+from app.data.score_buffer import get_score_buffer, sincronizar_puntaje
+from app.data.user_listing import TAMANO_PAGINA, pagina_usuarios
 from functools import wraps
 from datetime import datetime
+import json
+import time
 from app.infrastructure.tcp_client import save_score_via_tcp
-from app.infrastructure.distributed_service import DistributedServiceClient
+from app.infrastructure.distributed_service import DistributedServiceClient, publicar_evento_usuario
+from app.infrastructure.notification_hub import get_notification_hub
+from app.infrastructure.password_hashing import get_password_hasher
+from app.presentation.http_cache import respuesta_cacheada
+from app.presentation.identity import current_user, current_user_id
 
 api_bp = Blueprint('api', __name__)
 
+# Stream de notificaciones (SSE): duración máxima de cada conexión y latido
+STREAM_DURACION = 300
+STREAM_HEARTBEAT = 15
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if current_user_id() is None:
             if request.is_json:
                 return jsonify({'success': False, 'error': 'No autenticado'}), 401
             return redirect(url_for('main.login'))
@@ -22,7 +35,7 @@ def login_required(f):
 @api_bp.route('/admin/reiniciar_puntuacion/<int:usuario_id>', methods=['POST'])
 @login_required
 def reiniciar_puntaje(usuario_id):
-    usuario_actual = Usuario.query.get(session['user_id'])
+    usuario_actual = current_user()
     if not usuario_actual or not usuario_actual.es_admin:
         flash('No tenés permiso para esta acción', 'danger')
         return redirect(url_for('main.index'))
@@ -33,8 +46,13 @@ def reiniciar_puntaje(usuario_id):
         return redirect(url_for('main.admin_dashboard'))
     
     try:
+        if sincronizar_puntaje(usuario.id):
+            db.session.refresh(usuario)
+        anterior = usuario.puntaje_maximo
         usuario.puntaje_maximo = 0
         db.session.commit()
+        sincronizar_usuario(usuario)
+        publicar_evento_usuario('score', usuario.id, usuario.es_admin, 0, anterior)
         flash(f'Puntuación de {usuario.nombre} reiniciada', 'success')
     except:
         db.session.rollback()
@@ -42,6 +60,18 @@ def reiniciar_puntaje(usuario_id):
     
     return redirect(url_for('main.admin_dashboard'))
 
+@api_bp.route('/admin/usuarios', methods=['GET'])
+@login_required
+def listar_usuarios():
+    usuario_actual = current_user()
+    if not usuario_actual or not usuario_actual.es_admin:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    despues = request.args.get('despues', 0, type=int)
+    limite = request.args.get('limite', TAMANO_PAGINA, type=int)
+    usuarios, siguiente = pagina_usuarios(despues, limite, request.args.get('q', ''))
+    return jsonify({'success': True, 'usuarios': usuarios, 'siguiente': siguiente})
+
 @api_bp.route('/guardar_puntaje_tcp', methods=['POST'])
 @login_required
 def guardar_puntaje_tcp():
@@ -50,12 +80,17 @@ def guardar_puntaje_tcp():
         if not data or 'puntaje' not in data:
             return jsonify({'success': False, 'error': 'Puntaje no proporcionado'}), 400
 
-        usuario = Usuario.query.get(session['user_id'])
+        usuario = current_user()
         if not usuario or usuario.es_admin:
             return jsonify({'success': False, 'error': 'Usuario no autorizado'}), 404
 
         puntaje = int(data['puntaje'])
         ok, resp = save_score_via_tcp(usuario.id, puntaje)
+        if ok:
+            get_leaderboard().actualizar(usuario.id, resp.get('puntaje_maximo', puntaje))
+            if resp.get('nuevo_record'):
+                publicar_evento_usuario('score', usuario.id, False, resp.get('puntaje_maximo', puntaje),
+                                        usuario.puntaje_maximo)
         return jsonify(resp), 200 if ok else 500
     except Exception as e:
         app.logger.error(f'Error guardando puntaje TCP: {e}')
@@ -64,7 +99,7 @@ def guardar_puntaje_tcp():
 @api_bp.route('/admin/eliminar_usuario/<int:usuario_id>', methods=['POST'])
 @login_required
 def eliminar_usuario(usuario_id):
-    admin_actual = Usuario.query.get(session['user_id'])
+    admin_actual = current_user()
     if not admin_actual or not admin_actual.es_admin:
         flash('No tenés permiso para esta acción', 'danger')
         return redirect(url_for('main.index'))
@@ -84,8 +119,13 @@ def eliminar_usuario(usuario_id):
         return redirect(url_for('main.admin_dashboard'))
 
     try:
+        if sincronizar_puntaje(usuario.id):
+            db.session.refresh(usuario)
+        es_admin, puntaje_maximo = usuario.es_admin, usuario.puntaje_maximo
         db.session.delete(usuario)
         db.session.commit()
+        get_leaderboard().eliminar(usuario_id)
+        publicar_evento_usuario('deleted', usuario_id, es_admin, puntaje_maximo)
         flash('Usuario eliminado', 'success')
     except:
         db.session.rollback()
@@ -98,13 +138,14 @@ def eliminar_usuario(usuario_id):
 def get_user_stats():
     try:
         client = DistributedServiceClient()
-        ok, resp = client.get_user_stats(session['user_id'])
+        ok, resp = client.get_user_stats(current_user_id())
         return jsonify(resp), 200 if ok else 500
     except Exception as e:
         app.logger.error(f'Error obteniendo stats usuario: {e}')
         return jsonify({'success': False, 'error': 'Error al obtener estadísticas'}), 500
 
 @api_bp.route('/stats/global', methods=['GET'])
+@respuesta_cacheada()
 def get_global_stats():
     try:
         client = DistributedServiceClient()
@@ -114,17 +155,84 @@ def get_global_stats():
         app.logger.error(f'Error obteniendo stats globales: {e}')
         return jsonify({'success': False, 'error': 'Error al obtener estadísticas'}), 500
 
+@api_bp.route('/stats/ingesta', methods=['GET'])
+@login_required
+def get_ingest_stats():
+    usuario_actual = current_user()
+    if not usuario_actual or not usuario_actual.es_admin:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    buffer = get_score_buffer()
+    if buffer is None:
+        return jsonify({'success': True, 'habilitado': False, 'stats': {}})
+    return jsonify({'success': True, 'habilitado': True, 'stats': buffer.stats()})
+
+@api_bp.route('/stats/hash', methods=['GET'])
+@login_required
+def get_hash_stats():
+    usuario_actual = current_user()
+    if not usuario_actual or not usuario_actual.es_admin:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    servicio = get_password_hasher()
+    if servicio is None:
+        return jsonify({'success': True, 'habilitado': False, 'stats': {}})
+    return jsonify({'success': True, 'habilitado': True, 'stats': servicio.stats()})
+
 @api_bp.route('/notificaciones', methods=['GET'])
 @login_required
 def get_notifications():
     try:
         client = DistributedServiceClient()
-        ok, resp = client.get_notifications(session['user_id'])
+        ok, resp = client.get_notifications(current_user_id())
         return jsonify(resp), 200 if ok else 500
     except Exception as e:
         app.logger.error(f'Error obteniendo notificaciones: {e}')
         return jsonify({'success': False, 'error': 'Error al obtener notificaciones'}), 500
 
+def _evento_sse(notificacion):
+    return f"id: {notificacion['id']}\nevent: notificacion\ndata: {json.dumps(notificacion)}\n\n"
+
+@api_bp.route('/notificaciones/stream', methods=['GET'])
+@login_required
+def stream_notifications():
+    """
+    Server-Sent Events con las notificaciones del usuario. El cursor es el id de la
+    última notificación recibida (Last-Event-ID al reconectar, o ?desde=).
+    """
+    user_id = current_user_id()
+    hub = get_notification_hub()
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    iniciales = []
+    if cursor is None:
+        # Primera conexión: una única consulta para lo ya retenido
+        ok, resp = DistributedServiceClient().get_notifications(user_id)
+        iniciales = resp.get('notifications', []) if ok else []
+        cursor = iniciales[-1]['id'] if iniciales else 0
+    try:
+        cursor = int(cursor)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Cursor inválido'}), 400
+
+    def generar(cursor):
+        yield 'retry: 3000\n\n'
+        for notificacion in iniciales:
+            yield _evento_sse(notificacion)
+        fin = time.monotonic() + STREAM_DURACION
+        while time.monotonic() < fin:
+            nuevas = hub.esperar(user_id, cursor, STREAM_HEARTBEAT)
+            if not nuevas:
+                yield ': ping\n\n'
+                continue
+            for notificacion in nuevas:
+                yield _evento_sse(notificacion)
+            cursor = nuevas[-1]['id']
+
+    return Response(generar(cursor), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_bp.route('/guardar_puntaje', methods=['POST'])
 @login_required
 def guardar_puntaje():
@@ -133,18 +241,31 @@ def guardar_puntaje():
         if not data or 'puntaje' not in data:
             return jsonify({'success': False, 'error': 'Puntaje no proporcionado'}), 400
             
-        usuario = Usuario.query.get(session['user_id'])
+        usuario = current_user()
         if not usuario or usuario.es_admin:
             return jsonify({'success': False, 'error': 'Usuario no autorizado'}), 404
         
         puntaje = int(data['puntaje'])
-        nuevo_record = puntaje > usuario.puntaje_maximo
+        buffer = get_score_buffer()
+        if buffer is not None:
+            # Ingesta diferida: responder desde el máximo cacheado y escribir por lotes
+            nuevo_record, puntaje_maximo, anterior = buffer.registrar(usuario.id, puntaje, usuario.puntaje_maximo)
+            if nuevo_record:
+                get_leaderboard().actualizar(usuario.id, puntaje_maximo)
+        else:
+            anterior = usuario.puntaje_maximo
+            nuevo_record = puntaje > anterior
+            if nuevo_record:
+                usuario.puntaje_maximo = puntaje
+                usuario.fecha_ultimo_juego = datetime.utcnow()
+                db.session.commit()
+                sincronizar_usuario(usuario)
+            puntaje_maximo = usuario.puntaje_maximo
         
         if nuevo_record:
-            usuario.puntaje_maximo = puntaje
-            usuario.fecha_ultimo_juego = datetime.utcnow()
-            db.session.commit()
-            
+            if buffer is None:
+                # Con ingesta diferida el evento sale al volcar el lote (ver ScoreBuffer)
+                publicar_evento_usuario('score', usuario.id, False, puntaje_maximo, anterior)
             try:
                 client = DistributedServiceClient()
                 client.add_notification(
@@ -159,14 +280,14 @@ def guardar_puntaje():
                 'success': True, 
                 'message': '¡Nuevo récord!',
                 'nuevo_record': True,
-                'puntaje_maximo': usuario.puntaje_maximo
+                'puntaje_maximo': puntaje_maximo
             })
         
         return jsonify({
             'success': True, 
             'message': 'Puntaje guardado',
             'nuevo_record': False,
-            'puntaje_maximo': usuario.puntaje_maximo
+            'puntaje_maximo': puntaje_maximo
         })
             
     except Exception as e:
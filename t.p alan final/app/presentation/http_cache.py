@@ -0,0 +1,115 @@
+"""
+Caché de Respuestas HTTP
+Decorador para vistas que muestran lo mismo a todos hasta que cambia un puntaje
+(ranking, estadísticas globales). La respuesta ya renderizada se guarda en una
+LRU en memoria acotada por bytes, con clave (ruta, query string, clase de
+autenticación), y se identifica con un ETag que incluye la versión de los datos
+(`app.data.data_version`). Un `If-None-Match` vigente se responde con 304 sin
+ejecutar la vista; un cambio de puntaje avanza la versión y vuelve a renderizar.
+"""
+import hashlib
+import time
+from functools import wraps
+from typing import NamedTuple, Optional, Tuple
+
+from flask import current_app, make_response, request, session
+
+from app.data.avatar_pipeline import avatar_url
+from app.data.data_version import version_datos
+from app.infrastructure.cache import LRUCache
+from app.presentation.identity import usuario_sesion
+
+
+class RespuestaGuardada(NamedTuple):
+    etag: str
+    cuerpo: bytes
+    mimetype: str
+
+
+def init_http_cache(app) -> Optional[LRUCache]:
+    # Cambios que este proceso no ve (otros workers, el servidor TCP) tardan a lo sumo el TTL;
+    # con TTL 0 nada se podría reutilizar (y la época del ETag dividiría por cero)
+    ttl = app.config.get('HTTP_CACHE_TTL', 60)
+    if not app.config.get('HTTP_CACHE_ENABLED', True) or ttl <= 0:
+        return None
+    cache = LRUCache(
+        max_entradas=app.config.get('HTTP_CACHE_MAX_ENTRIES', 1024),
+        max_bytes=app.config.get('HTTP_CACHE_MAX_BYTES', 8 * 1024 * 1024),
+        ttl=ttl,
+    )
+    app.extensions['http_cache'] = cache
+    return cache
+
+
+def get_http_cache() -> Optional[LRUCache]:
+    return current_app.extensions.get('http_cache')
+
+
+def clase_autenticacion(por_usuario: bool = False) -> str:
+    """
+    'anonimo', 'usuario' o 'admin'. Con `por_usuario` (páginas con la barra de
+    navegación) se agrega quién es y cómo se lo muestra, porque el HTML cambia.
+    """
+    datos = usuario_sesion()
+    if datos is None:
+        return 'anonimo'
+    clase = 'admin' if datos['es_admin'] else 'usuario'
+    if por_usuario:
+        # La URL resuelta del avatar cubre las variantes y la caída a la imagen por defecto
+        return f"{clase}:{datos['id']}:{datos['nombre']}:{avatar_url(datos, 30, 'jpeg')}:{avatar_url(datos, 60)}"
+    return clase
+
+
+def _query_normalizado() -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(request.args.items(multi=True)))
+
+
+def _etag(*partes) -> str:
+    return hashlib.sha1('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:20]
+
+
+def _con_cabeceras(respuesta, etag: str, cache_control: str):
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers['Cache-Control'] = cache_control
+    return respuesta
+
+
+def respuesta_cacheada(por_usuario: bool = False, max_age: int = 0):
+    """
+    Cachea las respuestas 200 de un GET. `max_age` en 0 obliga al navegador a
+    revalidar siempre (barato: 304 sin ejecutar la vista).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            cache = get_http_cache()
+            # Con mensajes flash pendientes la vista los consume: ni se reutiliza ni se guarda
+            if cache is None or request.method != 'GET' or '_flashes' in session:
+                return vista(*args, **kwargs)
+
+            clase = clase_autenticacion(por_usuario)
+            query = _query_normalizado()
+            # La época del TTL acota lo que tarda en verse un cambio hecho por otro proceso
+            epoca = int(time.time() // cache.ttl)
+            etag = _etag(request.endpoint, query, clase, version_datos(), epoca)
+            alcance = 'private' if por_usuario and clase != 'anonimo' else 'public'
+            cache_control = f'{alcance}, max-age={max_age}' if max_age else f'{alcance}, no-cache'
+
+            if request.if_none_match.contains_weak(etag):
+                return _con_cabeceras(make_response('', 304), etag, cache_control)
+
+            clave = (request.endpoint, query, clase)
+            guardada = cache.get(clave)
+            if guardada is None or guardada.etag != etag:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200 or respuesta.is_streamed:
+                    return respuesta
+                cuerpo = respuesta.get_data()
+                # Versiones anteriores de la misma clave se pisan: no se acumulan entradas viejas
+                cache.set(clave, RespuestaGuardada(etag, cuerpo, respuesta.mimetype), tamano=len(cuerpo))
+                return _con_cabeceras(respuesta, etag, cache_control)
+
+            respuesta = current_app.response_class(guardada.cuerpo, mimetype=guardada.mimetype)
+            return _con_cabeceras(respuesta, etag, cache_control)
+        return envoltura
+    return decorador
@@ -0,0 +1,67 @@
+"""
+Identidad del Usuario por Request
+`current_user()` carga el usuario de la sesión una sola vez por request y lo
+comparte (vía `flask.g`) entre decoradores, rutas y el context processor.
+Para la barra de navegación alcanza con una proyección liviana
+(`usuario_sesion()`): una búsqueda por clave primaria de sus columnas, sin
+cargar el usuario, que además detecta cuentas eliminadas y cambios hechos en
+segundo plano o desde otra sesión (p. ej. las variantes de la foto).
+"""
+from typing import Any, Dict, Optional
+
+from flask import g, session
+
+from app.data.avatar_pipeline import leer_variantes
+from app.data.models.db_models import Usuario
+
+COLUMNAS_PROYECCION = (Usuario.id, Usuario.nombre, Usuario.foto_perfil, Usuario.foto_variantes, Usuario.es_admin)
+
+
+def proyeccion(usuario: Any) -> Dict[str, Any]:
+    """Campos del usuario (o de una fila con COLUMNAS_PROYECCION) que muestra la barra de navegación"""
+    return {
+        'id': usuario.id,
+        'nombre': usuario.nombre,
+        'foto_perfil': usuario.foto_perfil or 'default.svg',
+        'foto_variantes': leer_variantes(usuario.foto_variantes),
+        'es_admin': bool(usuario.es_admin),
+    }
+
+
+def current_user_id() -> Optional[int]:
+    return session.get('user_id')
+
+
+def current_user() -> Optional[Usuario]:
+    """Usuario de la sesión, cargado como mucho una vez por request; None si no hay o ya no existe"""
+    if '_usuario_actual' not in g:
+        user_id = current_user_id()
+        usuario = Usuario.query.get(user_id) if user_id is not None else None
+        if usuario is None and user_id is not None:
+            # La cuenta se eliminó con la sesión abierta
+            session.clear()
+        g._usuario_actual = usuario
+    return g._usuario_actual
+
+
+def iniciar_sesion(usuario: Usuario):
+    session['user_id'] = usuario.id
+    session['es_admin'] = usuario.es_admin
+    g._usuario_actual = usuario
+
+
+def usuario_sesion() -> Optional[Dict[str, Any]]:
+    """Proyección del usuario de la sesión, leída como mucho una vez por request; None si no hay o ya no existe"""
+    if '_proyeccion' not in g:
+        user_id = current_user_id()
+        if user_id is None:
+            return None
+        if '_usuario_actual' in g:
+            usuario = g._usuario_actual
+        else:
+            usuario = Usuario.query.with_entities(*COLUMNAS_PROYECCION).filter_by(id=user_id).first()
+            if usuario is None:
+                # La cuenta se eliminó con la sesión abierta
+                session.clear()
+        g._proyeccion = proyeccion(usuario) if usuario is not None else None
+    return g._proyeccion
@@ -1,52 +1,27 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash, request, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from app.data.models.db_models import Usuario, Recompensa, CanjeRecompensa
+from flask import Blueprint, render_template, redirect, url_for, session, flash, request, current_app, make_response
+from sqlalchemy import func
+from app.data.models.db_models import Usuario, CanjeRecompensa
+from app.data.avatar_pipeline import borrar_variantes, get_avatar_pipeline, leer_variantes
+from app.data.data_version import avanzar_version
 from app.data.database import db
+from app.data.leaderboard import get_leaderboard, sincronizar_usuario, obtener_top_usuarios
+from app.data.reward_catalog import get_reward_catalog, logros_de_usuario
+from app.data.reward_redemption import CANJEADO, canjear, normalizar_clave
+from app.data.score_buffer import sincronizar_puntaje
+from app.data.upload_manifest import get_upload_manifest
+from app.data.upload_store import enviar_upload, es_inmutable, guardar_subida, variantes_existentes
+from app.data.user_listing import TAMANO_PAGINA, pagina_usuarios
+from app.infrastructure.distributed_service import invalidar_stats_usuario, publicar_evento_usuario
+from app.infrastructure.password_hashing import necesita_rehash
+from app.infrastructure.static_assets import enviar_asset
+from app.presentation.http_cache import clase_autenticacion, respuesta_cacheada
+from app.presentation.identity import current_user, iniciar_sesion
+import hashlib
 import os
 from uuid import uuid4
 
 import random
 
-RECOMPENSAS_MOCKS = [
-    {
-        "nombre": "10% OFF en tienda Samsung",
-        "descripcion": "Cupón exclusivo para usar en la tienda online de Samsung.",
-        "puntos": 250,
-        "imagen": "default.png"
-    },
-    {
-        "nombre": "Auriculares Galaxy Buds",
-        "descripcion": "Descuento para adquirir Galaxy Buds originales.",
-        "puntos": 500,
-        "imagen": "default.png"
-    },
-  {
-        "nombre": "Reloj Galaxy Watch",
-        "descripcion": "Participá del sorteo mensual por un smartwatch Galaxy.",
-        "puntos": 650,
-        "imagen": "default.png"
-    },
-    {
-        "nombre": "Entrenamiento personalizado",
-        "descripcion": "Sesión virtual con entrenador partner.",
-        "puntos": 200,
-        "imagen": "default.png"
-    },
-    {
-        "nombre": "Gift Card PedidosYa",
-        "descripcion": "Tarjeta regalo digital para delivery.",
-        "puntos": 150,
-        "imagen": "default.png"
-    },
-    {
-        "nombre": "Sticker y Merch Activate",
-        "descripcion": "Merchandising oficial del programa Activate.",
-        "puntos": 50,
-        "imagen": "default.png"
-    }
-]
-
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
@@ -65,9 +40,12 @@ def login():
         password = request.form.get('password', '')
         
         usuario = Usuario.query.filter_by(email=email).first()
-        if usuario and check_password_hash(usuario.password, password):
-            session['user_id'] = usuario.id
-            session['es_admin'] = usuario.es_admin
+        if usuario and usuario.check_password(password):
+            if necesita_rehash(usuario.password):
+                # Cambió PASSWORD_HASH_METHOD: se guarda con el costo nuevo ahora que se conoce la contraseña
+                usuario.set_password(password)
+                db.session.commit()
+            iniciar_sesion(usuario)
             return redirect(url_for('main.index'))
         
         flash('Email o contraseña incorrectos', 'danger')
@@ -98,11 +76,13 @@ def registro():
         nuevo = Usuario(
             nombre=nombre,
             email=email,
-            password=generate_password_hash(password),
             es_admin=(codigo_admin == '6767')
         )
+        nuevo.set_password(password)
         db.session.add(nuevo)
         db.session.commit()
+        sincronizar_usuario(nuevo)
+        publicar_evento_usuario('registered', nuevo.id, nuevo.es_admin)
         flash('¡Registro exitoso! Ya podés iniciar sesión', 'success')
         return redirect(url_for('main.login'))
     
@@ -114,67 +94,86 @@ def juego():
         flash('Iniciá sesión para jugar', 'warning')
         return redirect(url_for('main.login'))
     
-    top_usuarios = Usuario.query.filter_by(es_admin=False).order_by(Usuario.puntaje_maximo.desc()).limit(10).all()
+    top_usuarios = obtener_top_usuarios(10)
     return render_template('juego.html', top_usuarios=top_usuarios)
 
 # Recompensas vista/canjeo
 @main_bp.route('/recompensas', methods=['GET', 'POST'])
 def recompensas():
-    if 'user_id' not in session:
+    usuario = current_user()
+    if usuario is None:
         flash('Iniciá sesión para acceder a recompensas', 'warning')
         return redirect(url_for('main.login'))
 
-    usuario = Usuario.query.get(session['user_id'])
-    # Inicializar recompensas de base sólo si no hay ninguna
-    if not Recompensa.query.first():
-        for data in RECOMPENSAS_MOCKS:
-            recompensa = Recompensa(**data)
-            db.session.add(recompensa)
-        db.session.commit()
-
-    recompensas = Recompensa.query.all()
-
     if request.method == 'POST':
-        rid = request.form.get('recompensa_id')
-        recompensa = Recompensa.query.get(rid)
+        recompensa = get_reward_catalog().obtener(request.form.get('recompensa_id', type=int))
         if not recompensa:
             flash('Recompensa no encontrada', 'danger')
             return redirect(url_for('main.recompensas'))
-        if usuario.puntaje_maximo < recompensa.puntos:
+        clave = normalizar_clave(request.headers.get('Idempotency-Key') or request.form.get('clave_idempotencia'))
+        if sincronizar_puntaje(usuario.id):
+            db.session.refresh(usuario)
+        resultado = canjear(usuario.id, recompensa.id, recompensa.puntos, clave)
+        if not resultado.exitoso:
             flash('No tenés suficientes puntos para canjear esta recompensa', 'warning')
             return redirect(url_for('main.recompensas'))
-        c = CanjeRecompensa(usuario_id=usuario.id, recompensa_id=recompensa.id)
-        db.session.add(c)
-        usuario.puntaje_maximo -= recompensa.puntos
-        db.session.commit()
+        if resultado.estado == CANJEADO:
+            sincronizar_usuario(usuario)
+            publicar_evento_usuario('score', usuario.id, usuario.es_admin, resultado.puntaje, resultado.anterior)
+        # Un reintento ve el mismo resultado que el canje original
         flash(f'Recompensa canjeada: {recompensa.nombre}', 'success')
         return redirect(url_for('main.recompensas'))
 
-    # Obtener logros (canjes) para mostrarlos en el modal opcionalmente
-    logros = CanjeRecompensa.query.filter_by(usuario_id=usuario.id).order_by(CanjeRecompensa.fecha.desc()).all()
-    return render_template('recompensas.html', usuario=usuario, recompensas=recompensas, logros=logros)
+    # El catálogo sale de memoria; la página depende además del puntaje y de los canjes del usuario
+    catalogo = get_reward_catalog()
+    cantidad, ultimo = db.session.query(
+        func.count(CanjeRecompensa.id), func.max(CanjeRecompensa.id)
+    ).filter(CanjeRecompensa.usuario_id == usuario.id).one()
+    # La barra de navegación entra por clase_autenticacion: nombre y URLs del avatar (variantes incluidas)
+    etag = _etag_pagina('recompensas', catalogo.version, usuario.puntaje_maximo,
+                        clase_autenticacion(por_usuario=True), cantidad, ultimo)
+    # Con mensajes flash pendientes la página no es reutilizable
+    cacheable = '_flashes' not in session
+    if cacheable and request.if_none_match.contains_weak(etag):
+        return _no_modificado(etag)
+
+    respuesta = make_response(render_template(
+        'recompensas.html', usuario=usuario, recompensas=catalogo.recompensas(),
+        logros=logros_de_usuario(usuario.id),
+        # Una clave por formulario: reenviar el mismo formulario no canjea dos veces
+        nueva_clave=lambda: uuid4().hex
+    ))
+    if cacheable:
+        respuesta.set_etag(etag, weak=True)
+        respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
 
-# Mostrar logros/canjes en perfil
-def get_logros(usuario_id):
-    return CanjeRecompensa.query.filter_by(usuario_id=usuario_id).order_by(CanjeRecompensa.fecha.desc()).all()
+def _etag_pagina(*partes) -> str:
+    return hashlib.sha1('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:20]
+
+def _no_modificado(etag: str):
+    respuesta = make_response('', 304)
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
 
 # Ajustar ruta de perfil para incluir logros
 @main_bp.route('/perfil')
 def perfil():
-    if 'user_id' not in session:
+    usuario = current_user()
+    if usuario is None:
         flash('Iniciá sesión para ver tu perfil', 'danger')
         return redirect(url_for('main.login'))
-    usuario = Usuario.query.get(session['user_id'])
-    logros = get_logros(usuario.id)
-    return render_template('perfil.html', usuario=usuario, logros=logros)
+    logros = logros_de_usuario(usuario.id)
+    posicion = get_leaderboard().posicion(usuario.id)
+    return render_template('perfil.html', usuario=usuario, logros=logros, posicion=posicion)
 
 @main_bp.route('/editar_perfil', methods=['GET', 'POST'])
 def editar_perfil():
-    if 'user_id' not in session:
+    usuario = current_user()
+    if usuario is None:
         flash('Iniciá sesión para editar tu perfil', 'danger')
         return redirect(url_for('main.login'))
-
-    usuario = Usuario.query.get(session['user_id'])
     
     if request.method == 'POST':
         nombre = request.form.get('nombre', '').strip()
@@ -182,6 +181,7 @@ def editar_perfil():
         biografia = request.form.get('biografia', '').strip()
         password = request.form.get('password', '')
         confirm_password = request.form.get('confirm_password', '')
+        nombre_anterior = usuario.nombre
 
         if nombre:
             usuario.nombre = nombre
@@ -193,8 +193,9 @@ def editar_perfil():
             if password != confirm_password or len(password) < 6:
                 flash('La contraseña debe tener al menos 6 caracteres y coincidir', 'danger')
                 return render_template('editar_perfil.html', usuario=usuario)
-            usuario.password = generate_password_hash(password)
+            usuario.set_password(password)
 
+        foto_nueva = None
         archivo = request.files.get('foto_perfil')
         if archivo and archivo.filename:
             ext = archivo.filename.rsplit('.', 1)[-1].lower() if '.' in archivo.filename else ''
@@ -205,31 +206,57 @@ def editar_perfil():
                 return render_template('editar_perfil.html', usuario=usuario)
             
             upload_folder = current_app.config.get('UPLOAD_FOLDER')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            filename = secure_filename(f"{usuario.id}_{uuid4().hex}.{ext}")
-            ruta = os.path.join(upload_folder, filename)
-            archivo.save(ruta)
+            # Nombre por contenido: una foto ya subida (por cualquiera) no se vuelve a guardar
+            filename = guardar_subida(archivo.stream, upload_folder, ext)
+            manifiesto = get_upload_manifest()
+            manifiesto.agregar(filename)
 
-            if usuario.foto_perfil and usuario.foto_perfil != 'default.svg':
-                foto_antigua = os.path.join(upload_folder, usuario.foto_perfil)
-                if os.path.exists(foto_antigua):
-                    try:
-                        os.remove(foto_antigua)
-                    except:
-                        pass
+            if filename != usuario.foto_perfil:
+                foto_anterior = usuario.foto_perfil
+                if foto_anterior and foto_anterior != 'default.svg' and not es_inmutable(foto_anterior):
+                    # Nombre anterior, exclusivo del usuario; las fotos por contenido las borra el barrido
+                    foto_antigua = os.path.join(upload_folder, foto_anterior)
+                    if os.path.exists(foto_antigua):
+                        try:
+                            os.remove(foto_antigua)
+                        except:
+                            pass
+                    borrados = borrar_variantes(upload_folder, leer_variantes(usuario.foto_variantes))
+                    manifiesto.quitar(foto_anterior, *borrados)
 
-            usuario.foto_perfil = filename
+                variantes = variantes_existentes(filename, usuario.id)
+                usuario.foto_perfil = filename
+                usuario.foto_variantes = variantes
+                if variantes is None:
+                    foto_nueva = filename
 
+        nombre_cambiado = usuario.nombre != nombre_anterior
         db.session.commit()
+        pipeline = get_avatar_pipeline()
+        if foto_nueva and pipeline is not None:
+            # Las variantes se generan fuera del request; hasta entonces se sirve el original
+            pipeline.encolar(usuario.id, foto_nueva)
+        if nombre_cambiado:
+            # El nombre aparece en el ranking cacheado
+            avanzar_version()
+        invalidar_stats_usuario(usuario.id)
         flash('Perfil actualizado', 'success')
         return redirect(url_for('main.perfil'))
 
     return render_template('editar_perfil.html', usuario=usuario)
 
+@main_bp.route('/uploads/<path:nombre>')
+def foto_subida(nombre):
+    return enviar_upload(nombre)
+
+@main_bp.route('/assets/<path:nombre>')
+def asset(nombre):
+    return enviar_asset(nombre)
+
 @main_bp.route('/ranking')
+@respuesta_cacheada(por_usuario=True)
 def ranking():
-    top_usuarios = Usuario.query.filter_by(es_admin=False).order_by(Usuario.puntaje_maximo.desc()).limit(10).all()
+    top_usuarios = obtener_top_usuarios(10)
     return render_template('ranking.html', top_usuarios=top_usuarios)
 
 @main_bp.route('/admin/dashboard')
@@ -238,13 +265,16 @@ def admin_dashboard():
         flash('Iniciá sesión para acceder al panel', 'danger')
         return redirect(url_for('main.login'))
 
-    actual = Usuario.query.get(session['user_id'])
+    actual = current_user()
     if not actual or not actual.es_admin:
         flash('No tenés permisos de administrador', 'danger')
         return redirect(url_for('main.index'))
 
-    usuarios = Usuario.query.order_by(Usuario.id.asc()).all()
-    return render_template('admin/dashboard.html', usuarios=usuarios)
+    busqueda = request.args.get('q', '').strip()
+    despues = request.args.get('despues', 0, type=int)
+    usuarios, siguiente = pagina_usuarios(despues, TAMANO_PAGINA, busqueda)
+    return render_template('admin/dashboard.html', usuarios=usuarios, siguiente=siguiente,
+                           busqueda=busqueda, tamano_pagina=TAMANO_PAGINA)
 
 @main_bp.route('/logout')
 def logout():
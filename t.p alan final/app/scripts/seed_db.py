@@ -0,0 +1,238 @@
+"""
+Carga masiva de datos sintéticos
+Genera usuarios, recompensas y canjes con distribuciones realistas (puntajes de
+cola larga, fechas de registro, juego y canje coherentes entre sí) y los
+escribe con `executemany` en transacciones grandes. Todos los usuarios
+comparten un único hash de contraseña calculado una sola vez.
+
+Uso:
+    python -m app.scripts.seed_db [--db instance/usuarios.db] [--usuarios 1000000]
+                                  [--canjes 500000] [--password activate123] [--reemplazar]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import create_engine
+from werkzeug.security import generate_password_hash
+
+from app.data.database import db
+from app.data.migrations import RECOMPENSAS_INICIALES, aplicar_migraciones
+from app.data.models import db_models  # noqa: F401 (registra las tablas en db.metadata)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DB_POR_DEFECTO = os.path.join(BASE_DIR, 'instance', 'usuarios.db')
+
+LOTE = 100_000
+SEGUNDOS_DIA = 86400
+PROPORCION_SIN_JUGAR = 0.3   # usuarios registrados que nunca jugaron
+PROPORCION_ADMINS = 0.001
+
+# Ajustes de SQLite sólo para la carga: journal en memoria, sin fsync, caché grande y lock exclusivo
+PRAGMAS_CARGA = [
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA locking_mode = EXCLUSIVE",
+]
+PRAGMAS_NORMALES = [
+    "PRAGMA locking_mode = NORMAL",
+    "PRAGMA journal_mode = DELETE",
+    "PRAGMA synchronous = FULL",
+]
+
+# Las fechas se pasan como epoch y SQLite las formatea como las guarda SQLAlchemy
+INSERT_USUARIO = """
+    INSERT INTO usuarios (id, nombre, email, password, es_admin, puntaje_maximo,
+                          fecha_ultimo_juego, foto_perfil, biografia, fecha_registro)
+    VALUES (?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'), 'default.svg', '', datetime(?, 'unixepoch'))
+"""
+INSERT_CANJE = """
+    INSERT INTO canjes (id, usuario_id, recompensa_id, fecha)
+    VALUES (?, ?, ?, datetime(?, 'unixepoch'))
+"""
+
+NOMBRES = ['Martina', 'Lucas', 'Sofía', 'Mateo', 'Valentina', 'Benjamín', 'Camila', 'Joaquín',
+           'Isabella', 'Thiago', 'Emma', 'Santiago', 'Mía', 'Felipe', 'Catalina', 'Tomás']
+APELLIDOS = ['González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez',
+             'García', 'Sánchez', 'Romero', 'Sosa', 'Torres', 'Álvarez', 'Ruiz', 'Benítez']
+
+
+def crear_esquema(ruta: str) -> sqlite3.Connection:
+    """Crea las tablas desde los modelos (si faltan) y aplica las migraciones"""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    engine = create_engine(f'sqlite:///{ruta}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    aplicar_migraciones(conn)
+    return conn
+
+
+def generar_usuarios(primer_id: int, cantidad: int, password_hash: str, ahora: int,
+                     dias_historia: int = 730) -> Iterator[Tuple]:
+    """
+    Filas de usuarios: registro uniforme en los últimos `dias_historia` días, un 30% que
+    nunca jugó y puntajes de Pareto (muchos bajos, pocos muy altos) para el resto.
+    """
+    rnd = random.random
+    pareto = random.paretovariate
+    historia = dias_historia * SEGUNDOS_DIA
+    n_nombres, n_apellidos = len(NOMBRES), len(APELLIDOS)
+    for i in range(primer_id, primer_id + cantidad):
+        registro = ahora - int(rnd() * historia)
+        if rnd() < PROPORCION_SIN_JUGAR:
+            puntaje, ultimo_juego = 0, None
+        else:
+            puntaje = min(int(pareto(1.3) * 40), 100_000)
+            ultimo_juego = registro + int(rnd() * (ahora - registro))
+        yield (
+            i, f'{NOMBRES[i % n_nombres]} {APELLIDOS[(i // n_nombres) % n_apellidos]}',
+            f'usuario{i}@activate.local', password_hash, rnd() < PROPORCION_ADMINS,
+            puntaje, ultimo_juego, registro
+        )
+
+
+def generar_canjes(primer_id: int, cantidad: int, usuarios: List[Tuple[int, int, int]],
+                   recompensas: List[Tuple[int, int]], ahora: int) -> Iterator[Tuple]:
+    """
+    Filas de canjes de usuarios con puntaje, elegidos con peso proporcional al puntaje;
+    las recompensas baratas se canjean más. La fecha es posterior al registro del usuario.
+    """
+    if not usuarios or not recompensas:
+        return
+    ids, pesos, registros = [], [], {}
+    for user_id, puntaje, registro in usuarios:
+        ids.append(user_id)
+        pesos.append(puntaje)
+        registros[user_id] = registro
+    pesos_recompensa = [1.0 / puntos for _, puntos in recompensas]
+    ids_recompensa = [r for r, _ in recompensas]
+    rnd = random.random
+    pendientes = cantidad
+    siguiente_id = primer_id
+    while pendientes > 0:
+        bloque = min(pendientes, LOTE)
+        elegidos = random.choices(ids, weights=pesos, k=bloque)
+        premios = random.choices(ids_recompensa, weights=pesos_recompensa, k=bloque)
+        for user_id, recompensa_id in zip(elegidos, premios):
+            registro = registros[user_id]
+            yield siguiente_id, user_id, recompensa_id, registro + int(rnd() * (ahora - registro))
+            siguiente_id += 1
+        pendientes -= bloque
+
+
+def _insertar(conn: sqlite3.Connection, sql: str, filas: Iterator[Tuple]) -> int:
+    total = 0
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            conn.executemany(sql, lote)
+            total += len(lote)
+            lote.clear()
+    if lote:
+        conn.executemany(sql, lote)
+        total += len(lote)
+    return total
+
+
+@contextmanager
+def _transaccion(conn: sqlite3.Connection):
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def asegurar_recompensas(conn: sqlite3.Connection) -> List[Tuple[int, int]]:
+    """Inserta el catálogo inicial si la tabla está vacía; devuelve [(id, puntos)]"""
+    if conn.execute("SELECT 1 FROM recompensas LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO recompensas (nombre, descripcion, puntos, imagen) VALUES (?, ?, ?, ?)",
+            RECOMPENSAS_INICIALES
+        )
+    return conn.execute("SELECT id, puntos FROM recompensas").fetchall()
+
+
+def cargar(ruta: str, n_usuarios: int, n_canjes: int, password: str = 'activate123',
+           password_hash: str = None, semilla: int = None, verbose: bool = True) -> dict:
+    """
+    Agrega `n_usuarios` usuarios y `n_canjes` canjes a la base en `ruta` (creándola si
+    no existe) y devuelve los tiempos de cada etapa.
+    """
+    if semilla is not None:
+        random.seed(semilla)
+    tiempos = {}
+    inicio = time.perf_counter()
+    password_hash = password_hash or generate_password_hash(password)
+    tiempos['hash_s'] = time.perf_counter() - inicio
+
+    conn = crear_esquema(ruta)
+    try:
+        for pragma in PRAGMAS_CARGA:
+            conn.execute(pragma)
+        ahora = int(time.time())
+
+        t = time.perf_counter()
+        with _transaccion(conn):
+            recompensas = asegurar_recompensas(conn)
+            primer_usuario = (conn.execute("SELECT MAX(id) FROM usuarios").fetchone()[0] or 0) + 1
+            _insertar(conn, INSERT_USUARIO, generar_usuarios(primer_usuario, n_usuarios, password_hash, ahora))
+        tiempos['usuarios_s'] = time.perf_counter() - t
+        if verbose:
+            print(f"{n_usuarios:,} usuarios en {tiempos['usuarios_s']:.1f}s")
+
+        if n_canjes:
+            t = time.perf_counter()
+            usuarios = conn.execute("""
+                SELECT id, puntaje_maximo, CAST(strftime('%s', fecha_registro) AS INTEGER)
+                FROM usuarios WHERE es_admin = 0 AND puntaje_maximo > 0
+            """).fetchall()
+            with _transaccion(conn):
+                primer_canje = (conn.execute("SELECT MAX(id) FROM canjes").fetchone()[0] or 0) + 1
+                _insertar(conn, INSERT_CANJE, generar_canjes(primer_canje, n_canjes, usuarios, recompensas, ahora))
+            tiempos['canjes_s'] = time.perf_counter() - t
+            if verbose:
+                print(f"{n_canjes:,} canjes en {tiempos['canjes_s']:.1f}s")
+
+        t = time.perf_counter()
+        for pragma in PRAGMAS_NORMALES:
+            conn.execute(pragma)
+        conn.execute("ANALYZE")
+        tiempos['analyze_s'] = time.perf_counter() - t
+    finally:
+        conn.close()
+    tiempos['total_s'] = time.perf_counter() - inicio
+    return tiempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Carga masiva de usuarios, recompensas y canjes sintéticos')
+    parser.add_argument('--db', default=DB_POR_DEFECTO, help='ruta de la base SQLite')
+    parser.add_argument('--usuarios', type=int, default=1_000_000)
+    parser.add_argument('--canjes', type=int, default=500_000)
+    parser.add_argument('--password', default='activate123', help='contraseña común a todos los usuarios')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--reemplazar', action='store_true', help='borrar la base antes de cargar')
+    args = parser.parse_args(argv)
+
+    if args.reemplazar and os.path.exists(args.db):
+        os.remove(args.db)
+    tiempos = cargar(args.db, args.usuarios, args.canjes, args.password, semilla=args.semilla)
+    print(f"Carga completa en {tiempos['total_s']:.1f}s ({args.db}); "
+          f"contraseña de todos los usuarios: {args.password}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""
+Benchmarks de Activate
+Scripts de medición que se ejecutan sin red sobre bases SQLite temporales:
+    python -m benchmarks.bench_canjes
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_indices
+    python -m benchmarks.bench_login
+    python -m benchmarks.bench_serialization
+"""
@@ -0,0 +1,186 @@
+"""
+Benchmark de canjes concurrentes
+
+N hilos canjean a la vez recompensas de los mismos usuarios sobre una base
+SQLite temporal. Compara el canje atómico (`app.data.reward_redemption.canjear`)
+con el esquema anterior de leer, comparar en Python y escribir, y verifica al
+final que ningún saldo quedó negativo y que lo descontado coincide con los
+canjes registrados. Una fracción de los canjes se reintenta con la misma clave
+de idempotencia para medir también ese camino.
+
+Uso:
+    python -m benchmarks.bench_canjes [--hilos 1 4 16] [--canjes-por-hilo 200]
+                                      [--usuarios 1] [--reintentos 0.1] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from app.data.reward_redemption import canjear as canjear_atomico
+from benchmarks import comun
+
+PUNTOS = 50
+
+
+def _canje_leer_escribir(db, Usuario, CanjeRecompensa, usuario_id, recompensa_id, puntos):
+    """El canje como era antes: compara en Python un valor ya leído y no conoce claves de idempotencia"""
+    usuario = db.session.get(Usuario, usuario_id)
+    if usuario.puntaje_maximo < puntos:
+        db.session.rollback()
+        return False
+    db.session.add(CanjeRecompensa(usuario_id=usuario_id, recompensa_id=recompensa_id))
+    usuario.puntaje_maximo -= puntos
+    db.session.commit()
+    return True
+
+
+def ejecutar(app, estrategia: str, hilos: int, canjes_por_hilo: int, usuarios: list,
+             reintentos: float, saldo: int) -> dict:
+    """Reinicia los saldos, lanza `hilos` hilos a canjear y devuelve tiempos y verificación"""
+    from app.data.database import db
+    from app.data.models.db_models import CanjeRecompensa, Usuario
+
+    with app.app_context():
+        db.session.query(CanjeRecompensa).delete()
+        db.session.query(Usuario).filter(Usuario.id.in_(usuarios)).update(
+            {Usuario.puntaje_maximo: saldo}, synchronize_session=False)
+        db.session.commit()
+        recompensa_id = db.session.execute(db.text("SELECT MIN(id) FROM recompensas")).scalar()
+
+    if estrategia == 'atomico':
+        def canjear(usuario_id, clave):
+            return canjear_atomico(usuario_id, recompensa_id, PUNTOS, clave).exitoso
+    else:
+        def canjear(usuario_id, clave):
+            return _canje_leer_escribir(db, Usuario, CanjeRecompensa, usuario_id, recompensa_id, PUNTOS)
+
+    barrera = threading.Barrier(hilos + 1)
+    latencias, conteo = [], {'exitosos': 0, 'rechazados': 0, 'errores': 0}
+    lock = threading.Lock()
+
+    def trabajador(numero):
+        rnd = random.Random(numero)
+        propias, cuenta = [], {'exitosos': 0, 'rechazados': 0, 'errores': 0}
+        with app.app_context():
+            barrera.wait()
+            for i in range(canjes_por_hilo):
+                usuario_id = rnd.choice(usuarios)
+                clave = f'{numero}-{i}'
+                intentos = 2 if rnd.random() < reintentos else 1
+                for _ in range(intentos):
+                    t0 = time.perf_counter_ns()
+                    try:
+                        ok = canjear(usuario_id, clave)
+                        cuenta['exitosos' if ok else 'rechazados'] += 1
+                    except OperationalError:
+                        # database is locked: el hilo esperó más que el timeout de SQLite
+                        db.session.rollback()
+                        cuenta['errores'] += 1
+                    propias.append(time.perf_counter_ns() - t0)
+            db.session.remove()
+        with lock:
+            latencias.extend(propias)
+            for k, v in cuenta.items():
+                conteo[k] += v
+
+    trabajadores = [threading.Thread(target=trabajador, args=(n,)) for n in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.join()
+    total = time.perf_counter() - inicio
+
+    with app.app_context():
+        canjes = db.session.query(CanjeRecompensa).count()
+        saldos = [s for (s,) in db.session.query(Usuario.puntaje_maximo).filter(Usuario.id.in_(usuarios))]
+    descontado = saldo * len(usuarios) - sum(saldos)
+    latencias.sort()
+    return {
+        'estrategia': estrategia,
+        'hilos': hilos,
+        'intentos': len(latencias),
+        'ops_por_seg': round(len(latencias) / total, 1),
+        'p50_ms': round(comun.percentil(latencias, 50) / 1e6, 3),
+        'p99_ms': round(comun.percentil(latencias, 99) / 1e6, 3),
+        **conteo,
+        'canjes_registrados': canjes,
+        'saldo_minimo': min(saldos),
+        # Consistente: nadie en negativo y cada canje registrado descontó exactamente PUNTOS
+        'consistente': min(saldos) >= 0 and descontado == canjes * PUNTOS,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de canjes de recompensas bajo contención')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--canjes-por-hilo', type=int, default=200)
+    parser.add_argument('--usuarios', type=int, default=1,
+                        help='usuarios sobre los que se reparten los canjes (1 = máxima contención)')
+    parser.add_argument('--reintentos', type=float, default=0.1,
+                        help='fracción de canjes que se reenvían con la misma clave')
+    parser.add_argument('--estrategias', nargs='+', default=['atomico', 'leer_escribir'],
+                        choices=['atomico', 'leer_escribir'])
+    parser.add_argument('--salida', default='-', help="archivo JSON de resultados ('-' para stdout)")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix='activate_bench_')
+    try:
+        ruta_db = os.path.join(directorio, 'bench.db')
+        conn = comun.crear_base(ruta_db)
+        comun.sembrar_usuarios(conn, max(args.usuarios, 1000))
+        conn.close()
+
+        from app.app import create_app
+        from app.core.config.settings import Config
+
+        class ConfigBench(Config):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{ruta_db}'
+            TESTING = True
+
+        app = create_app(ConfigBench)
+        usuarios = [i for i in range(1, args.usuarios + 1)]
+        print(f"{'Estrategia':<16}{'hilos':>6}{'ops/seg':>10}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'ok':>7}{'sin pts':>8}{'errores':>8}  consistente", file=sys.stderr)
+        resultados = []
+        for hilos in args.hilos:
+            # Saldo para la mitad de los canjes: la otra mitad se rechaza por falta de puntos
+            saldo = max(1, hilos * args.canjes_por_hilo // (2 * len(usuarios))) * PUNTOS
+            for estrategia in args.estrategias:
+                r = ejecutar(app, estrategia, hilos, args.canjes_por_hilo, usuarios, args.reintentos, saldo)
+                resultados.append(r)
+                print(f"{estrategia:<16}{hilos:>6}{r['ops_por_seg']:>10.1f}{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}"
+                      f"{r['exitosos']:>7}{r['rechazados']:>8}{r['errores']:>8}  {r['consistente']}",
+                      file=sys.stderr)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    texto = json.dumps({
+        'fecha': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'canjes_por_hilo': args.canjes_por_hilo,
+        'usuarios': args.usuarios,
+        'reintentos': args.reintentos,
+        'resultados': resultados,
+    }, indent=2, ensure_ascii=False)
+    if args.salida == '-':
+        print(texto)
+    else:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+
+
+if __name__ == '__main__':
+    main()
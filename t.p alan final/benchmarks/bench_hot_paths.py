@@ -0,0 +1,221 @@
+"""
+Benchmark de caminos calientes: endpoints de Flask, servicios TCP y serializadores
+
+Por cada tamaño pedido siembra una base SQLite temporal, levanta en el mismo
+proceso el servidor de persistencia TCP y el servicio distribuido en puertos
+efímeros de loopback y mide cada caso con `test_client()` o con los clientes
+TCP del proyecto. Reporta ops/seg y latencias p50/p99 y escribe los resultados
+en JSON para comparar corridas entre commits.
+
+Uso:
+    python -m benchmarks.bench_hot_paths [--usuarios 1000 100000 1000000]
+                                         [--duracion 2] [--salida resultados.json]
+
+Con más de un tamaño, cada uno corre en un subproceso propio para no arrastrar
+cachés, pools ni puertos de una medición a la siguiente.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks import comun
+
+CASOS_SERIALIZACION = ['save_score', 'user_stats_resp', 'notifications_resp']
+
+
+def _casos_flask(create_app, ruta_db: str) -> dict:
+    from app.core.config.settings import Config
+
+    class ConfigBench(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{ruta_db}'
+        TESTING = True
+
+    app = create_app(ConfigBench)
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'email': 'usuario1@bench.local', 'password': comun.PASSWORD_BENCH})
+    if respuesta.status_code != 302:
+        raise RuntimeError('No se pudo iniciar sesión con el usuario de benchmark')
+
+    def get(url):
+        def llamada():
+            r = cliente.get(url)
+            if r.status_code != 200:
+                raise RuntimeError(f'GET {url} respondió {r.status_code}')
+        return llamada
+
+    def guardar_puntaje():
+        r = cliente.post('/api/guardar_puntaje', json={'puntaje': random.randint(0, 2000)})
+        if r.status_code != 200:
+            raise RuntimeError(f'/api/guardar_puntaje respondió {r.status_code}')
+
+    return {
+        'flask./api/guardar_puntaje': guardar_puntaje,
+        'flask./ranking': get('/ranking'),
+        'flask./juego': get('/juego'),
+        'flask./recompensas': get('/recompensas'),
+        'flask./api/stats/global': get('/api/stats/global'),
+    }
+
+
+def _casos_tcp(ids: list) -> dict:
+    from app.infrastructure import tcp_client
+    from app.infrastructure.distributed_service import DistributedServiceClient
+
+    cliente = DistributedServiceClient()
+    siguiente = iter(range(10 ** 12))
+
+    def user_id():
+        return ids[next(siguiente) % len(ids)]
+
+    def esperar_ok(resultado):
+        ok, respuesta = resultado
+        if not ok:
+            raise RuntimeError(f'Respuesta con error: {respuesta}')
+
+    return {
+        'tcp.save_score': lambda: esperar_ok(tcp_client.save_score_via_tcp(user_id(), random.randint(0, 2000))),
+        'tcp.save_scores_100': lambda: esperar_ok(tcp_client.save_scores_via_tcp(
+            [(user_id(), random.randint(0, 2000)) for _ in range(100)])),
+        'distribuido.get_user_stats': lambda: esperar_ok(cliente.get_user_stats(user_id())),
+        'distribuido.get_user_stats_many_10': lambda: esperar_ok(
+            cliente.get_user_stats_many([user_id() for _ in range(10)])),
+        'distribuido.get_global_stats': lambda: esperar_ok(cliente.get_global_stats()),
+        'distribuido.ping': lambda: esperar_ok(cliente._send_request({'action': 'ping'})),
+    }
+
+
+def _casos_serializacion() -> dict:
+    from app.infrastructure.serialization import deserialize, serialize
+    from benchmarks.bench_serialization import MENSAJES, METODOS
+
+    casos = {}
+    for nombre in CASOS_SERIALIZACION:
+        mensaje = MENSAJES[nombre]
+        for metodo in METODOS:
+            serializado = serialize(mensaje, metodo)
+            casos[f'serializacion.{metodo}.{nombre}.encode'] = (
+                lambda m=mensaje, met=metodo: serialize(m, met))
+            casos[f'serializacion.{metodo}.{nombre}.decode'] = (
+                lambda s=serializado, met=metodo: deserialize(s, met))
+    return casos
+
+
+def ejecutar_tamano(n_usuarios: int, duracion: float, filtro: str = '') -> dict:
+    """Siembra una base de `n_usuarios`, levanta los servicios y mide todos los casos"""
+    # Los clientes TCP toman el puerto del entorno al importarse: fijarlo antes de
+    # importar cualquier módulo de app.infrastructure
+    puerto_persistencia = comun.puerto_libre()
+    puerto_distribuido = comun.puerto_libre()
+    os.environ['TCP_PERSIST_PORT'] = str(puerto_persistencia)
+    os.environ['DISTRIBUTED_PORT'] = str(puerto_distribuido)
+
+    directorio = tempfile.mkdtemp(prefix='activate_bench_')
+    try:
+        ruta_db = os.path.join(directorio, 'bench.db')
+        inicio = time.perf_counter()
+        conn = comun.crear_base(ruta_db)
+        comun.sembrar_usuarios(conn, n_usuarios, generate_password_hash(comun.PASSWORD_BENCH))
+        conn.close()
+        carga = time.perf_counter() - inicio
+
+        from app.infrastructure import tcp_client, tcp_server
+        from app.infrastructure.distributed_service import DistributedService
+        from app.app import create_app
+
+        tcp_client.PORT = puerto_persistencia
+        tcp_server.DB_PATH = ruta_db
+        servicio = DistributedService(ruta_db)
+        threading.Thread(target=tcp_server.start_server, args=('127.0.0.1', puerto_persistencia),
+                         daemon=True).start()
+        threading.Thread(target=servicio.start_server, args=('127.0.0.1', puerto_distribuido),
+                         daemon=True).start()
+        comun.esperar_puerto(puerto_persistencia)
+        comun.esperar_puerto(puerto_distribuido)
+
+        ids = [i for i in comun.muestra_ids(n_usuarios) if i % 1000 != 0]
+        casos = {}
+        casos.update(_casos_flask(create_app, ruta_db))
+        casos.update(_casos_tcp(ids))
+        casos.update(_casos_serializacion())
+
+        resultados = {}
+        for nombre, funcion in casos.items():
+            if filtro and filtro not in nombre:
+                continue
+            resultados[nombre] = comun.medir(funcion, duracion)
+            r = resultados[nombre]
+            print(f"{nombre:<56}{r['ops_por_seg']:>12.1f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}",
+                  file=sys.stderr)
+        servicio.stop_server()
+        return {'usuarios': n_usuarios, 'carga_s': round(carga, 2), 'casos': resultados}
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _en_subproceso(n_usuarios: int, args) -> dict:
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        salida = f.name
+    try:
+        subprocess.run([
+            sys.executable, '-m', 'benchmarks.bench_hot_paths', '--usuarios', str(n_usuarios),
+            '--duracion', str(args.duracion), '--semilla', str(args.semilla),
+            '--filtro', args.filtro, '--salida', salida
+        ], check=True, stdout=subprocess.DEVNULL)
+        with open(salida, encoding='utf-8') as f:
+            return json.load(f)['tamanos'][0]
+    finally:
+        os.remove(salida)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de endpoints, servicios TCP y serializadores')
+    parser.add_argument('--usuarios', type=int, nargs='+', default=[1000],
+                        help='tamaños de la base a sembrar (p. ej. 1000 100000 1000000)')
+    parser.add_argument('--duracion', type=float, default=2.0, help='segundos de medición por caso')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--filtro', default='', help='sólo los casos cuyo nombre contenga este texto')
+    parser.add_argument('--salida', default='-', help="archivo JSON de resultados ('-' para stdout)")
+    args = parser.parse_args(argv)
+    random.seed(args.semilla)
+
+    print(f"{'Caso':<56}{'ops/seg':>12}{'p50 ms':>10}{'p99 ms':>10}", file=sys.stderr)
+    tamanos = []
+    for n_usuarios in args.usuarios:
+        print(f"--- {n_usuarios:,} usuarios", file=sys.stderr)
+        if len(args.usuarios) == 1:
+            # Los servidores escriben su log en stdout: desviarlo para no mezclarlo con el JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                tamanos.append(ejecutar_tamano(n_usuarios, args.duracion, args.filtro))
+        else:
+            tamanos.append(_en_subproceso(n_usuarios, args))
+
+    resultado = {
+        'fecha': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'duracion_por_caso_s': args.duracion,
+        'semilla': args.semilla,
+        'tamanos': tamanos,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida == '-':
+        print(texto)
+    else:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+
+
+if __name__ == '__main__':
+    main()
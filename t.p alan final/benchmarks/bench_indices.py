@@ -0,0 +1,153 @@
+"""
+Benchmark de índices: consultas de ranking y logros antes y después de las migraciones
+
+Genera una base SQLite temporal con el esquema de los modelos, la carga con
+usuarios y canjes sintéticos, revierte los índices de app/data/migrations.py,
+mide las consultas, vuelve a migrar y las mide de nuevo.
+
+Uso:
+    python -m benchmarks.bench_indices [--usuarios 1000000] [--canjes 500000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.data.migrations import aplicar_migraciones, revertir_migraciones, version_actual
+from benchmarks import comun
+
+CONSULTA_RANKING = """
+    SELECT id, nombre, puntaje_maximo FROM usuarios
+    WHERE es_admin = 0 ORDER BY puntaje_maximo DESC LIMIT 10
+"""
+CONSULTA_LOGROS = """
+    SELECT id, recompensa_id, fecha FROM canjes
+    WHERE usuario_id = ? ORDER BY fecha DESC
+"""
+
+
+def crear_base(ruta: str):
+    """Crea las tablas desde los modelos y deja registradas las migraciones, sin índices"""
+    conn = comun.crear_base(ruta)
+    revertir_migraciones(conn, 0)
+    return conn
+
+
+def cargar_datos(conn: sqlite3.Connection, n_usuarios: int, n_canjes: int, lote: int = 50000):
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    ahora = datetime.utcnow()
+
+    conn.executemany(
+        "INSERT INTO recompensas (id, nombre, descripcion, puntos, imagen) VALUES (?, ?, ?, ?, ?)",
+        [(i, f'Recompensa {i}', 'Benchmark', 50 * i, 'default.png') for i in range(1, 7)]
+    )
+
+    def usuarios():
+        for i in range(1, n_usuarios + 1):
+            yield (
+                i, f'Usuario {i}', f'usuario{i}@bench.local', 'x', int(i % 1000 == 0),
+                int(random.paretovariate(1.5) * 40), ahora.isoformat(' '), 'default.svg', '',
+                (ahora - timedelta(days=random.randrange(365))).isoformat(' ')
+            )
+
+    def canjes():
+        for i in range(1, n_canjes + 1):
+            yield (
+                i, random.randint(1, n_usuarios), random.randint(1, 6),
+                (ahora - timedelta(minutes=random.randrange(525600))).isoformat(' ')
+            )
+
+    comun.insertar_en_lotes(conn, """
+        INSERT INTO usuarios (id, nombre, email, password, es_admin, puntaje_maximo,
+                              fecha_ultimo_juego, foto_perfil, biografia, fecha_registro)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, usuarios(), lote)
+    comun.insertar_en_lotes(conn, """
+        INSERT INTO canjes (id, usuario_id, recompensa_id, fecha) VALUES (?, ?, ?, ?)
+    """, canjes(), lote)
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def medir(funcion, presupuesto: float = 2.0, max_iter: int = 2000) -> float:
+    """Ejecuta `funcion` hasta agotar el presupuesto de tiempo; devuelve ms por llamada"""
+    iteraciones = 0
+    inicio = time.perf_counter()
+    while True:
+        funcion()
+        iteraciones += 1
+        transcurrido = time.perf_counter() - inicio
+        if transcurrido >= presupuesto or iteraciones >= max_iter:
+            return transcurrido * 1000 / iteraciones
+
+
+def medir_consultas(conn: sqlite3.Connection, n_usuarios: int) -> dict:
+    usuarios_muestra = [random.randint(1, n_usuarios) for _ in range(256)]
+    contador = iter(range(10 ** 9))
+
+    def ranking():
+        conn.execute(CONSULTA_RANKING).fetchall()
+
+    def logros():
+        conn.execute(CONSULTA_LOGROS, (usuarios_muestra[next(contador) % 256],)).fetchall()
+
+    return {
+        'ranking': medir(ranking),
+        'logros': medir(logros),
+        'plan_ranking': _plan(conn, CONSULTA_RANKING),
+        'plan_logros': _plan(conn, CONSULTA_LOGROS, (1,)),
+    }
+
+
+def _plan(conn, sql, params=()):
+    return '; '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de índices de ranking y logros')
+    parser.add_argument('--usuarios', type=int, default=1_000_000)
+    parser.add_argument('--canjes', type=int, default=500_000)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args(argv)
+    random.seed(args.semilla)
+
+    directorio = tempfile.mkdtemp(prefix='activate_bench_')
+    try:
+        ruta = os.path.join(directorio, 'bench.db')
+        conn = crear_base(ruta)
+
+        print(f"Cargando {args.usuarios:,} usuarios y {args.canjes:,} canjes...")
+        inicio = time.perf_counter()
+        cargar_datos(conn, args.usuarios, args.canjes)
+        print(f"Carga completa en {time.perf_counter() - inicio:.1f}s\n")
+
+        print(f"Sin índices (versión de esquema {version_actual(conn)})...")
+        antes = medir_consultas(conn, args.usuarios)
+
+        inicio = time.perf_counter()
+        aplicar_migraciones(conn)
+        conn.execute("ANALYZE")
+        print(f"Migraciones aplicadas en {time.perf_counter() - inicio:.1f}s "
+              f"(versión de esquema {version_actual(conn)})\n")
+        despues = medir_consultas(conn, args.usuarios)
+        conn.close()
+
+        print(f"{'Consulta':<10}{'Antes (ms)':>14}{'Después (ms)':>16}{'Mejora':>10}")
+        for nombre in ('ranking', 'logros'):
+            mejora = antes[nombre] / despues[nombre] if despues[nombre] else float('inf')
+            print(f"{nombre:<10}{antes[nombre]:>14.3f}{despues[nombre]:>16.3f}{mejora:>9.0f}x")
+        print()
+        for nombre in ('ranking', 'logros'):
+            print(f"Plan {nombre} antes:   {antes['plan_' + nombre]}")
+            print(f"Plan {nombre} después: {despues['plan_' + nombre]}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
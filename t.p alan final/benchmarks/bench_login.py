@@ -0,0 +1,161 @@
+"""
+Benchmark de inicio de sesión concurrente
+
+N hilos inician sesión a la vez (POST /login) sobre una base SQLite temporal
+mientras otro hilo pide una página liviana (/como-funciona) para medir cuánto
+frena una ráfaga de logins al resto de los requests. Compara el hash en el
+hilo del request (`PASSWORD_HASH_WORKERS=0`) con el pool de procesos de
+`app.infrastructure.password_hashing`.
+
+Uso:
+    python -m benchmarks.bench_login [--hilos 1 4 8] [--logins-por-hilo 4]
+                                     [--procesos 2] [--iteraciones 600000] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks import comun
+
+USUARIOS = 200
+
+
+def ejecutar(app, modo: str, hilos: int, logins_por_hilo: int) -> dict:
+    """Lanza `hilos` hilos a iniciar sesión y mide en paralelo la latencia de una página sin hash"""
+    latencias, sonda, errores = [], [], []
+    lock = threading.Lock()
+    terminado = threading.Event()
+    barrera = threading.Barrier(hilos + 1)
+
+    def trabajador(semilla):
+        rnd = random.Random(semilla)
+        cliente = app.test_client()
+        propias = []
+        barrera.wait()
+        for _ in range(logins_por_hilo):
+            email = f'usuario{rnd.randint(1, USUARIOS - 1)}@bench.local'
+            t0 = time.perf_counter_ns()
+            respuesta = cliente.post('/login', data={'email': email, 'password': comun.PASSWORD_BENCH})
+            propias.append(time.perf_counter_ns() - t0)
+            if respuesta.status_code != 302:
+                with lock:
+                    errores.append(respuesta.status_code)
+        with lock:
+            latencias.extend(propias)
+
+    def sondear():
+        cliente = app.test_client()
+        while not terminado.is_set():
+            t0 = time.perf_counter_ns()
+            cliente.get('/como-funciona')
+            sonda.append(time.perf_counter_ns() - t0)
+            time.sleep(0.005)
+
+    servicio = app.extensions.get('password_hasher')
+    trabajadores = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    hilo_sonda = threading.Thread(target=sondear)
+    hilo_sonda.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.join()
+    total = time.perf_counter() - inicio
+    terminado.set()
+    hilo_sonda.join()
+
+    latencias.sort()
+    sonda.sort()
+    return {
+        'modo': modo,
+        'hilos': hilos,
+        'logins': len(latencias),
+        'logins_por_seg': round(len(latencias) / total, 2),
+        'p50_ms': round(comun.percentil(latencias, 50) / 1e6, 2),
+        'p99_ms': round(comun.percentil(latencias, 99) / 1e6, 2),
+        'sonda_p50_ms': round(comun.percentil(sonda, 50) / 1e6, 2),
+        'sonda_p99_ms': round(comun.percentil(sonda, 99) / 1e6, 2),
+        'errores': len(errores),
+        'hash': servicio.stats() if servicio is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de inicio de sesión concurrente')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--logins-por-hilo', type=int, default=4)
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='procesos del pool de hash')
+    parser.add_argument('--iteraciones', type=int, default=600000, help='costo PBKDF2 de las contraseñas')
+    parser.add_argument('--modos', nargs='+', default=['en_linea', 'procesos'], choices=['en_linea', 'procesos'])
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', default='-', help="archivo JSON de resultados ('-' para stdout)")
+    args = parser.parse_args(argv)
+    random.seed(args.semilla)
+
+    metodo = f'pbkdf2:sha256:{args.iteraciones}'
+    directorio = tempfile.mkdtemp(prefix='activate_bench_')
+    resultados = []
+    try:
+        ruta_db = os.path.join(directorio, 'bench.db')
+        conn = comun.crear_base(ruta_db)
+        comun.sembrar_usuarios(conn, USUARIOS, generate_password_hash(comun.PASSWORD_BENCH, method=metodo))
+        conn.close()
+
+        from app.app import create_app
+        from app.core.config.settings import Config
+
+        print(f"{'Modo':<12}{'hilos':>6}{'login/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+              f"{'sonda p50':>11}{'sonda p99':>11}{'errores':>9}", file=sys.stderr)
+        for modo in args.modos:
+            class ConfigBench(Config):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{ruta_db}'
+                TESTING = True
+                PASSWORD_HASH_METHOD = metodo
+                PASSWORD_HASH_WORKERS = args.procesos if modo == 'procesos' else 0
+                UPLOAD_FOLDER = os.path.join(directorio, 'uploads')
+                STATIC_BUILD_FOLDER = os.path.join(directorio, 'static_build')
+
+            app = create_app(ConfigBench)
+            try:
+                for hilos in args.hilos:
+                    r = ejecutar(app, modo, hilos, args.logins_por_hilo)
+                    resultados.append(r)
+                    print(f"{modo:<12}{hilos:>6}{r['logins_por_seg']:>10.2f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                          f"{r['sonda_p50_ms']:>11.1f}{r['sonda_p99_ms']:>11.1f}{r['errores']:>9}", file=sys.stderr)
+            finally:
+                servicio = app.extensions.get('password_hasher')
+                if servicio is not None:
+                    servicio.detener()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    texto = json.dumps({
+        'fecha': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'metodo': metodo,
+        'procesos': args.procesos,
+        'logins_por_hilo': args.logins_por_hilo,
+        'resultados': resultados,
+    }, indent=2, ensure_ascii=False)
+    if args.salida == '-':
+        print(texto)
+    else:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark de serialización: métodos de app/infrastructure/serialization.py
+
+Codifica y decodifica los mensajes típicos de los servicios TCP (save_score,
+estadísticas, notificaciones) con cada método y reporta ns/op de codificación,
+ns/op de decodificación y bytes por mensaje.
+
+Uso:
+    python -m benchmarks.bench_serialization [--iteraciones 20000]
+"""
+import argparse
+import time
+
+from app.infrastructure.serialization import deserialize, serialize
+
+METODOS = ['json', 'pickle', 'pickle_base64', 'hybrid', 'binary']
+
+NOTIFICACION = {
+    'id': 1532, 'user_id': 42, 'message': '¡Nuevo récord! Alcanzaste 870 puntos',
+    'type': 'success', 'timestamp': '2024-05-18T21:04:11.532118'
+}
+
+MENSAJES = {
+    'save_score': {'action': 'save_score', 'user_id': 42, 'puntaje': 870},
+    'save_score_resp': {'success': True, 'nuevo_record': True, 'puntaje_maximo': 870},
+    'user_stats_resp': {'success': True, 'stats': {
+        'user_id': 42, 'nombre': 'Martina López', 'email': 'martina@example.com',
+        'puntaje_maximo': 870, 'fecha_ultimo_juego': '2024-05-18 21:04:11.532118',
+        'fecha_registro': '2024-02-01 10:15:00.000000'
+    }},
+    'notification': NOTIFICACION,
+    'notifications_resp': {'success': True, 'notifications': [dict(NOTIFICACION, id=1532 + i) for i in range(10)]},
+}
+
+
+def _ns_por_op(funcion, iteraciones: int) -> float:
+    inicio = time.perf_counter_ns()
+    for _ in range(iteraciones):
+        funcion()
+    return (time.perf_counter_ns() - inicio) / iteraciones
+
+
+def _tamano(serializado) -> int:
+    if isinstance(serializado, dict):  # hybrid devuelve {'format', 'data'}
+        serializado = serializado['data']
+    if isinstance(serializado, str):
+        serializado = serializado.encode('utf-8')
+    return len(serializado)
+
+
+def medir(mensaje, metodo: str, iteraciones: int) -> dict:
+    serializado = serialize(mensaje, metodo)
+    assert deserialize(serializado, metodo) == mensaje, f"{metodo} no reproduce el mensaje"
+    return {
+        'encode_ns': _ns_por_op(lambda: serialize(mensaje, metodo), iteraciones),
+        'decode_ns': _ns_por_op(lambda: deserialize(serializado, metodo), iteraciones),
+        'bytes': _tamano(serializado),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de métodos de serialización')
+    parser.add_argument('--iteraciones', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    print(f"{'Mensaje':<20}{'Método':<15}{'Encode ns/op':>14}{'Decode ns/op':>14}{'Bytes':>8}")
+    for nombre, mensaje in MENSAJES.items():
+        for metodo in METODOS:
+            r = medir(mensaje, metodo, args.iteraciones)
+            print(f"{nombre:<20}{metodo:<15}{r['encode_ns']:>14.0f}{r['decode_ns']:>14.0f}{r['bytes']:>8}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Utilidades compartidas por los benchmarks: base SQLite temporal con el esquema
+de los modelos, carga de usuarios sintéticos y medición de latencias.
+"""
+import random
+import socket
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy import create_engine
+
+from app.data.database import db
+from app.data.models import db_models  # noqa: F401 (registra las tablas en db.metadata)
+from app.data.migrations import aplicar_migraciones
+
+PASSWORD_BENCH = 'bench1234'
+
+
+def crear_base(ruta: str) -> sqlite3.Connection:
+    """Crea las tablas desde los modelos y aplica las migraciones (índices incluidos)"""
+    engine = create_engine(f'sqlite:///{ruta}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+    conn = sqlite3.connect(ruta)
+    aplicar_migraciones(conn)
+    return conn
+
+
+def insertar_en_lotes(conn: sqlite3.Connection, sql: str, filas: Iterable, lote: int = 50000):
+    buffer = []
+    for fila in filas:
+        buffer.append(fila)
+        if len(buffer) >= lote:
+            conn.executemany(sql, buffer)
+            buffer.clear()
+    if buffer:
+        conn.executemany(sql, buffer)
+
+
+def sembrar_usuarios(conn: sqlite3.Connection, n_usuarios: int, password_hash: str = 'x'):
+    """
+    Inserta `n_usuarios` con puntajes de cola larga; uno de cada mil es administrador.
+    Todos comparten `password_hash` para poder iniciar sesión con cualquiera.
+    """
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    ahora = datetime.utcnow()
+
+    def usuarios():
+        for i in range(1, n_usuarios + 1):
+            yield (
+                i, f'Usuario {i}', f'usuario{i}@bench.local', password_hash, int(i % 1000 == 0),
+                int(random.paretovariate(1.5) * 40), ahora.isoformat(' '), 'default.svg', '',
+                (ahora - timedelta(days=random.randrange(365))).isoformat(' ')
+            )
+
+    insertar_en_lotes(conn, """
+        INSERT INTO usuarios (id, nombre, email, password, es_admin, puntaje_maximo,
+                              fecha_ultimo_juego, foto_perfil, biografia, fecha_registro)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, usuarios())
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("ANALYZE")
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def medir(funcion: Callable[[], object], duracion: float = 2.0, max_iter: int = 200000,
+          calentamiento: int = 20) -> Dict[str, float]:
+    """
+    Llama a `funcion` hasta agotar `duracion` segundos (o `max_iter` llamadas)
+    midiendo cada llamada; devuelve ops/seg y latencias p50/p99 en milisegundos.
+    """
+    for _ in range(calentamiento):
+        funcion()
+    latencias = []
+    reloj = time.perf_counter_ns
+    limite = reloj() + int(duracion * 1e9)
+    inicio = reloj()
+    while True:
+        t0 = reloj()
+        funcion()
+        t1 = reloj()
+        latencias.append(t1 - t0)
+        if t1 >= limite or len(latencias) >= max_iter:
+            break
+    total = reloj() - inicio
+    latencias.sort()
+    return {
+        'ops': len(latencias),
+        'ops_por_seg': round(len(latencias) / (total / 1e9), 1),
+        'p50_ms': round(percentil(latencias, 50) / 1e6, 4),
+        'p99_ms': round(percentil(latencias, 99) / 1e6, 4),
+    }
+
+
+def puerto_libre() -> int:
+    """Puerto TCP efímero libre en loopback"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_puerto(puerto: int, timeout: float = 5.0):
+    """Espera a que un servidor local acepte conexiones en `puerto`"""
+    limite = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', puerto), 0.2).close()
+            return
+        except OSError:
+            if time.monotonic() >= limite:
+                raise
+            time.sleep(0.05)
+
+
+def muestra_ids(n_usuarios: int, cantidad: int = 1024) -> List[int]:
+    return [random.randint(1, n_usuarios) for _ in range(cantidad)]
@@ -32,18 +32,23 @@ echo [*] Iniciando servicios...
 echo.
 
 :: Iniciar TCP Server
-echo [1/3] Servidor TCP (Puerto 6000)...
+echo [1/4] Servidor TCP (Puerto 6000)...
 start "TCP Server" cmd /k "cd /d %~dp0 && python -m app.infrastructure.tcp_server"
 timeout /t 2 /nobreak >nul
 
 :: Iniciar Distributed Service
-echo [2/3] Servicio Distribuido (Puerto 7000)...
+echo [2/4] Servicio Distribuido (Puerto 7000)...
 start "Distributed Service" cmd /k "cd /d %~dp0 && python -m app.infrastructure.distributed_service"
 timeout /t 2 /nobreak >nul
 
 :: Iniciar Flask Server
-echo [3/3] Servidor Flask (Puerto 5000)...
+echo [3/4] Servidor Flask (Puerto 5000)...
 start "Flask Server" cmd /k "cd /d %~dp0 && python -m app"
+timeout /t 2 /nobreak >nul
+
+:: Barrido de fotos sin referencias (un solo proceso para todo el sistema)
+echo [4/4] Barrido de fotos (cada hora)...
+start "Upload Sweep" cmd /k "cd /d %~dp0 && python -m app.data.upload_store barrer --intervalo 3600"
 
 timeout /t 3 /nobreak >nul
 
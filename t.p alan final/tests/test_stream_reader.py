@@ -0,0 +1,149 @@
+"""
+Pruebas del lector de mensajes (app/infrastructure/stream_reader.py)
+Usan un par de sockets conectados: lo que se envía por uno lo lee el FramedReader del otro.
+"""
+import socket
+
+import pytest
+
+from app.infrastructure.protocol import CABECERA, MAGIC_V2, ProtocolError
+from app.infrastructure.stream_reader import FramedReader
+
+
+@pytest.fixture
+def par():
+    a, b = socket.socketpair()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def trama(request_id: int, cuerpo: bytes, codec: int = 0) -> bytes:
+    return CABECERA.pack(MAGIC_V2, codec, request_id, len(cuerpo)) + cuerpo
+
+
+# --- Líneas (v1) ---------------------------------------------------------------------
+
+def test_lineas_encadenadas_en_una_lectura(par):
+    emisor, receptor = par
+    emisor.sendall(b'{"a": 1}\n{"b": 2}\n{"c": 3}\n')
+    lector = FramedReader(receptor)
+    assert bytes(lector.leer_linea()) == b'{"a": 1}'
+    assert [bytes(l) for l in lector.lineas_en_buffer()] == [b'{"b": 2}', b'{"c": 3}']
+    assert lector.pendientes == 0
+
+
+def test_linea_partida_en_varios_envios(par):
+    emisor, receptor = par
+    lector = FramedReader(receptor, tamano_inicial=8)
+    emisor.sendall(b'{"accion": ')
+    emisor.sendall(b'"ping"}\nresto')
+    emisor.shutdown(socket.SHUT_WR)
+    assert bytes(lector.leer_linea()) == b'{"accion": "ping"}'
+    # Al cerrar sin separador, lo pendiente es el último mensaje
+    assert bytes(lector.leer_linea()) == b'resto'
+    assert lector.leer_linea() is None
+
+
+def test_linea_del_tamano_maximo(par):
+    emisor, receptor = par
+    emisor.sendall(b'x' * 64 + b'\n')
+    lector = FramedReader(receptor, max_mensaje=64, tamano_inicial=16)
+    assert bytes(lector.leer_linea()) == b'x' * 64
+
+
+def test_linea_que_supera_el_maximo(par):
+    emisor, receptor = par
+    emisor.sendall(b'x' * 65 + b'\n')
+    lector = FramedReader(receptor, max_mensaje=64, tamano_inicial=16)
+    with pytest.raises(ProtocolError):
+        lector.leer_linea()
+
+
+def test_compacta_con_el_buffer_al_limite(par):
+    # El buffer ya tiene el tamaño máximo y una línea consumida al principio:
+    # la línea parcial que sigue cabe compactando, no es un mensaje demasiado grande
+    emisor, receptor = par
+    max_mensaje = 20
+    limite = max_mensaje + CABECERA.size + 1
+    primera = b'p' * 11 + b'\n'
+    segunda = b's' * max_mensaje + b'\n'
+    corte = limite - len(primera)
+    emisor.sendall(primera + segunda[:corte])
+    lector = FramedReader(receptor, max_mensaje=max_mensaje, tamano_inicial=limite)
+    assert bytes(lector.leer_linea()) == primera[:-1]
+    emisor.sendall(segunda[corte:])
+    assert bytes(lector.leer_linea()) == segunda[:-1]
+
+
+def test_muchas_lineas_con_buffer_chico(par):
+    emisor, receptor = par
+    lineas = [(b'%03d' % i) * (i % 7 + 1) for i in range(200)]
+    emisor.sendall(b''.join(l + b'\n' for l in lineas))
+    emisor.shutdown(socket.SHUT_WR)
+    lector = FramedReader(receptor, max_mensaje=32, tamano_inicial=16)
+    recibidas = []
+    while True:
+        linea = lector.leer_linea()
+        if linea is None:
+            break
+        recibidas.append(bytes(linea))
+    assert recibidas == lineas
+
+
+# --- Tramas (v2) -----------------------------------------------------------------------
+
+def test_tramas_encadenadas_en_una_lectura(par):
+    emisor, receptor = par
+    emisor.sendall(trama(1, b'uno') + trama(2, b'') + trama(3, b'tres', codec=1))
+    emisor.shutdown(socket.SHUT_WR)
+    lector = FramedReader(receptor)
+    assert lector.primer_byte() == MAGIC_V2
+    assert [(c, rid, bytes(cuerpo)) for c, rid, cuerpo in lector.tramas()] == [
+        (0, 1, b'uno'), (0, 2, b''), (1, 3, b'tres')
+    ]
+
+
+def test_trama_partida_byte_a_byte(par):
+    emisor, receptor = par
+    datos = trama(7, b'{"action": "ping"}')
+    lector = FramedReader(receptor, tamano_inicial=4)
+    for i in range(len(datos) - 1):
+        emisor.sendall(datos[i:i + 1])
+    emisor.sendall(datos[-1:] + trama(8, b'{}')[:3])
+    assert lector.leer_trama() == (0, 7, b'{"action": "ping"}')
+    emisor.sendall(trama(8, b'{}')[3:])
+    assert lector.leer_trama() == (0, 8, b'{}')
+
+
+def test_trama_del_tamano_maximo(par):
+    emisor, receptor = par
+    emisor.sendall(trama(1, b'y' * 64))
+    lector = FramedReader(receptor, max_mensaje=64, tamano_inicial=16)
+    assert bytes(lector.leer_trama()[2]) == b'y' * 64
+
+
+def test_trama_que_supera_el_maximo(par):
+    emisor, receptor = par
+    emisor.sendall(trama(1, b'y' * 65))
+    lector = FramedReader(receptor, max_mensaje=64, tamano_inicial=16)
+    with pytest.raises(ProtocolError):
+        lector.leer_trama()
+
+
+def test_conexion_cerrada_a_mitad_de_trama(par):
+    emisor, receptor = par
+    emisor.sendall(trama(1, b'incompleta')[:-3])
+    emisor.shutdown(socket.SHUT_WR)
+    with pytest.raises(ProtocolError):
+        FramedReader(receptor).leer_trama()
+
+
+def test_cierre_limpio_y_timeout(par):
+    emisor, receptor = par
+    lector = FramedReader(receptor, timeout=0.05)
+    with pytest.raises(socket.timeout):
+        lector.primer_byte()
+    emisor.shutdown(socket.SHUT_WR)
+    assert lector.primer_byte() is None
+    assert lector.leer_trama() is None